@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of SynthBasis for a fixed network of sites evaluated at many
+dates, against calling synth_values for every date.
+
+    >> python benchmarks/bench_basis.py
+
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import igrf_utils as iut  # noqa: E402
+import model_registry as reg  # noqa: E402
+
+
+def main(sites=2000, ndates=(1, 24, 240, 2400)):
+    igrf = reg.get_model(14)
+    nmax = igrf.parameters['nmax']
+    rng = np.random.default_rng(0)
+    radius = rng.uniform(6371.2, 6400., sites)
+    theta = np.degrees(np.arccos(rng.uniform(-1., 1., sites)))
+    phi = rng.uniform(-180., 180., sites)
+
+    setup = min(timeit.repeat(
+        lambda: iut.SynthBasis(radius, theta, phi, nmax), number=1, repeat=3))
+    basis = iut.SynthBasis(radius, theta, phi, nmax)
+    print(f'{sites} sites, basis set-up {1e3*setup:.1f} ms')
+    print(f'{"dates":>6} {"synth_values (ms)":>18} {"basis (ms)":>11} '
+          f'{"speed-up":>9}')
+    for n in ndates:
+        coeffs, _ = igrf.interpolate(np.linspace(1990., 2025., n))
+        repeat = 3 if n <= 240 else 1
+        old = min(timeit.repeat(
+            lambda: [iut.synth_values(c, radius, theta, phi) for c in coeffs],
+            number=1, repeat=repeat))
+        new = min(timeit.repeat(lambda: basis.synth(coeffs),
+                                number=1, repeat=repeat))
+        print(f'{n:6d} {1e3*old:18.2f} {1e3*new:11.2f} {old/new:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of SpotCache on a Zipf-distributed stream of spot queries: a
+fixed set of sites, queried with a Zipf law of their rank, at times spread
+over a month (one cache entry per site and day). Reports the hit rate and
+queries per second for several cache sizes against computing every query,
+and the error of the quantised values.
+
+    >> python benchmarks/bench_cache.py
+
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import igrf_batch  # noqa: E402
+import model_registry as reg  # noqa: E402
+import spot_cache  # noqa: E402
+
+
+def zipf_stream(nqueries, nsites=20000, exponent=1.1, days=30, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(-60., 70., nsites)
+    lon = rng.uniform(-180., 180., nsites)
+    alt = rng.uniform(0., 3., nsites)
+    weights = 1. / np.arange(1, nsites + 1)**exponent
+    site = rng.choice(nsites, nqueries, p=weights / weights.sum())
+    # any time within one of the days, which are cached as one date
+    date = 2025. + (rng.integers(0, days, nqueries)
+                    + rng.uniform(-0.4, 0.4, nqueries)) / 365
+    return date, lat[site], lon[site], alt[site]
+
+
+def rate(lookup, queries):
+    start = time.perf_counter()
+    for query in zip(*queries):
+        lookup(*query)
+    return len(queries[0]) / (time.perf_counter() - start)
+
+
+def main(nqueries=200_000, sizes=(1000, 10_000, 100_000)):
+    igrf = reg.get_model(14)
+    queries = [x.tolist() for x in zipf_stream(nqueries)]
+
+    uncached = rate(lambda *q: igrf_batch.synth_records(igrf, *q),
+                    [x[:2000] for x in queries])
+    print(f'{nqueries} queries, uncached {uncached:.0f} queries/s')
+    print(f'{"maxsize":>8} {"hit rate":>9} {"queries/s":>10} '
+          f'{"speed-up":>9}')
+    for maxsize in sizes:
+        cache = spot_cache.SpotCache(maxsize=maxsize)
+        cached = rate(cache.lookup, queries)
+        print(f'{maxsize:8d} {cache.info()["hit_rate"]:9.3f} {cached:10.0f} '
+              f'{cached/uncached:9.1f}')
+
+    # error of the values at the grid points against the exact queries
+    sample = [x[:2000] for x in queries]
+    exact = igrf_batch.synth_records(igrf, *sample)
+    cache = spot_cache.SpotCache()
+    quantised = [cache.lookup(*query) for query in zip(*sample)]
+    for name, unit in (('D', 'deg'), ('I', 'deg'), ('F', 'nT'),
+                       ('X', 'nT'), ('Y', 'nT'), ('Z', 'nT')):
+        error = np.abs(exact[name] - [r[name] for r in quantised]).max()
+        print(f'max error {name}: {error:.4f} {unit}')
+
+
+if __name__ == '__main__':
+    main()
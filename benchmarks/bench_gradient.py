@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the analytic gradient tensor (synth_gradient) against central
+finite differences of synth_values (six more calls, one per direction and
+sign), in time and in accuracy for several steps.
+
+    >> python benchmarks/bench_gradient.py
+
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import igrf_utils as iut  # noqa: E402
+import model_registry as reg  # noqa: E402
+
+
+def local_frame(theta, phi):
+    th, ph = np.radians(theta), np.radians(phi)
+    return np.stack((
+        np.stack((np.sin(th)*np.cos(ph), np.sin(th)*np.sin(ph), np.cos(th)),
+                 axis=-1),
+        np.stack((np.cos(th)*np.cos(ph), np.cos(th)*np.sin(ph), -np.sin(th)),
+                 axis=-1),
+        np.stack((-np.sin(ph), np.cos(ph), np.zeros_like(ph)), axis=-1)),
+        axis=-2)
+
+
+def finite_differences(coeffs, radius, theta, phi, step, backend):
+    # central differences of the Cartesian field in the local frame
+    def field(x):
+        r = np.linalg.norm(x, axis=-1)
+        th = np.degrees(np.arccos(x[..., 2] / r))
+        ph = np.degrees(np.arctan2(x[..., 1], x[..., 0]))
+        B = np.stack(iut.synth_values(coeffs, r, th, ph, backend=backend),
+                     axis=-1)
+        return np.einsum('...i,...ij->...j', B, local_frame(th, ph))
+
+    frame = local_frame(theta, phi)
+    x = radius[:, None] * frame[:, 0]
+    jacobian = np.stack([(field(x + step*e) - field(x - step*e)) / (2*step)
+                         for e in np.eye(3)], axis=-2)
+    return frame @ jacobian @ np.swapaxes(frame, -1, -2)
+
+
+def best_time(func, *args, **kwargs):
+    return min(timeit.repeat(lambda: func(*args, **kwargs), number=1,
+                             repeat=3))
+
+
+def main(npoints=100_000, steps=(1., 1e-1, 1e-2, 1e-3, 1e-4)):
+    coeffs, _ = reg.get_model(14).interpolate(2025.)
+    rng = np.random.default_rng(0)
+    radius = rng.uniform(6371.2, 7000., npoints)
+    theta = np.degrees(np.arccos(rng.uniform(-0.99, 0.99, npoints)))
+    phi = rng.uniform(-180., 180., npoints)
+
+    analytic = best_time(iut.synth_gradient, coeffs, radius, theta, phi)
+    print(f'{npoints} points')
+    print(f'{"backend":>8} {"synth_values (s)":>17} {"finite diff (s)":>16} '
+          f'{"analytic (s)":>13} {"speed-up":>9}')
+    for backend in iut.BACKENDS if iut.HAVE_NUMBA else ('numpy',):
+        values = best_time(iut.synth_values, coeffs, radius, theta, phi,
+                           backend=backend)
+        fd = best_time(finite_differences, coeffs, radius, theta, phi, 1e-2,
+                       backend)
+        print(f'{backend:>8} {values:17.3f} {fd:16.3f} {analytic:13.3f} '
+              f'{fd/analytic:9.1f}')
+
+    _, grad_B = iut.synth_gradient(coeffs, radius[:2000], theta[:2000],
+                                   phi[:2000])
+    print(f'max |grad B| {np.abs(grad_B).max():.2f} nT/km')
+    print(f'{"step (km)":>10} {"max fd error (nT/km)":>21}')
+    for step in steps:
+        fd = finite_differences(coeffs, radius[:2000], theta[:2000],
+                                phi[:2000], step, 'numpy')
+        print(f'{step:10.0e} {np.abs(fd - grad_B).max():21.2e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of synth_grid, the separable synthesis on regular latitude and
+longitude grids, against synth_values(..., grid=True) for increasing
+resolution and degree.
+
+    >> python benchmarks/bench_grid.py
+
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import igrf_utils as iut  # noqa: E402
+
+
+def best_time(func, *args, **kwargs):
+    timer = timeit.Timer(lambda: func(*args, **kwargs))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main(cases=((13, 5.), (13, 1.), (13, 0.25), (13, 0.1),
+                (50, 1.), (100, 1.), (200, 0.5))):
+    print(f'{"nmax":>5} {"step":>5} {"points":>8} {"synth_values (s)":>17} '
+          f'{"matmul (s)":>11} {"fft (s)":>9} {"max diff":>9}')
+    rng = np.random.default_rng(0)
+    for nmax, step in cases:
+        coeffs = rng.standard_normal(nmax*(nmax+2)) * 1e3
+        colat = np.arange(step/2, 180., step)
+        lon = np.arange(0., 360., step)
+        npts = colat.size * lon.size
+
+        matmul = best_time(iut.synth_grid, coeffs, 6371.2, colat, lon,
+                           method='matmul')
+        fft = best_time(iut.synth_grid, coeffs, 6371.2, colat, lon,
+                        method='fft')
+        if nmax * nmax * npts <= 2e8:  # keep memory and time reasonable
+            old = best_time(iut.synth_values, coeffs, 6371.2, colat, lon,
+                            grid=True)
+            diff = max(np.max(np.abs(b_new - b_old)) for b_new, b_old in zip(
+                iut.synth_grid(coeffs, 6371.2, colat, lon),
+                iut.synth_values(coeffs, 6371.2, colat, lon, grid=True)))
+            old = f'{old:17.4f}'
+            diff = f'{diff:9.1e}'
+        else:
+            old = f'{"-":>17}'
+            diff = f'{"-":>9}'
+        print(f'{nmax:5d} {step:5.2f} {npts:8d} {old} {matmul:11.4f} '
+              f'{fft:9.4f} {diff}')
+
+
+if __name__ == '__main__':
+    main()
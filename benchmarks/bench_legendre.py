@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of legendre_poly for increasing degree and number of points,
+against the previous implementation with a Python loop over every (n, m).
+
+    >> python benchmarks/bench_legendre.py
+
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+import igrf_utils as iut  # noqa: E402
+from legendre_reference import legendre_poly_loop  # noqa: E402
+
+
+def best_time(func, *args):
+    timer = timeit.Timer(lambda: func(*args))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main(degrees=(5, 10, 13, 20, 50, 100), points=(1, 10, 1000, 100000)):
+    print(f'{"nmax":>5} {"points":>7} {"loop (ms)":>10} {"new (ms)":>10} '
+          f'{"speed-up":>9} {"max diff":>9}')
+    rng = np.random.default_rng(0)
+    for nmax in degrees:
+        for npts in points:
+            if nmax * nmax * npts > 2e8:  # keep memory reasonable
+                continue
+            theta = rng.uniform(0., 180., npts)
+            old = best_time(legendre_poly_loop, nmax, theta)
+            new = best_time(iut.legendre_poly, nmax, theta)
+            diff = np.max(np.abs(legendre_poly_loop(nmax, theta)
+                                 - iut.legendre_poly(nmax, theta)))
+            print(f'{nmax:5d} {npts:7d} {1e3*old:10.3f} {1e3*new:10.3f} '
+                  f'{old/new:9.1f} {diff:9.1e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of load_shcfile for synthetic shc-files of increasing degree.
+
+Shows that parsing time grows linearly with the number of values in the
+file, compared with the previous loader which grew its buffer with
+np.append on every line (quadratic in file size).
+
+    >> python benchmarks/bench_load_shcfile.py
+
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import igrf_utils as iut  # noqa: E402
+
+
+def write_shcfile(filepath, nmax, N=27, nmin=1):
+    """Write an shc-file with random coefficients up to degree nmax."""
+    rng = np.random.default_rng(nmax)
+    degree, order = iut._shc_degree_order(nmin, nmax)
+    time = np.linspace(1900., 1900. + 5*(N-1), N)
+    with open(filepath, 'w') as f:
+        f.write(f'# synthetic model to degree {nmax}\n')
+        f.write(f'{nmin} {nmax} {N} 2 1 {time[0]} {time[-1]}\n')
+        f.write(' '.join(f'{t:.1f}' for t in time) + '\n')
+        for n, m in zip(degree, order):
+            values = ' '.join(f'{v:.2f}' for v in rng.normal(size=N))
+            f.write(f'{n} {m} {values}\n')
+
+
+def load_shcfile_append(filepath):
+    """Previous loader, accumulating all values with np.append."""
+    read_values_flag = False
+    with open(filepath, 'r') as f:
+        data = np.array([])
+        for line in f.readlines():
+            if line[0] == '#':
+                continue
+            read_line = np.fromstring(line, sep=' ')
+            if (read_line.size == 7) and not(read_values_flag):
+                values = read_line.astype(int).tolist()
+                read_values_flag = True
+            else:
+                data = np.append(data, read_line)
+    N = values[2]
+    return data[:N], data[N:].reshape((-1, N+2))[:, 2:]
+
+
+def main(degrees=(13, 25, 50, 100, 200), repeat=3):
+    print(f'{"nmax":>5} {"values":>10} {"load_shcfile (ms)":>18} '
+          f'{"us/value":>9} {"np.append (ms)":>15}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for nmax in degrees:
+            filepath = os.path.join(tmp, f'model{nmax}.shc')
+            write_shcfile(filepath, nmax)
+            model = iut.load_shcfile(filepath)
+            nvalues = model.coeffs.size + model.time.size
+
+            new = min(timeit.repeat(lambda: iut.load_shcfile(filepath),
+                                    number=1, repeat=repeat))
+            if nmax <= 100:  # the quadratic loader takes minutes beyond
+                old = min(timeit.repeat(lambda: load_shcfile_append(filepath),
+                                        number=1, repeat=repeat))
+                old = f'{1e3*old:15.1f}'
+            else:
+                old = f'{"-":>15}'
+            print(f'{nmax:5d} {nvalues:10d} {1e3*new:18.2f} '
+                  f'{1e6*new/nvalues:9.3f} {old}')
+
+
+if __name__ == '__main__':
+    main()
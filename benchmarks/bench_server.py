@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Throughput and latency of igrf_server for concurrent clients, with and
+without coalescing the requests into batches (window 0 computes each
+request on its own).
+
+    >> python benchmarks/bench_server.py
+
+"""
+
+import http.client
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import igrf_server  # noqa: E402
+
+
+def client(port, queries):
+    # one keep-alive connection per client
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    for query in queries:
+        connection.request('GET', query)
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200
+    connection.close()
+
+
+def run(window, clients, requests):
+    rng = np.random.default_rng(0)
+    queries = [f'/field?date={d:.3f}&lat={a:.4f}&lon={o:.4f}&alt=0'
+               for d, a, o in zip(rng.uniform(1950., 2030., requests),
+                                  rng.uniform(-90., 90., requests),
+                                  rng.uniform(-180., 180., requests))]
+    batcher = igrf_server.MicroBatcher(window=window, max_batch=clients)
+    with igrf_server.FieldServer(('127.0.0.1', 0), batcher) as server:
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,),
+                                  daemon=True)
+        thread.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            list(executor.map(client, [server.server_address[1]] * clients,
+                              [queries[k::clients] for k in range(clients)]))
+        time_s = time.perf_counter() - start
+        server.shutdown()
+        thread.join()
+    return requests / time_s, batcher.stats.summary()
+
+
+def main(clients=(1, 8, 32), windows=(0., 0.001, 0.005), requests=2000):
+    print(f'{"clients":>7} {"window (ms)":>11} {"req/s":>8} {"p50 (ms)":>9} '
+          f'{"p99 (ms)":>9} {"mean batch":>11}')
+    for nclients in clients:
+        for window in windows:
+            rate, stats = run(window, nclients, requests)
+            print(f'{nclients:7d} {1e3*window:11.1f} {rate:8.0f} '
+                  f'{stats["latency_ms"]["p50"]:9.2f} '
+                  f'{stats["latency_ms"]["p99"]:9.2f} '
+                  f'{stats["batch_size"]["mean"]:11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cold start of the pyIGRF command: wall time of complete runs of pyIGRF.py
+(spot value, time series and grid, fed on stdin) against the interpreter
+and the import of numpy alone, and the slowest imports of the spot-value
+run as reported by ``python -X importtime``.
+
+The spot-value run must stay within BUDGET seconds of importing numpy
+(the exit status is 1 otherwise), i.e. everything pyIGRF adds to the
+interpreter and numpy: its modules, loading the coefficients, the
+synthesis and the output.
+
+    >> python benchmarks/bench_startup.py
+
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PYIGRF = os.path.join(ROOT, 'pyIGRF.py')
+
+# Time allowed for the spot-value run beyond importing numpy, in seconds
+BUDGET = 0.05
+
+# Answers to the prompts of pyIGRF.py: generation, output, option and inputs
+RUNS = {
+    'spot value': '\n\n1\n2\n1\n45 -3\n0\n2025.5\n',
+    'time series': '\n\n2\n2\n1\n45 -3\n0\n1900\n2030\n',
+    'grid 10 deg': '\n\n3\n1\n-80 10 80\n0 10 350\n0\n2025.5\n',
+}
+
+
+def best_time(args, stdin='', repeat=7, env=None):
+    """Minimum wall time of a command in a fresh process."""
+    env = dict(os.environ, **(env or {}))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, input=stdin, text=True, capture_output=True,
+                       check=True, env=env, cwd=ROOT)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def import_times(stdin, top=10, env=None):
+    """Slowest top-level imports of a run, (cumulative us, module)."""
+    env = dict(os.environ, **(env or {}))
+    result = subprocess.run([sys.executable, '-X', 'importtime', PYIGRF],
+                            input=stdin, text=True, capture_output=True,
+                            check=True, env=env, cwd=ROOT)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # top-level imports only
+            times.append((int(cumulative), name.strip()))
+    return sorted(times, reverse=True)[:top]
+
+
+def main():
+    # write the binary coefficient cache, as after a first run
+    best_time([sys.executable, PYIGRF], RUNS['spot value'], repeat=1)
+
+    python = best_time([sys.executable, '-c', 'pass'])
+    numpy = best_time([sys.executable, '-c', 'import numpy'])
+    print(f'{"python":28s} {python:7.3f} s')
+    print(f'{"python + import numpy":28s} {numpy:7.3f} s')
+    for backend in (None, 'numpy', 'numba'):
+        env = {} if backend is None else {'PYIGRF_BACKEND': backend}
+        for name, stdin in RUNS.items():
+            seconds = best_time([sys.executable, PYIGRF], stdin, env=env)
+            label = f'{name} ({backend or "default"})'
+            print(f'{label:28s} {seconds:7.3f} s  '
+                  f'+{seconds - numpy:6.3f} s over numpy')
+            if name == 'spot value' and backend is None:
+                spot = seconds
+
+    print('\nslowest imports of the spot value (cumulative):')
+    for microseconds, module in import_times(RUNS['spot value']):
+        print(f'  {module:26s} {microseconds / 1e3:7.1f} ms')
+
+    overhead = spot - numpy
+    print(f'\nspot value: {overhead:.3f} s over importing numpy, budget '
+          f'{BUDGET:.3f} s: {"ok" if overhead <= BUDGET else "EXCEEDED"}')
+    return 0 if overhead <= BUDGET else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of FieldTable lookups against synth_values for random queries,
+with the build time, memory and measured error of each lattice.
+
+    >> python benchmarks/bench_table.py
+
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import field_table as ft  # noqa: E402
+import model_registry as reg  # noqa: E402
+
+
+def main(npoints=200_000, steps=(2., 1., 0.5, 0.25)):
+    igrf = reg.get_model(14)
+    rng = np.random.default_rng(0)
+    date = rng.uniform(2020., 2030., npoints)
+    lat = rng.uniform(-90., 90., npoints)
+    lon = rng.uniform(-180., 180., npoints)
+    alt = rng.uniform(0., 10., npoints)
+
+    table = ft.FieldTable(igrf, (2020., 2030.), alts=(0., 10.), step=5.,
+                          check_points=0)
+    exact = min(timeit.repeat(lambda: table.reference(date, lat, lon, alt),
+                              number=1, repeat=3))
+    print(f'{npoints} queries, synth_values {npoints/exact:.0f} queries/s')
+    print(f'{"method":>8} {"step":>5} {"build (s)":>9} {"MB":>6} '
+          f'{"queries/s":>10} {"speed-up":>9} {"max D err":>10} '
+          f'{"max F err":>10}')
+    for method in ft.METHODS:
+        for step in steps:
+            build = timeit.default_timer()
+            table = ft.FieldTable(igrf, (2020., 2030.), alts=(0., 10.),
+                                  step=step, method=method)
+            build = timeit.default_timer() - build
+            lookup = min(timeit.repeat(lambda: table(date, lat, lon, alt),
+                                       number=1, repeat=3))
+            print(f'{method:>8} {step:5.2f} {build:9.2f} '
+                  f'{table.nbytes/2**20:6.1f} {npoints/lookup:10.0f} '
+                  f'{exact/lookup:9.1f} {table.errors["D"]:10.4f} '
+                  f'{table.errors["F"]:10.3f}')
+
+
+if __name__ == '__main__':
+    main()
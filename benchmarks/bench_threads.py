@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scaling of synth_values_chunked with the number of threads, for a global
+grid of points. The speed-up levels off where the memory bandwidth is
+saturated; the float32 synthesis moves half the bytes.
+
+    >> python benchmarks/bench_threads.py [max_threads]
+
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import igrf_utils as iut  # noqa: E402
+import model_registry as reg  # noqa: E402
+
+
+def thread_counts(max_threads):
+    counts = [1]
+    while counts[-1] * 2 < max_threads:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_threads:
+        counts.append(max_threads)
+    return counts
+
+
+def main(max_threads=None, npoints=2_000_000, repeat=3):
+    max_threads = os.cpu_count() if max_threads is None else max_threads
+    coeffs, _ = reg.get_model(14).interpolate(2025.)
+    rng = np.random.default_rng(0)
+    theta = np.degrees(np.arccos(rng.uniform(-1., 1., npoints)))
+    phi = rng.uniform(-180., 180., npoints)
+
+    print(f'{npoints} points, {os.cpu_count()} cores')
+    print(f'{"dtype":>8} {"threads":>8} {"time (s)":>9} {"Mpoints/s":>10} '
+          f'{"speed-up":>9}')
+    for dtype in (np.float64, np.float32):
+        out = tuple(np.empty(npoints, dtype=dtype) for _ in range(3))
+        serial = None
+        for workers in thread_counts(max_threads):
+            time = min(timeit.repeat(
+                lambda: iut.synth_values_chunked(coeffs, 6371.2, theta, phi,
+                                                 dtype=dtype, out=out,
+                                                 workers=workers),
+                number=1, repeat=repeat))
+            serial = time if serial is None else serial
+            print(f'{np.dtype(dtype).name:>8} {workers:8d} {time:9.3f} '
+                  f'{1e-6*npoints/time:10.2f} {serial/time:9.2f}')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
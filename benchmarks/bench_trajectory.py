@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the trajectory mode (trajectory.synth_track) against
+igrf_batch.synth_records, which interpolates a full set of coefficients per
+sample, along a day of a 1 Hz low Earth orbit, and of the cos/sin(m*phi)
+recurrence (igrf_utils.trig_terms) against direct evaluation.
+
+    >> python benchmarks/bench_trajectory.py
+
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import igrf_batch  # noqa: E402
+import igrf_utils as iut  # noqa: E402
+import model_registry as reg  # noqa: E402
+import trajectory  # noqa: E402
+
+
+def orbit(nsamples, start=2024.5, radius=6371.2 + 450., inclination=87.):
+    # circular orbit sampled at 1 Hz, the Earth rotating underneath
+    t = np.arange(nsamples, dtype=float)
+    anomaly = 2*np.pi * t / (2*np.pi * np.sqrt(radius**3 / 398600.4418))
+    inc = np.radians(inclination)
+    lat = np.degrees(np.arcsin(np.sin(inc) * np.sin(anomaly)))
+    lon = np.degrees(np.arctan2(np.cos(inc) * np.sin(anomaly),
+                                np.cos(anomaly)) - 7.2921e-5 * t)
+    date = start + t / (86400. * 365.25)
+    return date, lat, lon % 360., np.full(nsamples, radius)
+
+
+def best_time(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(nsamples=86400, npoints=1_000_000, nmax=13):
+    igrf = reg.get_model(14)
+    date, lat, lon, radius = orbit(nsamples)
+
+    print(f'{nsamples} samples of a 1 Hz orbit, backend '
+          f'{iut.get_backend()}')
+    igrf_batch.synth_records(igrf, date[:10], lat[:10], lon[:10],
+                             radius[:10], itype=2)  # compile
+    times = {
+        'synth_records': lambda: igrf_batch.synth_records(
+            igrf, date, lat, lon, radius, itype=2),
+        'synth_track (arrays)': lambda: list(trajectory.synth_track(
+            igrf, (date, lat, lon, radius), itype=2)),
+        'synth_track (generator)': lambda: list(trajectory.synth_track(
+            igrf, zip(date.tolist(), lat.tolist(), lon.tolist(),
+                      radius.tolist()), itype=2)),
+    }
+    reference = None
+    for name, func in times.items():
+        seconds = best_time(func)
+        result = func()
+        records = result if name == 'synth_records' else np.concatenate(result)
+        if reference is None:
+            reference = records
+        error = max(np.max(np.abs(records[c] - reference[c]))
+                    for c in igrf_batch.COLUMNS)
+        print(f'  {name:24s} {seconds:8.3f} s  {1e6*seconds/nsamples:6.2f} '
+              f'us/sample  max diff {error:.1e}')
+
+    phi = np.random.default_rng(0).uniform(0., 360., npoints)
+
+    def direct():
+        mphi = np.multiply.outer(np.arange(nmax+1, dtype=float),
+                                 np.radians(phi))
+        return np.cos(mphi), np.sin(mphi)
+
+    print(f'cos/sin(m*phi), m = 0..{nmax}, at {npoints} points')
+    for name, func in (('direct', direct),
+                       ('trig_terms', lambda: iut.trig_terms(nmax, phi))):
+        print(f'  {name:24s} {best_time(func):8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
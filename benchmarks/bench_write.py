@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rows per second written by write2 and write3 to screen and to file, with the
+rows formatted in blocks by format_rows against the former row-by-row loop.
+The screen output goes to a discarded stream so that only the formatting and
+writing is timed, not the terminal.
+
+    >> python benchmarks/bench_write.py
+
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import io_options as ioo  # noqa: E402
+
+SCREEN = ['{: .3f}', '{: .3f}', '{: .1f}', '{: .1f}', '{: .1f}', '{: .1f}',
+          '{: .1f}', '{: .2f}', '{: .2f}', '{: .1f}', '{: .1f}', '{: .1f}',
+          '{: .1f}', '{: .1f}']
+FILE = ['{: 6.2f}', '{: 6.2f}', '{: 9.1f}', '{: 9.1f}', '{: 9.1f}',
+        '{: 9.1f}', '{: 9.1f}', '{: 5.2f}', '{: 5.2f}', '{: 7.1f}',
+        '{: 7.1f}', '{: 7.1f}', '{: 7.1f}', '{: 7.1f}']
+
+
+def loop_rows(name, lat, lon, values):
+    # the row loop of write3 before format_rows
+    if not name:
+        for i in range(len(lon)):
+            print(str(np.round(lat[i], decimals=4)),
+                  str(np.round(lon[i], decimals=4)),
+                  *[fmt.format(column[i]) for fmt, column in
+                    zip(SCREEN, values)])
+    else:
+        with open(name, 'w') as file:
+            for i in range(len(lon)):
+                file.writelines([str(np.round(lat[i], decimals=4)), ' ',
+                                 str(np.round(lon[i], decimals=4)), ' ']
+                                + [fmt.format(column[i]) for fmt, column in
+                                   zip(FILE, values)] + ['\n'])
+
+
+def block_rows(name, lat, lon, values):
+    dec, inc, hoz, eff, X, Y, Z, decs, incs, hozs, effs, dX, dY, dZ = values
+    ioo.write3(name, np.array([2025.]), np.array([6371.2]), lat, 90 - lat,
+               lon, X, Y, Z, dX, dY, dZ, dec, hoz, inc, eff, decs, hozs,
+               incs, effs, 2, '14')
+
+
+def best_time(func, *args):
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=3))
+
+
+def main(nrows=(1000, 10_000, 100_000)):
+    rng = np.random.default_rng(0)
+    print(f'{"mode":>6} {"rows":>7} {"loop (rows/s)":>14} '
+          f'{"blocks (rows/s)":>16} {"speed-up":>9}')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mode, name in (('screen', None),
+                           ('file', os.path.join(tmpdir, 'values.txt'))):
+            for n in nrows:
+                lat = rng.uniform(-90., 90., n)
+                lon = rng.uniform(-180., 180., n)
+                values = rng.uniform(-6e4, 6e4, (14, n))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    old = best_time(loop_rows, name, lat, lon, values)
+                    new = best_time(block_rows, name, lat, lon, values)
+                print(f'{mode:>6} {n:7d} {n/old:14.0f} {n/new:16.0f} '
+                      f'{old/new:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
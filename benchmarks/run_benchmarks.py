@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite of the main code paths: loading shc-files, interpolating
+the coefficients, the Legendre functions, the synthesis at 1, 1e3 and 1e6
+points and on grids, the coordinate conversions, the field elements and
+the write2/write3 writers.
+
+Each case is timed with timeit over repeats of at least MIN_TIME seconds.
+The results are saved as JSON, with the machine, the library versions,
+the synthesis backend and the git commit, so that runs can be compared
+over time. Comparing against an earlier file reports the ratio of the
+times of each case and exits with status 1 if a case is slower than the
+threshold.
+
+    >> python benchmarks/run_benchmarks.py
+    >> python benchmarks/run_benchmarks.py --quick -k synth --compare \
+           benchmarks/results/20260101-120000.json
+
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+import igrf_utils as iut  # noqa: E402
+import io_options as ioo  # noqa: E402
+
+SHC_FILE = os.path.join(ROOT, 'SHC_files', 'IGRF14.SHC')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'results')
+
+# Minimum duration of a repeat in seconds and default number of repeats
+MIN_TIME = 0.2
+REPEAT = 5
+
+# Ratio of times above which a case counts as a regression in --compare
+THRESHOLD = 1.2
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(6371.2, 7000., n), rng.uniform(0.1, 179.9, n),
+            rng.uniform(-180., 180., n))
+
+
+def _elements(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-6e4, 6e4, (6, n))
+
+
+def cases(quick=False):
+    """
+    Benchmark cases as (name, items, setup) tuples: ``setup()`` prepares
+    the inputs and returns the function to time, ``items`` is the number of
+    points, rows or dates processed by one call.
+    """
+    large = 100_000 if quick else 1_000_000
+    size = f'1e{len(str(large)) - 1}'
+
+    def load_shcfile():
+        return lambda: iut.load_shcfile(SHC_FILE)
+
+    def load_shcfile_cached():
+        cache_dir = tempfile.mkdtemp()
+        iut.load_shcfile(SHC_FILE, cache=True, cache_dir=cache_dir)
+        return lambda: iut.load_shcfile(SHC_FILE, cache=True,
+                                        cache_dir=cache_dir)
+
+    def interpolate(n):
+        def setup():
+            igrf = iut.load_shcfile(SHC_FILE)
+            date = np.random.default_rng(0).uniform(1900., 2030., n)
+            return lambda: igrf.interpolate(date)
+        return setup
+
+    def legendre_poly(nmax, n):
+        def setup():
+            theta = _points(n)[1]
+            return lambda: iut.legendre_poly(nmax, theta)
+        return setup
+
+    def synth_values(n):
+        def setup():
+            coeffs, _ = iut.load_shcfile(SHC_FILE).interpolate(2025.)
+            radius, theta, phi = _points(n)
+            return lambda: iut.synth_values(coeffs, radius, theta, phi)
+        return setup
+
+    def synth_values_grid(step):
+        def setup():
+            coeffs, _ = iut.load_shcfile(SHC_FILE).interpolate(2025.)
+            theta = np.arange(step / 2, 180., step)
+            phi = np.arange(-180., 180., step)
+            return lambda: iut.synth_values(coeffs, 6371.2, theta, phi,
+                                            grid=True)
+        return setup
+
+    def synth_grid(step):
+        def setup():
+            coeffs, _ = iut.load_shcfile(SHC_FILE).interpolate(2025.)
+            theta = np.arange(step / 2, 180., step)
+            phi = np.arange(-180., 180., step)
+            radius = np.full((theta.size, 1), 6371.2)
+            return lambda: iut.synth_grid(coeffs, radius, theta, phi)
+        return setup
+
+    def gg_to_geo(n):
+        def setup():
+            rng = np.random.default_rng(0)
+            h, colat = rng.uniform(0., 800., n), rng.uniform(0., 180., n)
+            return lambda: iut.gg_to_geo(h, colat)
+        return setup
+
+    def geo_to_gg(n):
+        def setup():
+            radius, theta, _ = _points(n)
+            return lambda: iut.geo_to_gg(radius, theta)
+        return setup
+
+    def xyz2dhif(n):
+        def setup():
+            X, Y, Z = _elements(n)[:3]
+            return lambda: iut.xyz2dhif(X, Y, Z)
+        return setup
+
+    def xyz2dhif_sv(n):
+        def setup():
+            return lambda: iut.xyz2dhif_sv(*_elements(n))
+        return setup
+
+    def write(writer, n, to_file):
+        def setup():
+            rng = np.random.default_rng(0)
+            values = list(rng.uniform(-6e4, 6e4, (14, n)))
+            if writer is ioo.write2:  # one location at n dates
+                date = np.linspace(1900., 2030., n)
+                lat, lon = np.array([45.]), np.array([-3.])
+            else:  # n locations at one date
+                date = np.array([2025.])
+                lat, lon = rng.uniform(-90., 90., n), rng.uniform(0., 360., n)
+            name = os.path.join(tempfile.mkdtemp(), 'values.txt') \
+                if to_file else None
+            # geocentric, so that only the writing is timed
+            args = (name, date, np.array([6371.2]), lat, 90 - lat, lon,
+                    *values, 2, '14')
+
+            def run():
+                if to_file:
+                    writer(*args)
+                    return
+                with open(os.devnull, 'w') as devnull, \
+                        contextlib.redirect_stdout(devnull):
+                    writer(*args)
+            return run
+        return setup
+
+    return [
+        ('load_shcfile', 1, load_shcfile),
+        ('load_shcfile[cache]', 1, load_shcfile_cached),
+        ('interpolate[1]', 1, interpolate(1)),
+        ('interpolate[1e3]', 1000, interpolate(1000)),
+        ('interpolate[1e4]', 10_000, interpolate(10_000)),
+        *((f'legendre_poly[nmax={nmax}]', 1000, legendre_poly(nmax, 1000))
+          for nmax in (13, 30, 60, 120)),
+        ('synth_values[1]', 1, synth_values(1)),
+        ('synth_values[1e3]', 1000, synth_values(1000)),
+        (f'synth_values[{size}]', large, synth_values(large)),
+        ('synth_values[grid=1deg]', 180*360, synth_values_grid(1.)),
+        ('synth_grid[1deg]', 180*360, synth_grid(1.)),
+        (f'gg_to_geo[{size}]', large, gg_to_geo(large)),
+        (f'geo_to_gg[{size}]', large, geo_to_gg(large)),
+        (f'xyz2dhif[{size}]', large, xyz2dhif(large)),
+        (f'xyz2dhif_sv[{size}]', large, xyz2dhif_sv(large)),
+        ('write2[screen,1e4]', 10_000, write(ioo.write2, 10_000, False)),
+        ('write2[file,1e4]', 10_000, write(ioo.write2, 10_000, True)),
+        ('write3[screen,1e4]', 10_000, write(ioo.write3, 10_000, False)),
+        ('write3[file,1e4]', 10_000, write(ioo.write3, 10_000, True)),
+    ]
+
+
+def time_case(func, repeat=REPEAT, min_time=MIN_TIME):
+    """
+    Seconds per call of the repeats, each at least min_time long, after a
+    first call loading the kernels and warming the caches.
+    """
+    func()
+    timer = timeit.Timer(func)
+    number = 1
+    while True:  # as Timer.autorange, down to a single call
+        seconds = timer.timeit(number)
+        if seconds >= min_time:
+            break
+        number = max(number * 2, int(1.2 * number * min_time
+                                     / max(seconds, 1e-9)))
+    times = timer.repeat(repeat, number)
+    return [t / number for t in times], number
+
+
+def environment():
+    """Machine, versions and commit of a run."""
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+            text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=ROOT, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return dict(
+        date=datetime.datetime.now(datetime.timezone.utc).isoformat(
+            timespec='seconds'),
+        commit=commit, dirty=dirty, backend=iut.get_backend(),
+        python=platform.python_version(), numpy=np.__version__,
+        numba=numba_version, platform=platform.platform(),
+        machine=platform.machine(), processor=platform.processor(),
+        cpu_count=os.cpu_count())
+
+
+def run(pattern=None, quick=False, repeat=REPEAT, min_time=MIN_TIME):
+    """Time the cases whose names contain pattern; returns the results."""
+    results = []
+    for name, items, setup in cases(quick):
+        if pattern and pattern not in name:
+            continue
+        times, number = time_case(setup(), repeat, min_time)
+        results.append(dict(name=name, items=items, number=number,
+                            min=min(times), median=statistics.median(times),
+                            times=times))
+        print(f'{name:28s} {_format_time(min(times)):>10s} '
+              f'{_format_time(min(times) / items):>10s}/item', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Print the ratios of the minimum times to those of a baseline run and
+    return the names of the cases slower than threshold times.
+    """
+    previous = {r['name']: r for r in baseline['results']}
+    print(f'\ncompared with {baseline["environment"].get("commit")} of '
+          f'{baseline["environment"].get("date")}')
+    regressions = []
+    for result in results:
+        if result['name'] not in previous:
+            continue
+        ratio = result['min'] / previous[result['name']]['min']
+        flag = ''
+        if ratio > threshold:
+            flag = '  slower'
+            regressions.append(result['name'])
+        elif ratio < 1 / threshold:
+            flag = '  faster'
+        print(f'{result["name"]:28s} {ratio:8.2f}x{flag}')
+    return regressions
+
+
+def _format_time(seconds):
+    for unit, scale in (('s', 1.), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3g} {unit}'
+    return f'{seconds * 1e9:.3g} ns'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run the pyIGRF benchmark suite and save the results as '
+                    'JSON.')
+    parser.add_argument('-k', dest='pattern',
+                        help='only run the cases whose names contain this')
+    parser.add_argument('-o', '--output',
+                        help='JSON file of the results (default: '
+                             'benchmarks/results/<date>-<time>.json)')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='JSON file of an earlier run to compare with; '
+                             'exits with status 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='ratio of times counted as a regression '
+                             f'(default: {THRESHOLD})')
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help=f'repeats per case (default: {REPEAT})')
+    parser.add_argument('--min-time', type=float, default=MIN_TIME,
+                        help='minimum seconds per repeat (default: '
+                             f'{MIN_TIME})')
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller inputs of the largest cases')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    env = environment()
+    print(f'backend {env["backend"]}, numpy {env["numpy"]}, '
+          f'numba {env["numba"]}, commit {env["commit"]}\n')
+    results = run(args.pattern, args.quick, args.repeat, args.min_time)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f'{stamp}.json')
+    with open(output, 'w') as file:
+        json.dump(dict(environment=env, quick=args.quick, repeat=args.repeat,
+                       min_time=args.min_time, results=results),
+                  file, indent=1)
+    print(f'\nresults saved to {output}')
+
+    if baseline is not None:
+        return 1 if compare(results, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precomputed tables of the IGRF main field for fast lookups, e.g. of the
+declination for navigation, where a full spherical harmonic synthesis per
+query is not needed.
+
+A FieldTable holds X, Y and Z on a lattice of latitudes, longitudes,
+altitudes and dates, computed once with the separable grid synthesis of
+igrf_utils. Queries are interpolated with vectorised bilinear or bicubic
+interpolation in latitude and longitude, and linearly in altitude and
+time. The dates of the lattice include the snapshots of the model, between
+which the coefficients are linear in time, so that the interpolation in
+time adds no error.
+
+Building a table measures the maximum interpolation error of each element
+against synth_values (the ``errors`` attribute), and
+FieldTable.from_tolerance picks the coarsest lattice meeting a target.
+
+    import field_table
+    import model_registry as reg
+
+    table = field_table.FieldTable.from_tolerance(
+        reg.get_model(14), (2020., 2030.), 0.05, element='D')
+    D, H, I, F = table.elements(2025.5, 45., -3.)
+    print(table.step, table.errors)
+
+"""
+
+import warnings
+
+import numpy as np
+
+import igrf_utils as iut
+
+METHODS = ('bilinear', 'bicubic')
+
+# Lattice steps in degrees tried by FieldTable.from_tolerance, coarsest first
+STEPS = (10., 5., 3., 2., 1., 0.5, 0.25, 0.2, 0.1, 0.05)
+
+# Number of points checked against synth_values when a table is built
+CHECK_POINTS = 20000
+
+# Minimum horizontal intensity (nT) of the points checked for the errors in
+# D and I, which are ill-defined where H vanishes (near the magnetic poles)
+H_MIN = 1000.
+
+# Elements of the errors, in nT and degrees for D and I
+ELEMENTS = ('X', 'Y', 'Z', 'D', 'I', 'H', 'F')
+
+# Number of queries interpolated at a time, keeping the gathered stencils
+# (16 x 12 values per query) in cache
+CHUNK_SIZE = 2048
+
+
+def _keys_weights(t):
+    # cubic convolution kernel (a = -1/2) of the nodes i-1, i, i+1, i+2
+    return np.stack((((-0.5*t + 1.)*t - 0.5)*t,
+                     (1.5*t - 2.5)*t*t + 1.,
+                     ((-1.5*t + 2.)*t + 0.5)*t,
+                     (0.5*t - 0.5)*t*t), axis=-1)
+
+
+class FieldTable:
+    """
+    Lattice of the main field of a model and its interpolation.
+
+    Parameters
+    ----------
+    igrf : igrf_utils.igrf
+        Loaded model, e.g. ``model_registry.get_model(14)``.
+    dates : float or (float, float)
+        Date or range of dates of the table in decimal years.
+    alts : float or array_like, optional
+        Altitudes (geodetic) or radii (geocentric) of the lattice in km,
+        interpolated linearly in between (default is 0, the ellipsoid).
+    step : float, optional
+        Lattice step in latitude and longitude in degrees, a divisor of 180
+        (default is 1).
+    itype : {1, 2}, optional
+        Geodetic (1, default) or geocentric (2) coordinates of the lattice
+        and queries, and frame of X, Y and Z, as in pyIGRF.
+    method : {'bicubic', 'bilinear'}, optional
+        Interpolation in latitude and longitude (default is 'bicubic').
+    check_points : int, optional
+        Number of random points and lattice cell centres checked against
+        synth_values to measure ``errors`` (default is CHECK_POINTS, 0 to
+        skip).
+
+    Attributes
+    ----------
+    lat, lon, alt, date : ndarray
+        Nodes of the lattice.
+    errors : dict
+        Maximum absolute error of each of ELEMENTS at the checked points, in
+        nT and degrees (for D and I only where H >= H_MIN).
+
+    """
+
+    def __init__(self, igrf, dates, alts=0., step=1., itype=1,
+                 method='bicubic', check_points=CHECK_POINTS):
+        nsteps = int(round(180. / step))
+        if step <= 0 or abs(nsteps * step - 180.) > 1e-9:
+            raise ValueError(f'The step {step} does not divide 180 degrees.')
+        if method not in METHODS:
+            raise ValueError(f'Unknown method {method}.')
+        if itype not in (1, 2):
+            raise ValueError(f'Unknown coordinate type {itype}.')
+        if itype == 2 and np.any(np.asarray(alts) < 3485.):
+            raise ValueError('Radial distance must be greater than the CMB '
+                             'radius (3485 km).')
+
+        self.igrf = igrf
+        self.step = float(step)
+        self.itype = itype
+        self.method = method
+        self.lat = np.linspace(-90., 90., nsteps + 1)
+        self.lon = np.linspace(-180., 180., 2*nsteps + 1)
+        self.alt = np.unique(np.asarray(alts, dtype=float))
+        dates = np.asarray(dates, dtype=float).reshape(-1)
+        inside = (igrf.time > dates.min()) & (igrf.time < dates.max())
+        self.date = np.unique(np.concatenate((dates[[0, -1]],
+                                              igrf.time[inside])))
+
+        self._cells = self._build()
+        self.errors = self.check(check_points) if check_points else None
+
+    @classmethod
+    def from_tolerance(cls, igrf, dates, tolerance, element='D',
+                       steps=STEPS, **kwargs):
+        """
+        Table with the coarsest of ``steps`` whose measured error of
+        ``element`` (one of ELEMENTS) is within ``tolerance`` (nT or
+        degrees). Other arguments are passed to FieldTable.
+        """
+        if element not in ELEMENTS:
+            raise ValueError(f'Unknown element {element}.')
+        for step in steps:
+            table = cls(igrf, dates, step=step, **kwargs)
+            if table.errors[element] <= tolerance:
+                return table
+        raise ValueError(f'Tolerance {tolerance} of {element} not reached '
+                         f'with the step {step} (error '
+                         f'{table.errors[element]:.3g}).')
+
+    @property
+    def nbytes(self):
+        """Memory of the lattice."""
+        return self._cells.nbytes
+
+    def _build(self):
+        # lattice of (date, alt, lat, lon, component), with one ghost node on
+        # each side in latitude and longitude for the bicubic stencil
+        nmax = self.igrf.parameters['nmax']
+        coeffs, _ = self.igrf.interpolate(self.date)
+        table = np.empty((self.date.size, self.alt.size, self.lat.size + 2,
+                          self.lon.size + 2, 3))
+        colat = 90. - self.lat
+        for k, alt in enumerate(self.alt):
+            if self.itype == 1:
+                radius, theta, sd, cd = iut.gg_to_geo(
+                    np.full(colat.size, alt), colat)
+            else:
+                radius, theta = np.full(colat.size, alt), colat
+
+            with warnings.catch_warnings():
+                warnings.filterwarnings('ignore', 'The geographic poles')
+                B_radius, B_theta, B_phi = iut.synth_grid(
+                    coeffs, np.reshape(radius, (-1, 1)), theta, self.lon,
+                    nmax)
+            X, Y, Z = -B_theta, B_phi, -B_radius
+            if self.itype == 1:
+                # rotate back to the geodetic frame, as in pyIGRF
+                sd, cd = np.reshape(sd, (-1, 1)), np.reshape(cd, (-1, 1))
+                X, Z = X*cd + Z*sd, Z*cd - X*sd
+            table[:, k, 1:-1, 1:-1] = np.stack((X, Y, Z), axis=-1)
+
+        # a step beyond a pole is a step back from it at the opposite
+        # longitude, where north and east point the other way
+        nsteps = self.lat.size - 1
+        opposite = (np.arange(self.lon.size) + nsteps) % (2*nsteps) + 1
+        sign = np.array([-1., -1., 1.])
+        table[:, :, 0, 1:-1] = sign * table[:, :, 2, opposite]
+        table[:, :, -1, 1:-1] = sign * table[:, :, -3, opposite]
+        # -180 - step is 180 - step, and 180 + step is -180 + step
+        table[:, :, :, 0] = table[:, :, :, -3]
+        table[:, :, :, -1] = table[:, :, :, 2]
+
+        # coefficients of the bilinear interpolation in date and altitude
+        # within each cell, V00, V10 - V00, V01 - V00 and V11 - V10 - V01 +
+        # V00, so that a single row of 4 x 3 values is gathered per node
+        for axis in (0, 1):
+            if table.shape[axis] == 1:
+                table = np.concatenate((table, table), axis=axis)
+        v00, v10 = table[:-1, :-1], table[1:, :-1]
+        v01, v11 = table[:-1, 1:], table[1:, 1:]
+        return np.ascontiguousarray(np.stack(
+            (v00, v10 - v00, v01 - v00, v11 - v10 - v01 + v00), axis=-2))
+
+    def __call__(self, date, lat, lon, alt=None):
+        """
+        Interpolated X, Y and Z (nT) at arrays of dates (decimal years),
+        latitudes and longitudes (degrees) and altitudes or radii (km,
+        defaults to the single altitude of the table).
+        """
+        if alt is None:
+            if self.alt.size > 1:
+                raise ValueError('alt is required for a table of several '
+                                 'altitudes.')
+            alt = self.alt[0]
+        date, lat, lon, alt = np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (date, lat, lon, alt)))
+        shape = date.shape
+        date, lat, lon, alt = (x.reshape(-1) for x in (date, lat, lon, alt))
+
+        if np.any(np.abs(lat) > 90.):
+            raise ValueError('Latitude outside bounds [-90, 90].')
+        for name, x, nodes in (('Date', date, self.date),
+                               ('Altitude', alt, self.alt)):
+            if np.any((x < nodes[0]) | (x > nodes[-1])):
+                raise ValueError(f'{name} outside the table range '
+                                 f'[{nodes[0]}, {nodes[-1]}].')
+        lon = (lon + 180.) % 360. - 180.
+
+        out = np.empty((date.size, 3))
+        for start in range(0, date.size, CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            out[chunk] = self._interpolate(date[chunk], lat[chunk],
+                                           lon[chunk], alt[chunk])
+        return tuple(out[:, k].reshape(shape) for k in range(3))
+
+    def elements(self, date, lat, lon, alt=None):
+        """Interpolated D, H, I and F, as returned by iut.xyz2dhif."""
+        return iut.xyz2dhif(*self(date, lat, lon, alt))
+
+    def _interpolate(self, date, lat, lon, alt):
+        nalt, nlat, nlon = self._cells.shape[1:4]
+        i_date, t_date = self._cell_positions(date, self.date)
+        i_alt, t_alt = self._cell_positions(alt, self.alt)
+        i_lat, w_lat = self._lattice_weights((lat + 90.) / self.step,
+                                             self.lat.size)
+        i_lon, w_lon = self._lattice_weights((lon + 180.) / self.step,
+                                             self.lon.size)
+
+        # flat index and weight of the (lat, lon) stencil of each point
+        cell = i_date * nalt + i_alt
+        index = ((cell[:, None] * nlat + i_lat)[:, :, None] * nlon
+                 + i_lon[:, None, :]).reshape(date.size, -1)
+        weight = (w_lat[:, :, None] * w_lon[:, None, :]).reshape(
+            date.size, 1, -1)
+        values = weight @ np.take(self._cells.reshape(-1, 12), index, axis=0)
+
+        v00, dv_date, dv_alt, dv_both = values.reshape(-1, 4, 3).transpose(
+            1, 0, 2)
+        t_date, t_alt = t_date[:, None], t_alt[:, None]
+        return v00 + t_date*dv_date + t_alt*(dv_alt + t_date*dv_both)
+
+    def _lattice_weights(self, s, n):
+        # indices (into the padded lattice) and weights of the stencil at
+        # positions s, in steps from the first of n nodes
+        i = np.clip(np.floor(s).astype(int), 0, n - 2)
+        t = s - i
+        if self.method == 'bilinear':
+            return (i[:, None] + np.arange(1, 3),
+                    np.stack((1. - t, t), axis=-1))
+        return i[:, None] + np.arange(4), _keys_weights(t)
+
+    @staticmethod
+    def _cell_positions(x, nodes):
+        # cell of each x between the nodes and fraction of the way across
+        if nodes.size == 1:
+            return np.zeros(x.size, dtype=int), np.zeros(x.size)
+        i = np.clip(np.searchsorted(nodes, x, side='right') - 1,
+                    0, nodes.size - 2)
+        return i, (x - nodes[i]) / (nodes[i + 1] - nodes[i])
+
+    def reference(self, date, lat, lon, alt):
+        """X, Y and Z computed with synth_values, for comparison."""
+        coeffs, _ = self.igrf.interpolate(date)
+        colat = 90. - np.asarray(lat, dtype=float)
+        if self.itype == 1:
+            radius, theta, sd, cd = iut.gg_to_geo(alt, colat)
+        else:
+            radius, theta = alt, colat
+        B_radius, B_theta, B_phi = iut.synth_values(
+            coeffs, radius, theta, lon, self.igrf.parameters['nmax'])
+        X, Y, Z = -B_theta, B_phi, -B_radius
+        if self.itype == 1:
+            X, Z = X*cd + Z*sd, Z*cd - X*sd
+        return X, Y, Z
+
+    def check(self, npoints=CHECK_POINTS, seed=0):
+        """
+        Maximum absolute error of the interpolation of each of ELEMENTS at
+        ``npoints`` points against synth_values: half of them at random,
+        half at centres of lattice cells (the farthest from the nodes), at
+        random dates and altitudes in the table range.
+        """
+        rng = np.random.default_rng(seed)
+        ncentres = npoints // 2
+        lat = np.concatenate((
+            rng.uniform(-90., 90., npoints - ncentres),
+            self.lat[rng.integers(0, self.lat.size - 1, ncentres)]
+            + self.step / 2))
+        lon = np.concatenate((
+            rng.uniform(-180., 180., npoints - ncentres),
+            self.lon[rng.integers(0, self.lon.size - 1, ncentres)]
+            + self.step / 2))
+        date = rng.uniform(self.date[0], self.date[-1], npoints)
+        alt = rng.uniform(self.alt[0], self.alt[-1], npoints)
+
+        table = self(date, lat, lon, alt)
+        exact = self.reference(date, lat, lon, alt)
+        table += iut.xyz2dhif(*table)
+        exact += iut.xyz2dhif(*exact)
+
+        errors = {}
+        for name, k in zip(ELEMENTS, (0, 1, 2, 3, 5, 4, 6)):
+            error = table[k] - exact[k]
+            if name in ('D', 'I'):
+                error = ((error + 180.) % 360. - 180.)[exact[4] >= H_MIN]
+            errors[name] = float(np.max(np.abs(error), initial=0.))
+        return errors
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+igrf_batch: non-interactive synthesis of geomagnetic field values from any
+generation of the IGRF for files of (date, lat, lon, alt) records.
+
+    >> python igrf_batch.py points.csv values.csv --igrf 14 --coords geodetic
+
+Input files are either CSV, with the columns date, lat, lon and alt (a
+header line and lines starting with # are skipped), or .npy, holding an
+(N, 4)-array in the same column order or a structured array with these
+fields. Dates are in decimal years, lat and lon in decimal degrees and alt
+is the altitude in km above the WGS-84 ellipsoid for geodetic coordinates
+or the radial distance in km for geocentric coordinates, as in pyIGRF.
+
+All records are computed in one vectorised pass (split into chunks to bound
+the memory) with the same rotation and SV conventions as pyIGRF, and
+written to a CSV or .npy (structured array) file with the input columns
+followed by D, I, H, F, X, Y, Z and their SV (see COLUMNS). A .npy output is
+a memory-mapped structured array filled chunk by chunk as the records are
+computed, and a .npz output holds one named array per column; both are read
+back without parsing, e.g. np.load('values.npy', mmap_mode='r').
+
+Dependencies: numpy
+
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+import igrf_utils as iut
+import instrument as ins
+import io_options as ioo
+import model_registry as reg
+
+# Output columns, the fields of the binary files written by pyIGRF
+COLUMNS = ioo.FIELDS
+INPUT_COLUMNS = COLUMNS[:4]
+
+# Number of records synthesised at a time
+CHUNK_SIZE = 20000
+
+
+def read_records(filepath):
+    """
+    Read the date, lat, lon and alt columns of a CSV or .npy file.
+
+    Returns
+    -------
+    date, lat, lon, alt : ndarray, shape (N,)
+
+    """
+    if os.path.splitext(filepath)[1].lower() == '.npy':
+        data = np.load(filepath)
+        if data.dtype.names is not None:
+            missing = set(INPUT_COLUMNS) - set(data.dtype.names)
+            if missing:
+                raise ValueError(f'Missing fields {sorted(missing)} in '
+                                 f'{filepath}.')
+            return tuple(np.asarray(data[name], dtype=float)
+                         for name in INPUT_COLUMNS)
+    else:
+        data = np.loadtxt(filepath, delimiter=',', comments='#',
+                          skiprows=_header_lines(filepath), ndmin=2)
+
+    data = np.asarray(data, dtype=float)
+    if data.ndim != 2 or data.shape[1] < 4:
+        raise ValueError(f'Expected four columns {INPUT_COLUMNS} in '
+                         f'{filepath}, found shape {data.shape}.')
+    return tuple(data[:, k] for k in range(4))
+
+
+def _header_lines(filepath):
+    """Number of lines before the first numeric record of a CSV file."""
+    with open(filepath) as file:
+        for num, line in enumerate(file):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                [float(value) for value in line.split(',')]
+            except ValueError:
+                return num + 1
+            return num
+    return 0
+
+
+def check_records(lat, alt, itype):
+    """Raise ValueError for records outside the bounds of the synthesis."""
+    if np.any(np.abs(lat) > 90.):
+        raise ValueError('Latitude outside bounds [-90, 90].')
+    if itype not in (1, 2):
+        raise ValueError(f'Unknown coordinate type {itype}.')
+    if itype == 2 and np.any(alt < 3485.):
+        raise ValueError('Radial distance must be greater than the CMB '
+                         'radius (3485 km).')
+
+
+def synth_records(igrf, date, lat, lon, alt, itype=1, chunk_size=None,
+                  out=None, backend=None):
+    """
+    Main field and SV elements of the IGRF at each record.
+
+    Parameters
+    ----------
+    igrf : igrf_utils.igrf
+        Loaded model, e.g. ``model_registry.get_model(14)``.
+    date, lat, lon, alt : ndarray, shape (N,)
+        Records as described in the module docstring.
+    itype : {1, 2}, optional
+        Geodetic (1, default) or geocentric (2) coordinates.
+    chunk_size : int, optional
+        Number of records synthesised at a time (default is CHUNK_SIZE).
+    out : ndarray, shape (N,), optional
+        Structured array with the fields COLUMNS to fill with the records
+        chunk by chunk, e.g. a memory-mapped file from
+        ``io_options.open_records``.
+    backend : {'numpy', 'numba'}, optional
+        Implementation of the synthesis, resolved once for all chunks from
+        the number of records (see :func:`igrf_utils.get_backend`).
+
+    Returns
+    -------
+    records : ndarray, shape (N,)
+        Structured array with the fields COLUMNS (``out`` if given).
+
+    """
+    date, lat, lon, alt = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float).reshape(-1)
+          for x in (date, lat, lon, alt)))
+    check_records(lat, alt, itype)
+    chunk_size = CHUNK_SIZE if chunk_size is None else int(chunk_size)
+
+    if out is None:
+        records = np.empty(date.size, dtype=ioo.records_dtype())
+    elif out.shape != date.shape or out.dtype.names != COLUMNS:
+        raise ValueError(f'out must be a structured array of shape '
+                         f'{date.shape} with the fields {COLUMNS}.')
+    else:
+        records = out
+    for name, values in zip(INPUT_COLUMNS, (date, lat, lon, alt)):
+        records[name] = values
+
+    nmax = igrf.parameters['nmax']
+    backend = iut.get_backend(backend, size=date.size)
+    for start in range(0, date.size, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        colat = 90 - lat[chunk]
+        if itype == 1:
+            radius, colat, sd, cd = iut.gg_to_geo(alt[chunk], colat)
+        else:
+            radius, sd, cd = alt[chunk], None, None
+
+        coeffs, coeffs_sv, coeffs_start = igrf.epoch_coeffs(date[chunk])
+        X, Y, Z, dX, dY, dZ, dec, hoz, inc, eff, decs, hozs, incs, effs = \
+            iut.synth_elements(coeffs, coeffs_sv, coeffs_start, radius,
+                               colat, lon[chunk], nmax, sd=sd, cd=cd,
+                               backend=backend)
+
+        for name, values in zip(COLUMNS[4:], (dec, inc, hoz, eff, X, Y, Z,
+                                              decs, incs, hozs, effs,
+                                              dX, dY, dZ)):
+            records[name][chunk] = values
+
+    return records
+
+
+def write_records(filepath, records):
+    """Write the records to a CSV, .npy (structured array) or .npz file."""
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == '.npy':
+        np.save(filepath, records)
+        return
+    if extension == '.npz':
+        np.savez(filepath, **{name: records[name] for name in COLUMNS})
+        return
+    fmt = ['%.4f', '%.6f', '%.6f', '%.3f',
+           '%.4f', '%.4f', '%.2f', '%.2f', '%.2f', '%.2f', '%.2f',
+           '%.3f', '%.3f', '%.2f', '%.2f', '%.2f', '%.2f', '%.2f']
+    np.savetxt(filepath, records.view(float).reshape(-1, len(COLUMNS)),
+               fmt=fmt, delimiter=',', header=','.join(COLUMNS),
+               comments='')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compute IGRF field values for a file of (date, lat, '
+                    'lon, alt) records.')
+    parser.add_argument('input', help='CSV or .npy file of records')
+    parser.add_argument('output', help='CSV or .npy file of field values')
+    parser.add_argument('--igrf', default='14',
+                        help='IGRF generation (default: 14)')
+    parser.add_argument('--coords', choices=('geodetic', 'geocentric'),
+                        default='geodetic',
+                        help='alt is the altitude above the ellipsoid '
+                             '(geodetic, default) or the radial distance '
+                             '(geocentric), in km')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='records synthesised at a time (default: '
+                             f'{CHUNK_SIZE})')
+    args = parser.parse_args(argv)
+
+    # stream the records of a .npy output to a temporary file, renamed
+    # once complete, so that a failure leaves no output that looks complete
+    stream = os.path.splitext(args.output)[1].lower() == '.npy'
+    tmp = f'{args.output}.{os.getpid()}.tmp' if stream else None
+    try:
+        igrf = reg.get_model(args.igrf)
+        date, lat, lon, alt = read_records(args.input)
+        out = ioo.open_records(tmp, date.size) if stream else None
+        records = synth_records(igrf, date, lat, lon, alt,
+                                itype=1 if args.coords == 'geodetic' else 2,
+                                chunk_size=args.chunk_size, out=out)
+        if stream:
+            records.flush()
+            del out, records  # close the memory map before renaming
+            os.replace(tmp, args.output)
+        else:
+            write_records(args.output, records)
+    except (OSError, ValueError) as err:
+        parser.exit(1, f'{parser.prog}: error: {err}\n')
+    finally:
+        if stream and os.path.exists(tmp):
+            os.remove(tmp)
+    ins.print_report()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Numba kernels of the synthesis, used by igrf_utils when Numba is installed.
+
+Each point is processed on its own: the Legendre recursion, the cos/sin(m*phi)
+terms and the sums over (n, m) for all sets of coefficients are computed in
+one pass, with the point's values held in small arrays instead of one
+full-size temporary per term. The kernels follow the operations of the NumPy
+implementation of igrf_utils term by term, and release the GIL so that
+chunks can be run in parallel threads.
+
+This module imports Numba and compiles (or loads from the on-disk cache) on
+first import; use it through :func:`igrf_utils.synth_values` and
+:func:`igrf_utils.legendre_poly`.
+
+"""
+
+import math
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, nogil=True)
+def derivative_tables(nmax):
+    """
+    Constants of the recursion of the derivatives dP(n,m), computed once
+    per call instead of once per point: ``Pnm[m, n+1]`` follows from
+    ``da[n, m]*Pnm[n, m-1]`` and ``db[n, m]*Pnm[n, m+1]``.
+    """
+    da = np.zeros((nmax+1, nmax+1))
+    db = np.zeros((nmax+1, nmax+1))
+    for n in range(2, nmax+1):
+        da[n, 0] = -np.sqrt((n*n + n) / 2)
+        da[n, 1] = np.sqrt(2 * (n*n + n))
+        db[n, 1] = np.sqrt((n*n + n - 2))
+        for m in range(2, n):
+            da[n, m] = np.sqrt((n + m) * (n - m + 1))
+            db[n, m] = np.sqrt((n + m + 1) * (n - m))
+        da[n, n] = np.sqrt(2 * n)
+    return da, db
+
+
+# Number of points processed together by the kernels, so that the
+# recursions over (n, m) run over short contiguous rows of points
+BLOCK_SIZE = 64
+
+
+@njit(cache=True, nogil=True)
+def legendre_block(nmax, costh, sinth, rootn, da, db, Pnm):
+    """
+    Fill ``Pnm``, shape (nmax+1, nmax+2, points), with `P(n,m)` and `dP(n,m)`
+    of a block of points, as :func:`igrf_utils.legendre_poly`. Entries not
+    used by the expansion (m > n+1) are left untouched.
+    """
+    npts = costh.size
+    for j in range(npts):
+        Pnm[0, 0, j] = 1.
+        Pnm[1, 1, j] = sinth[j]
+
+    for m in range(nmax):
+        for j in range(npts):
+            Pnm_tmp = rootn[m+m+1] * Pnm[m, m, j]
+            Pnm[m+1, m, j] = costh[j] * Pnm_tmp
+
+            if m > 0:
+                Pnm[m+1, m+1, j] = sinth[j]*Pnm_tmp / rootn[m+m+2]
+
+        for n in range(m+2, nmax+1):
+            d = n * n - m * m
+            e = n + n - 1
+            for j in range(npts):
+                Pnm[n, m, j] = ((e * costh[j] * Pnm[n-1, m, j]
+                                 - rootn[d-e] * Pnm[n-2, m, j]) / rootn[d])
+
+    for j in range(npts):
+        Pnm[0, 2, j] = -Pnm[1, 1, j]
+        Pnm[1, 2, j] = Pnm[1, 0, j]
+    for n in range(2, nmax+1):
+        for j in range(npts):
+            Pnm[0, n+1, j] = da[n, 0] * Pnm[n, 1, j]
+            Pnm[1, n+1, j] = (da[n, 1] * Pnm[n, 0, j]
+                              - db[n, 1] * Pnm[n, 2, j]) / 2
+
+        for m in range(2, n):
+            for j in range(npts):
+                Pnm[m, n+1, j] = 0.5*(da[n, m] * Pnm[n, m-1, j]
+                                      - db[n, m] * Pnm[n, m+1, j])
+
+        for j in range(npts):
+            Pnm[n, n+1, j] = da[n, n] * Pnm[n, n-1, j] / 2
+
+
+@njit(cache=True, nogil=True)
+def legendre_poly(nmax, costh, sinth, rootn, Pnm):
+    """
+    Fill ``Pnm``, shape (nmax+1, nmax+2, points), for flat arrays of
+    cos(theta) and sin(theta).
+    """
+    da, db = derivative_tables(nmax)
+    for start in range(0, costh.size, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, costh.size)
+        legendre_block(nmax, costh[start:stop], sinth[start:stop], rootn,
+                       da, db, Pnm[:, :, start:stop])
+
+
+@njit(cache=True, nogil=True)
+def synth_values(nmax, nmin, radius, theta, phi, coeffs, index, rootn, out):
+    """
+    Field components of several sets of coefficients at flat arrays of
+    points.
+
+    Parameters
+    ----------
+    nmax, nmin : int
+        Degrees of the synthesis.
+    radius, theta, phi : ndarray, shape (points,)
+        Radius in units of the Earth's average radius, colatitude and
+        longitude in degrees.
+    coeffs : tuple of ndarray, shape (rows, N)
+        Rows of coefficients of each set, a single row for coefficients
+        shared by all points.
+    index : ndarray, shape (sets, points)
+        Row of the coefficients of each set used at each point.
+    rootn : ndarray
+        Square roots of the integers up to 2*nmax**2.
+    out : ndarray, shape (sets, 3, points)
+        B_radius, B_theta and B_phi of each set.
+
+    """
+    nsets = len(coeffs)
+    ncoeffs = nmax * (nmax+2)
+    da, db = derivative_tables(nmax)
+    dtype = out.dtype
+    # coefficients of the points of a block, laid out so that the loops over
+    # points read them contiguously; shared coefficients are filled in once
+    coeffs_block = np.empty((nsets, ncoeffs, BLOCK_SIZE), dtype=dtype)
+    for k in range(nsets):
+        if coeffs[k].shape[0] == 1:
+            for num in range(ncoeffs):
+                coeffs_block[k, num, :] = coeffs[k][0, num]
+    Pnm = np.zeros((nmax+1, nmax+2, BLOCK_SIZE), dtype=dtype)
+    costh = np.empty(BLOCK_SIZE, dtype=dtype)
+    sinth = np.empty(BLOCK_SIZE, dtype=dtype)
+    div_sinth = np.empty(BLOCK_SIZE, dtype=dtype)
+    cmp = np.empty((nmax+1, BLOCK_SIZE), dtype=dtype)
+    smp = np.empty((nmax+1, BLOCK_SIZE), dtype=dtype)
+    r_n = np.empty(BLOCK_SIZE, dtype=dtype)
+    fac_radius = np.empty(BLOCK_SIZE, dtype=dtype)
+    fac_theta = np.empty(BLOCK_SIZE, dtype=dtype)
+    fac_phi = np.empty(BLOCK_SIZE, dtype=dtype)
+
+    for start in range(0, theta.size, BLOCK_SIZE):
+        npts = min(BLOCK_SIZE, theta.size - start)
+        poles = False
+        for j in range(npts):
+            i = start + j
+            costh[j] = math.cos(math.radians(theta[i]))
+            sinth[j] = math.sqrt(1 - costh[j]*costh[j])
+            # sin(theta) set to one at the poles, see below
+            div_sinth[j] = sinth[j]
+            if theta[i] == 0. or theta[i] == 180.:
+                div_sinth[j] = 1.
+                poles = True
+            # cos(m*phi) and sin(m*phi) by angle addition, as trig_terms
+            cos_phi = math.cos(math.radians(phi[i]))
+            sin_phi = math.sin(math.radians(phi[i]))
+            cmp[0, j] = 1.
+            smp[0, j] = 0.
+            for m in range(nmax):
+                cmp[m+1, j] = cmp[m, j]*cos_phi - smp[m, j]*sin_phi
+                smp[m+1, j] = smp[m, j]*cos_phi + cmp[m, j]*sin_phi
+            r_n[j] = radius[i]**(-(nmin+2))
+            for k in range(nsets):
+                out[k, 0, i] = 0.
+                out[k, 1, i] = 0.
+                out[k, 2, i] = 0.
+                if coeffs[k].shape[0] > 1:
+                    row = coeffs[k][index[k, i]]
+                    for num in range(ncoeffs):
+                        coeffs_block[k, num, j] = row[num]
+
+        legendre_block(nmax, costh[:npts], sinth[:npts], rootn, da, db, Pnm)
+
+        num = nmin**2 - 1
+        for n in range(nmin, nmax+1):
+            for j in range(npts):
+                fac_radius[j] = (n+1) * Pnm[n, 0, j] * r_n[j]
+                fac_theta[j] = -Pnm[0, n+1, j] * r_n[j]
+            for k in range(nsets):
+                for j in range(npts):
+                    i = start + j
+                    g_n0 = coeffs_block[k, num, j]
+                    out[k, 0, i] += fac_radius[j] * g_n0
+                    out[k, 1, i] += fac_theta[j] * g_n0
+
+            num += 1
+
+            for m in range(1, n+1):
+                for j in range(npts):
+                    fac_radius[j] = (n+1) * Pnm[n, m, j] * r_n[j]
+                    fac_theta[j] = -Pnm[m, n+1, j] * r_n[j]
+                    div_Pnm = Pnm[n, m, j] / div_sinth[j]
+                    if poles:
+                        # handle poles using L'Hopital's rule
+                        theta_j = theta[start + j]
+                        if theta_j == 0.:
+                            div_Pnm = Pnm[m, n+1, j]
+                        elif theta_j == 180.:
+                            div_Pnm = -Pnm[m, n+1, j]
+                    fac_phi[j] = m * div_Pnm * r_n[j]
+
+                for k in range(nsets):
+                    for j in range(npts):
+                        i = start + j
+                        g_nm = coeffs_block[k, num, j]
+                        h_nm = coeffs_block[k, num+1, j]
+
+                        out[k, 0, i] += fac_radius[j] * (g_nm * cmp[m, j]
+                                                         + h_nm * smp[m, j])
+                        out[k, 1, i] += fac_theta[j] * (g_nm * cmp[m, j]
+                                                        + h_nm * smp[m, j])
+                        out[k, 2, i] += fac_phi[j] * (g_nm * smp[m, j]
+                                                      - h_nm * cmp[m, j])
+
+                num += 2
+
+            for j in range(npts):
+                r_n[j] = r_n[j] / radius[start + j]
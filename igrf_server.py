@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+igrf_server: local HTTP service of geomagnetic field values from any
+generation of the IGRF, for applications making many small lookups.
+
+    >> python igrf_server.py --port 8000 --window-ms 1
+
+    GET /field?date=2025.5&lat=45&lon=-3&alt=0[&coords=geodetic][&igrf=14]
+        JSON object of the inputs and D, I, H, F, X, Y, Z and their SV, with
+        the columns and units of igrf_batch.py.
+    GET /stats
+        JSON object of request latency percentiles and batch size statistics
+        (and the counters of the result cache, see --cache-size).
+
+The models stay loaded in memory. Concurrent requests are coalesced by a
+MicroBatcher into a single vectorised synthesis, one per generation and
+coordinate type, and the results are fanned back out to the requests: the
+requests queued while a batch is computed form the next batch, and a
+batching window > 0 also waits that long for more requests (up to the
+maximum batch size), trading latency for larger batches.
+Only the standard library and numpy are used; the server binds to
+localhost by default.
+
+"""
+
+import argparse
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import igrf_batch
+import igrf_utils as iut
+import model_registry as reg
+import spot_cache
+
+# Default batching window in seconds and maximum number of requests per batch
+WINDOW = 0.
+MAX_BATCH = 1024
+
+# Number of latest requests and batches kept for the statistics
+STATS_SIZE = 100_000
+
+_Request = namedtuple('_Request', ['date', 'lat', 'lon', 'alt', 'itype',
+                                   'generation', 'future', 'start', 'key'])
+
+
+def _percentiles(values, percents=(50, 90, 99)):
+    if not values:
+        return {f'p{p}': None for p in percents}
+    return {f'p{p}': float(v)
+            for p, v in zip(percents, np.percentile(values, percents))}
+
+
+class ServiceStats:
+    """
+    Latencies of the requests (from submission to result) and sizes and
+    compute times of the batches, over the latest STATS_SIZE of each. Safe to
+    update from several threads.
+    """
+
+    def __init__(self, size=STATS_SIZE):
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=size)
+        self._batch_sizes = deque(maxlen=size)
+        self._batch_times = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record_batch(self, size, seconds, latencies, failed=False):
+        with self._lock:
+            self.batches += 1
+            self.requests += size
+            self.errors += size if failed else 0
+            self._batch_sizes.append(size)
+            self._batch_times.append(seconds)
+            self._latencies.extend(latencies)
+
+    def summary(self):
+        """Counters and percentiles, latencies and times in ms."""
+        with self._lock:
+            latencies = [1e3 * t for t in self._latencies]
+            sizes = list(self._batch_sizes)
+            times = [1e3 * t for t in self._batch_times]
+            summary = dict(requests=self.requests, batches=self.batches,
+                           errors=self.errors)
+        summary['latency_ms'] = dict(
+            _percentiles(latencies), max=max(latencies, default=None),
+            mean=float(np.mean(latencies)) if latencies else None)
+        summary['batch_size'] = dict(
+            _percentiles(sizes), max=max(sizes, default=None),
+            mean=float(np.mean(sizes)) if sizes else None)
+        summary['batch_ms'] = _percentiles(times)
+        return summary
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent field lookups into vectorised syntheses.
+
+    A worker thread waits for a request, then collects the requests queued
+    or arriving within ``window`` seconds (at most ``max_batch``), computes
+    them with one :func:`igrf_batch.synth_records` call per generation and
+    coordinate type and sets the result of each request's future.
+
+    Parameters
+    ----------
+    registry : model_registry.ModelRegistry, optional
+        Models to use (default is the shared registry of get_model).
+    window : float, optional
+        Batching window in seconds (default is WINDOW).
+    max_batch : int, optional
+        Maximum number of requests per batch (default is MAX_BATCH).
+    cache : spot_cache.SpotCache, optional
+        Cache of the results: cached lookups are answered on submission,
+        the others are computed at their quantised position and cached.
+    backend : {'numpy', 'numba'}, optional
+        Implementation of the synthesis of every batch (default is chosen
+        per batch by :func:`igrf_utils.get_backend`).
+
+    """
+
+    def __init__(self, registry=None, window=WINDOW, max_batch=MAX_BATCH,
+                 cache=None, backend=None):
+        self.registry = reg.default_registry() if registry is None \
+            else registry
+        self.window = window
+        self.max_batch = max_batch
+        self.cache = cache
+        self.backend = backend
+        self.stats = ServiceStats()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        """Start the worker thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name='igrf-batcher')
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Compute the pending requests and stop the worker thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, date, lat, lon, alt, itype=1, igrf=14):
+        """
+        Queue a lookup and return a concurrent.futures.Future of its record,
+        a dict of igrf_batch.COLUMNS. Invalid input raises ValueError here,
+        so that it cannot fail the batch it would have joined.
+        """
+        try:
+            date, lat, lon, alt = (float(x) for x in (date, lat, lon, alt))
+        except (TypeError, ValueError):
+            raise ValueError('date, lat, lon and alt must be numbers.') \
+                from None
+        if not all(math.isfinite(x) for x in (date, lat, lon, alt)):
+            raise ValueError('date, lat, lon and alt must be finite.')
+        if abs(lat) > 90.:
+            raise ValueError('Latitude outside bounds [-90, 90].')
+        if itype not in (1, 2):
+            raise ValueError(f'Unknown coordinate type {itype}.')
+        if itype == 2 and alt < 3485.:
+            raise ValueError('Radial distance must be greater than the CMB '
+                             'radius (3485 km).')
+        self.registry.get(igrf)  # load the model, or raise ValueError
+
+        future = Future()
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(date, lat, lon, alt, itype, igrf)
+            record = self.cache.get(key)
+            if record is not None:
+                future.set_result(record)
+                return future
+            date, lat, lon, alt = self.cache.point(key)
+        self._queue.put(_Request(date, lat, lon, alt, itype, int(igrf),
+                                 future, time.perf_counter(), key))
+        return future
+
+    def lookup(self, *args, timeout=None, **kwargs):
+        """Submit a lookup and wait for its record."""
+        return self.submit(*args, **kwargs).result(timeout)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=timeout) \
+                        if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+            self._compute(batch)
+
+    def _compute(self, batch):
+        start = time.perf_counter()
+        groups = {}
+        for request in batch:
+            groups.setdefault((request.generation, request.itype),
+                              []).append(request)
+        failed = False
+        for (generation, itype), requests in groups.items():
+            try:
+                records = igrf_batch.synth_records(
+                    self.registry.get(generation),
+                    *np.array([r[:4] for r in requests]).T, itype=itype,
+                    backend=self.backend)
+            except Exception as err:
+                failed = True
+                for request in requests:
+                    request.future.set_exception(err)
+                continue
+            for request, record in zip(requests, records.tolist()):
+                record = dict(zip(igrf_batch.COLUMNS, record))
+                if request.key is not None:
+                    self.cache.put(request.key, record)
+                request.future.set_result(record)
+        end = time.perf_counter()
+        self.stats.record_batch(len(batch), end - start,
+                                [end - r.start for r in batch], failed)
+
+
+class FieldRequestHandler(BaseHTTPRequestHandler):
+    """Handler of the /field and /stats requests of a FieldServer."""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/field':
+            self._field(parse_qs(url.query))
+        elif url.path == '/stats':
+            batcher = self.server.batcher
+            summary = batcher.stats.summary()
+            if batcher.cache is not None:
+                summary['cache'] = batcher.cache.info()
+            self._send(200, summary)
+        else:
+            self._send(404, {'error': f'Unknown path {url.path}.'})
+
+    def _field(self, query):
+        def param(name, default=None):
+            values = query.get(name)
+            if not values:
+                if default is None:
+                    raise ValueError(f'Missing parameter {name}.')
+                return default
+            return values[-1]
+
+        try:
+            coords = param('coords', 'geodetic')
+            if coords not in ('geodetic', 'geocentric'):
+                raise ValueError(f'Unknown coordinates {coords}.')
+            future = self.server.batcher.submit(
+                param('date'), param('lat'), param('lon'), param('alt'),
+                itype=1 if coords == 'geodetic' else 2,
+                igrf=param('igrf', '14'))
+        except ValueError as err:
+            self._send(400, {'error': str(err)})
+            return
+        try:
+            self._send(200, future.result(self.server.result_timeout))
+        except Exception as err:
+            self._send(500, {'error': str(err)})
+
+    def _send(self, status, content):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FieldServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server of field values, handing the lookups of all
+    connections to one MicroBatcher (started and closed with the server).
+    """
+
+    def __init__(self, address, batcher=None, result_timeout=10.,
+                 verbose=False):
+        self.batcher = MicroBatcher() if batcher is None else batcher
+        self.result_timeout = result_timeout
+        self.verbose = verbose
+        super().__init__(address, FieldRequestHandler)
+        self.batcher.start()
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve IGRF field values over HTTP, batching concurrent '
+                    'requests.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='port (default: 8000)')
+    parser.add_argument('--window-ms', type=float, default=1e3 * WINDOW,
+                        help='batching window in ms (default: '
+                             f'{1e3 * WINDOW:g})')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH,
+                        help=f'maximum batch size (default: {MAX_BATCH})')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='entries of the result cache, quantised as in '
+                             'spot_cache (default: 0, no cache)')
+    parser.add_argument('--preload', default='14',
+                        help='comma-separated generations to load on start '
+                             '(default: 14)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='log every request')
+    args = parser.parse_args(argv)
+
+    registry = reg.default_registry()
+    generations = [g for g in args.preload.split(',') if g]
+    try:
+        registry.preload(generations)
+    except ValueError as err:
+        parser.exit(1, f'{parser.prog}: error: {err}\n')
+    batcher = MicroBatcher(registry, window=1e-3 * args.window_ms,
+                           max_batch=args.max_batch,
+                           cache=spot_cache.SpotCache(args.cache_size,
+                                                      registry=registry)
+                           if args.cache_size > 0 else None,
+                           backend=iut.get_backend()).start()
+    # compile or load the synthesis kernels before the first request, the
+    # small batches of the service running on them too
+    iut.warm_up(batcher.backend)
+    for generation in generations[:1]:
+        batcher.lookup(2020., 0., 0., 0., igrf=generation)
+    batcher.stats = ServiceStats()
+    if batcher.cache is not None:
+        batcher.cache.clear()
+
+    with FieldServer((args.host, args.port), batcher,
+                     verbose=args.verbose) as server:
+        print(f'Serving IGRF field values on http://{args.host}:'
+              f'{server.server_address[1]}/field')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,19 +15,138 @@ Functions for computing main field, the non-linear coefficients of the field,
 """
 
 import os
+import importlib.util
+from collections import namedtuple
+from functools import lru_cache
 import numpy as np
 from numpy import degrees, radians
 from math import pi
 import warnings
 
+import instrument as ins
+
 r2d = np.rad2deg
 d2r = np.deg2rad
 
+# The synthesis runs on compiled Numba kernels (see igrf_numba.py) if Numba
+# is installed, unless the NumPy implementation is chosen with the backend
+# argument or the environment variable PYIGRF_BACKEND
+HAVE_NUMBA = importlib.util.find_spec('numba') is not None
+BACKENDS = ('numpy', 'numba')
+
+# Importing Numba and loading the kernels takes about half a second, more
+# than NumPy takes for syntheses of fewer than NUMBA_MIN_SIZE points (tens
+# of milliseconds), which therefore run on NumPy by default (see
+# get_backend), so that e.g. a spot value never imports Numba
+NUMBA_MIN_SIZE = 10_000
+
 class igrf: # A simple class to put the igrf file values into
-  def __init__(self, time, coeffs, parameters):
-     self.time = time
-     self.coeffs = coeffs
-     self.parameters = parameters
+    def __init__(self, time, coeffs, parameters):
+        self.time = time
+        self.coeffs = coeffs
+        self.parameters = parameters
+
+        # snapshots as (N, number of coefficients) rows and the slopes of the
+        # piecewise linear model between consecutive snapshots (per year)
+        self.knots = np.ascontiguousarray(
+            np.reshape(coeffs, (-1, np.size(time))).T)
+        self.slopes = np.diff(self.knots, axis=0) / np.diff(time)[:, None]
+
+    @ins.instrumented('interpolate', points=lambda self, date, *args,
+                      **kwargs: np.size(date))
+    def interpolate(self, date, extrapolate=None):
+        """
+        Evaluate the piecewise linear coefficients and their time derivative.
+
+        Parameters
+        ----------
+        date : float or ndarray, shape (...)
+            Dates in decimal years.
+        extrapolate : {'linear', 'constant', 'nan', 'raise'}, optional
+            Policy for dates outside the model time span: extend the first
+            and last linear pieces (default, as ``interp1d`` with
+            ``fill_value='extrapolate'``), hold the end snapshots with zero
+            derivative, return NaN or raise a ValueError.
+
+        Returns
+        -------
+        coeffs : ndarray, shape (..., N)
+            Coefficients at ``date``, last dimension is the number of
+            coefficients as expected by :func:`synth_values`.
+        coeffs_sv : ndarray, shape (..., N)
+            Time derivative of the coefficients (per year). At a snapshot, the
+            derivative of the following piece is returned.
+
+        """
+        extrapolate = 'linear' if extrapolate is None else extrapolate
+        if extrapolate not in ('linear', 'constant', 'nan', 'raise'):
+            raise ValueError(f'Unknown extrapolation policy {extrapolate}.')
+
+        date = np.asarray(date, dtype=float)
+        time = self.time
+        if time.size == 1:  # a single snapshot has no secular variation
+            coeffs = np.broadcast_to(self.knots[0], date.shape
+                                     + self.knots.shape[1:]).copy()
+            return coeffs, np.zeros_like(coeffs)
+
+        outside = (date < time[0]) | (date > time[-1])
+        if extrapolate == 'raise' and np.any(outside):
+            raise ValueError(f'Dates outside the model time span '
+                             f'[{time[0]}, {time[-1]}].')
+        if extrapolate == 'constant':
+            date = np.clip(date, time[0], time[-1])
+
+        k = self.piece(date)
+
+        # copy, as for a scalar date k is an integer and slopes[k] a view of
+        # the model, which the masking below must not modify
+        coeffs_sv = self.slopes[k].copy()
+        coeffs = self.knots[k] + (date - time[k])[..., None] * coeffs_sv
+
+        if extrapolate == 'constant':
+            coeffs_sv[outside] = 0.
+        elif extrapolate == 'nan':
+            coeffs[outside] = np.nan
+            coeffs_sv[outside] = np.nan
+
+        return coeffs, coeffs_sv
+
+    def piece(self, date):
+        """
+        Index of the linear piece of the coefficients used at each date by
+        :meth:`interpolate` (the piece starting at or before the date, the
+        first and last pieces being extended), i.e. the coefficients at
+        ``date`` are ``knots[k] + (date - time[k]) * slopes[k]``.
+        """
+        k = np.searchsorted(self.time, date, side='right') - 1
+        return np.clip(k, 0, max(self.time.size - 2, 0))
+
+    def epoch_coeffs(self, date):
+        """
+        Coefficients for the main field and SV at ``date`` as in pyIGRF.
+
+        The IGRF has constant SV within each five year epoch (e.g. 2020 to
+        2025), and the SV of the non-linear elements D, H, I and F is
+        computed relative to the main field at the start of the epoch.
+
+        Parameters
+        ----------
+        date : float or ndarray, shape (...)
+            Dates in decimal years.
+
+        Returns
+        -------
+        coeffs, coeffs_sv, coeffs_start : ndarray, shape (..., N)
+            Main field coefficients at ``date``, SV of the epoch in which
+            ``date`` lies (per year) and main field at the start of that
+            epoch, as expected by :func:`synth_elements`.
+
+        """
+        date = np.asarray(date, dtype=float)
+        coeffs, _ = self.interpolate(date)
+        epoch_start = (date - 1900)//5 * 5
+        coeffs_start, coeffs_sv = self.interpolate(1900 + epoch_start)
+        return coeffs, coeffs_sv, coeffs_start
 
 def check_int(s):
     """Convert to integer."""
@@ -44,7 +163,7 @@ def check_float(s):
         raise ValueError(f'Could not convert {s} to float.')
         
 
-def load_shcfile(filepath, leap_year=None):
+def load_shcfile(filepath, leap_year=None, cache=None, cache_dir=None):
     """
     Load shc-file and return coefficient arrays.
 
@@ -55,6 +174,15 @@ def load_shcfile(filepath, leap_year=None):
     leap_year : {True, False}, optional
         Take leap year in time conversion into account (default). Otherwise,
         use conversion factor of 365.25 days per year.
+    cache : {True, False}, optional
+        If ``True``, read the coefficients from a binary cache file when
+        it is still valid for ``filepath`` (same path, size and modification
+        time), otherwise parse the text file and (re)write the cache
+        (default is ``False``).
+    cache_dir : str, optional
+        Directory holding the binary caches. Defaults to the environment
+        variable ``PYIGRF_CACHE_DIR`` or, if unset, a ``__shccache__``
+        directory next to the shc-file.
 
     Returns
     -------
@@ -74,36 +202,280 @@ def load_shcfile(filepath, leap_year=None):
 
     """
     leap_year = True if leap_year is None else leap_year
-    
-    read_values_flag = False
 
-    with open(filepath, 'r') as f:
+    if not cache:
+        return _parse_shcfile(filepath, leap_year)
+
+    cache_file = _shc_cache_path(filepath, cache_dir)
+    key = _shc_cache_key(filepath)
+    igrf_model = _read_shc_cache(cache_file, key)
+    if igrf_model is None:
+        igrf_model = _parse_shcfile(filepath, leap_year)
+        try:
+            _write_archive(cache_file, [igrf_model], [key])
+        except OSError:
+            warnings.warn(f'Could not write coefficient cache {cache_file}.')
+    return igrf_model
+
+
+@ins.instrumented('load_shcfile[cache]')
+def _read_shc_cache(cache_file, key):
+    """The model of a binary cache if valid for key, otherwise None."""
+    try:
+        return _read_archive(cache_file, key=key)
+    except (OSError, KeyError, ValueError):
+        return None  # missing, stale or unreadable cache
+
 
-        data = np.array([])
-        for line in f.readlines():
+@ins.instrumented('load_shcfile')
+def _parse_shcfile(filepath, leap_year):
+    """Parse an shc-file, see :func:`load_shcfile`."""
+    with open(filepath, 'r') as f:
 
-            if line[0] == '#':
+        # read the parameter line first to size the coefficient buffer
+        for line in f:
+            if line[0] == '#' or not line.strip():
                 continue
 
             read_line = np.fromstring(line, sep=' ')
-            if (read_line.size == 7) and not(read_values_flag):
-                name = os.path.split(filepath)[1]  # file name string
-                values = [name] + read_line.astype(int).tolist()
-                read_values_flag = True
-            else:
-                data = np.append(data, read_line)
+            if read_line.size != 7:
+                raise ValueError(f'Expected the parameter line of {filepath}'
+                                 f' before any data, got: {line.strip()}')
+            name = os.path.split(filepath)[1]  # file name string
+            values = [name] + read_line.astype(int).tolist()
+            break
+        else:
+            raise ValueError(f'No parameter line found in {filepath}.')
 
         # unpack parameter line
         keys = ['SHC', 'nmin', 'nmax', 'N', 'order', 'step', 'start_year', 'end_year']
         parameters = dict(zip(keys, values))
-        
-        time = data[:parameters['N']]
-        coeffs = data[parameters['N']:].reshape((-1, parameters['N']+2))
-        coeffs = np.squeeze(coeffs[:, 2:])  # discard columns with n and m
+        N = parameters['N']
+        nmin, nmax = parameters['nmin'], parameters['nmax']
+
+        # times, then one row of n, m and N values per coefficient. Fill the
+        # preallocated buffer in place regardless of how values wrap on lines
+        ncoeffs = (nmax + 1)**2 - nmin**2
+        data = np.empty(N + ncoeffs * (N + 2))
+        size = 0
+        for line in f:
+            if line[0] == '#' or not line.strip():
+                continue
 
+            read_line = np.fromstring(line, sep=' ')
+            if size + read_line.size > data.size:
+                raise ValueError(f'More values in {filepath} than expected '
+                                 f'for nmin={nmin}, nmax={nmax}, N={N}.')
+            data[size:size + read_line.size] = read_line
+            size += read_line.size
+
+    if size != data.size:
+        raise ValueError(f'Expected {data.size} values in {filepath} for '
+                         f'nmin={nmin}, nmax={nmax}, N={N}, found {size}.')
+
+    time = data[:N]
+    coeffs = data[N:].reshape((-1, N+2))
+
+    # check the n, m columns against the expected coefficient ordering
+    degree, order = _shc_degree_order(nmin, nmax)
+    wrong = np.flatnonzero((coeffs[:, 0] != degree)
+                           | (np.abs(coeffs[:, 1]) != order))
+    if wrong.size > 0:
+        n, m = coeffs[wrong[0], :2]
+        raise ValueError(f'Unexpected coefficient n={n:.0f}, m={m:.0f} in '
+                         f'{filepath}, expected n={degree[wrong[0]]}, '
+                         f'm={order[wrong[0]]}.')
+
+    coeffs = np.squeeze(coeffs[:, 2:])  # discard columns with n and m
 
     return igrf(time, coeffs, parameters)
 
+
+def _shc_degree_order(nmin, nmax):
+    """
+    Degree and (absolute) order of each coefficient row of an shc-file, i.e.
+    g(n,0), g(n,1), h(n,1), ..., g(n,n), h(n,n) for n from nmin to nmax.
+    """
+    degree = []
+    order = []
+    for n in range(nmin, nmax+1):
+        m = np.arange(1, n+1).repeat(2)
+        degree.append(np.full(2*n + 1, n))
+        order.append(np.concatenate(([0], m)))
+    return np.concatenate(degree), np.concatenate(order)
+
+
+# Order of the integer values on the parameter line of an shc-file
+_SHC_PARAMETER_KEYS = ['nmin', 'nmax', 'N', 'order', 'step', 'start_year',
+                       'end_year']
+
+# Index record of a binary coefficient archive, one per model. The archive
+# file holds this index as a .npy array followed by a second .npy array with
+# the time and coefficient blocks of all models stacked into one flat
+# float64 array, so that a single model can be read without any parsing.
+# The name and source path fields are sized to the longest of an archive
+# (see _archive_dtype), so that paths are never truncated.
+_ARCHIVE_DTYPE = np.dtype([('name', 'U64'), ('source', 'U256'),
+                           ('size', 'i8'), ('mtime', 'i8'),
+                           ('params', 'i8', (len(_SHC_PARAMETER_KEYS),)),
+                           ('offset', 'i8'), ('ncoeffs', 'i8')])
+
+
+def _archive_dtype(names, sources):
+    """_ARCHIVE_DTYPE with string fields wide enough for all entries."""
+    width = {'name': max(map(len, names), default=1),
+             'source': max(map(len, sources), default=1)}
+    return np.dtype([(field, f'U{max(width[field], 1)}')
+                     if field in width else (field, _ARCHIVE_DTYPE[field])
+                     for field in _ARCHIVE_DTYPE.names])
+
+
+def _shc_cache_key(filepath):
+    """Return the (path, size, mtime) key identifying a version of a file."""
+    stat = os.stat(filepath)
+    return os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns
+
+
+def _shc_cache_path(filepath, cache_dir=None):
+    """Return the location of the binary cache of an shc-file."""
+    import hashlib  # deferred, only needed with the cache
+
+    if cache_dir is None:
+        cache_dir = os.environ.get('PYIGRF_CACHE_DIR')
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)),
+                                 '__shccache__')
+    # hash the full path so that equally named files do not collide
+    tag = hashlib.sha1(os.path.abspath(filepath).encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f'{os.path.basename(filepath)}.{tag}.shcb')
+
+
+def _write_archive(archive, models, keys):
+    """Atomically write models and their source keys to a binary archive."""
+    index = np.zeros(len(models), dtype=_archive_dtype(
+        [model.parameters['SHC'] for model in models],
+        [source for source, _, _ in keys]))
+    blocks = []
+    offset = 0
+    for entry, model, (source, size, mtime) in zip(index, models, keys):
+        block = np.vstack((model.time, model.coeffs.reshape(-1, model.time.size)))
+        entry['name'] = model.parameters['SHC']
+        entry['source'] = source
+        entry['size'] = size
+        entry['mtime'] = mtime
+        entry['params'] = [model.parameters[k] for k in _SHC_PARAMETER_KEYS]
+        entry['offset'] = offset
+        entry['ncoeffs'] = block.shape[0] - 1
+        blocks.append(block.ravel())
+        offset += block.size
+
+    os.makedirs(os.path.dirname(os.path.abspath(archive)), exist_ok=True)
+    tmp = f'{archive}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            np.save(f, index, allow_pickle=False)
+            np.save(f, np.concatenate(blocks), allow_pickle=False)
+        os.replace(tmp, archive)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _read_archive(archive, name=None, key=None):
+    """
+    Read one model from a binary archive. The first model is returned if
+    ``name`` is not given. If ``key`` is given, a ValueError is raised unless
+    the model was written from that version of its source file.
+    """
+    with open(archive, 'rb') as f:
+        index = np.lib.format.read_array(f, allow_pickle=False)
+        if name is None:
+            entry = index[0]
+        else:
+            match = np.flatnonzero(index['name'] == name)
+            if match.size == 0:
+                raise KeyError(f'Model {name} not found in {archive}.')
+            entry = index[match[0]]
+
+        if key is not None and (str(entry['source']), int(entry['size']),
+                                int(entry['mtime'])) != tuple(key):
+            raise ValueError(f'Cache {archive} is out of date.')
+
+        # skip the header of the data array and read this model's block only
+        if np.lib.format.read_magic(f) == (1, 0):
+            np.lib.format.read_array_header_1_0(f)
+        else:
+            np.lib.format.read_array_header_2_0(f)
+        parameters = {'SHC': str(entry['name'])}
+        parameters.update(zip(_SHC_PARAMETER_KEYS, entry['params'].tolist()))
+        N = parameters['N']
+        f.seek(8 * int(entry['offset']), os.SEEK_CUR)
+        block = np.fromfile(f, dtype='<f8', count=(entry['ncoeffs'] + 1) * N)
+
+    block = block.reshape(-1, N)
+    return igrf(block[0], np.squeeze(block[1:]), parameters)
+
+
+def pack_shcfiles(filepaths, archive):
+    """
+    Pack several shc-files into a single binary coefficient archive.
+
+    Parameters
+    ----------
+    filepaths : list of str
+        File paths of the shc-files, e.g. all IGRF generations.
+    archive : str
+        File path of the archive to (over)write.
+
+    Returns
+    -------
+    names : list of str
+        Names under which the models are stored (the shc-file names), to be
+        passed to :func:`load_packed`.
+
+    """
+    models = [load_shcfile(filepath) for filepath in filepaths]
+    _write_archive(archive, models,
+                   [_shc_cache_key(filepath) for filepath in filepaths])
+    return [model.parameters['SHC'] for model in models]
+
+
+def load_packed(archive, name, verify=None):
+    """
+    Load a single model from an archive written by :func:`pack_shcfiles`.
+
+    Only the coefficients of the requested model are read, so loading any one
+    generation from an archive of all of them is as cheap as loading it
+    from its own cache.
+
+    Parameters
+    ----------
+    archive : str
+        File path of the archive.
+    name : str
+        Name of the model in the archive (shc-file name, e.g.
+        ``'IGRF14.SHC'``).
+    verify : {True, False}, optional
+        If ``True``, raise a ValueError if the shc-file the model was packed
+        from has been modified since (defaults to ``False``).
+
+    Returns
+    -------
+    igrf : igrf
+        Model in the same form as returned by :func:`load_shcfile`.
+
+    """
+    if verify:
+        with open(archive, 'rb') as f:
+            index = np.lib.format.read_array(f, allow_pickle=False)
+        match = np.flatnonzero(index['name'] == name)
+        if match.size == 0:
+            raise KeyError(f'Model {name} not found in {archive}.')
+        return _read_archive(archive, name,
+                             _shc_cache_key(str(index['source'][match[0]])))
+    return _read_archive(archive, name)
+
+
 def check_lat_lon_bounds(latd, latm, lond, lonm):
     
     """ Check the bounds of the given lat, long are within -90 to +90 and -180 
@@ -143,6 +515,7 @@ def check_lat_lon_bounds(latd, latm, lond, lonm):
     
     return lat, lon
 
+@ins.instrumented('gg_to_geo')
 def gg_to_geo(h, gdcolat):
     """
     Compute geocentric colatitude and radius from geodetic colatitude and
@@ -202,6 +575,7 @@ def gg_to_geo(h, gdcolat):
     return rad, thc, sd, cd
 
 
+@ins.instrumented('geo_to_gg')
 def geo_to_gg(radius, theta):
     """
     Compute geodetic colatitude and vertical height above the ellipsoid from
@@ -282,8 +656,45 @@ def geo_to_gg(radius, theta):
     return height, beta
 
 
+def _check_synth_args(theta, ncoeffs, nmax, nmin):
+    """
+    Check the colatitude bounds and return the (nmax, nmin) to synthesise
+    for ``ncoeffs`` model coefficients.
+    """
+    if np.amin(theta) <= 0.0 or np.amax(theta) >= 180.0:
+        if np.amin(theta) == 0.0 or np.amax(theta) == 180.0:
+            warnings.warn('The geographic poles are included.')
+        else:
+            raise ValueError('Colatitude outside bounds [0, 180].')
+
+    if nmin is None:
+        nmin = 1
+    else:
+        assert nmin > 0, 'Only positive nmin allowed.'
+
+    # handle optional argument: nmax
+    nmax_coeffs = int(np.sqrt(ncoeffs + 1) - 1)  # degree
+    if nmax is None:
+        nmax = nmax_coeffs
+    else:
+        assert nmax > 0, 'Only positive nmax allowed.'
+
+    if nmax > nmax_coeffs:
+        warnings.warn('Supplied nmax = {0} and nmin = {1} is '
+                      'incompatible with number of model coefficients. '
+                      'Using nmax = {2} instead.'.format(
+                        nmax, nmin, nmax_coeffs))
+        nmax = nmax_coeffs
+
+    if nmax < nmin:
+        raise ValueError(f'Nothing to compute: nmax < nmin ({nmax} < {nmin}.)')
+
+    return nmax, nmin
+
+
 def synth_values(coeffs, radius, theta, phi, \
-                 nmax=None, nmin=None, grid=None):
+                 nmax=None, nmin=None, grid=None, dedup=None, dtype=None,
+                 backend=None, gradient=None):
     """
     Based on chaosmagpy from Clemens Kloss (DTU Space, Copenhagen)
     Computes radial, colatitude and azimuthal field components from the
@@ -318,11 +729,36 @@ def synth_values(coeffs, radius, theta, phi, \
         ``theta`` and ``phi`` must have one dimension less than the output grid
         since the grid will be created as their outer product (defaults to
         ``False``).
+    dedup : bool, optional
+        If ``True``, the Legendre polynomials, cos/sin(m*phi) terms and
+        radial powers are only computed for the unique values of ``theta``,
+        ``phi`` and ``radius`` and then scattered back to all points. Useful
+        for repeated positions, e.g. along parallels or flattened grids. By
+        default this is done for each input with at most half of its values
+        unique; ``False`` never deduplicates. Results are identical either
+        way.
+    dtype : {float, np.float32}, optional
+        Floating point type of the computation and of the outputs (default
+        is float64). With ``np.float32`` memory and bandwidth are halved;
+        for the IGRF (nmax = 13) at the Earth's surface, 1900-2035, the
+        components then differ from float64 by less than 0.1 nT, D by less
+        than 0.02 degrees and I by less than 0.001 degrees (see
+        tests/tests_float32.py).
+    backend : {'numpy', 'numba'}, optional
+        Implementation of the synthesis (see :func:`get_backend`). The Numba
+        kernel handles one point at a time and agrees with NumPy to
+        rounding; ``dedup`` has no effect on it.
+    gradient : bool, optional
+        If ``True``, also return the gradient tensor of the field, computed
+        analytically in the same pass (see :func:`synth_gradient`, which
+        ignores ``dedup``, ``dtype`` and ``backend``). Defaults to ``False``.
 
     Returns
     -------
     B_radius, B_theta, B_phi : ndarray, shape (...)
         Radial, colatitude and azimuthal field components.
+    grad_B : ndarray, shape (..., 3, 3)
+        Gradient tensor in nT/km, only returned if ``gradient`` is ``True``.
 
     Notes
     -----
@@ -393,39 +829,55 @@ def synth_values(coeffs, radius, theta, phi, \
 
     """
 
-    # ensure ndarray inputs
-    coeffs = np.array(coeffs, dtype=float)
-    radius = np.array(radius, dtype=float) / 6371.2  # Earth's average radius
-    theta = np.array(theta, dtype=float)
-    phi = np.array(phi, dtype=float)
+    if gradient:
+        B, grad_B = synth_gradient(coeffs, radius, theta, phi, nmax=nmax,
+                                   nmin=nmin, grid=grid)
+        return B + (grad_B,)
 
-    if np.amin(theta) <= 0.0 or np.amax(theta) >= 180.0:
-        if np.amin(theta) == 0.0 or np.amax(theta) == 180.0:
-            warnings.warn('The geographic poles are included.')
-        else:
-            raise ValueError('Colatitude outside bounds [0, 180].')
+    return synth_values_multi((coeffs,), radius, theta, phi,
+                              nmax=nmax, nmin=nmin, grid=grid,
+                              dedup=dedup, dtype=dtype, backend=backend)[0]
 
-    if nmin is None:
-        nmin = 1
-    else:
-        assert nmin > 0, 'Only positive nmin allowed.'
 
-    # handle optional argument: nmax
-    nmax_coeffs = int(np.sqrt(coeffs.shape[-1] + 1) - 1)  # degree
-    if nmax is None:
-        nmax = nmax_coeffs
-    else:
-        assert nmax > 0, 'Only positive nmax allowed.'
+@ins.instrumented('synth_values')
+def synth_values_multi(coeffs, radius, theta, phi, \
+                       nmax=None, nmin=None, grid=None, dedup=None,
+                       dtype=None, backend=None):
+    """
+    Computes the field components of several sets of spherical harmonic
+    coefficients at the same points, e.g. main field, secular variation and
+    main field at the start of the epoch. The Legendre polynomials,
+    cos/sin(m*phi) terms and radial powers are computed once and each
+    (n, m) term is applied to all sets in a single pass.
 
-    if nmax > nmax_coeffs:
-        warnings.warn('Supplied nmax = {0} and nmin = {1} is '
-                      'incompatible with number of model coefficients. '
-                      'Using nmax = {2} instead.'.format(
-                        nmax, nmin, nmax_coeffs))
-        nmax = nmax_coeffs
+    Parameters
+    ----------
+    coeffs : sequence of ndarray, shape (..., N)
+        Coefficient arrays, each as for :func:`synth_values`. All must have
+        the same number of coefficients `N`.
+    radius, theta, phi, nmax, nmin, grid, dedup, dtype, backend :
+        As for :func:`synth_values`.
 
-    if nmax < nmin:
-        raise ValueError(f'Nothing to compute: nmax < nmin ({nmax} < {nmin}.)')
+    Returns
+    -------
+    B : list of tuple (B_radius, B_theta, B_phi)
+        Radial, colatitude and azimuthal field components for each set of
+        coefficients, identical to separate calls of :func:`synth_values`.
+
+    """
+
+    # ensure ndarray inputs
+    dtype = float if dtype is None else dtype
+    coeffs = [np.asarray(c, dtype=dtype) for c in coeffs]
+    radius = np.array(radius, dtype=dtype) / 6371.2  # Earth's average radius
+    theta = np.array(theta, dtype=dtype)
+    phi = np.array(phi, dtype=dtype)
+
+    if len({c.shape[-1] for c in coeffs}) != 1:
+        raise ValueError('All coefficient sets must have the same number of '
+                         'coefficients.')
+
+    nmax, nmin = _check_synth_args(theta, coeffs[0].shape[-1], nmax, nmin)
 
     # handle grid option
     grid = False if grid is None else grid
@@ -438,69 +890,766 @@ def synth_values(coeffs, radius, theta, phi, \
     # get shape of broadcasted result
     try:
         b = np.broadcast(radius, theta, phi,
-                         np.broadcast_to(0, coeffs.shape[:-1]))
+                         *[np.broadcast_to(0, c.shape[:-1]) for c in coeffs])
     except ValueError:
         print('Cannot broadcast grid shapes (excl. last dimension of coeffs):')
         print(f'radius: {radius.shape}')
         print(f'theta:  {theta.shape}')
         print(f'phi:    {phi.shape}')
-        print(f'coeffs: {coeffs.shape[:-1]}')
+        print(f'coeffs: {[c.shape[:-1] for c in coeffs]}')
         raise
 
     grid_shape = b.shape
 
+    backend = get_backend(backend, size=b.size)
+    if backend == 'numba':
+        return _synth_values_numba(coeffs, radius, theta, phi, grid_shape,
+                                   nmax, nmin, dtype)
+
+    # evaluate the geometry only on the unique values of each input, if
+    # worthwhile, and scatter back with the inverse indices
+    unique_radius = _unique_values(radius, dedup)
+    unique_theta = _unique_values(theta, dedup)
+    unique_phi = _unique_values(phi, dedup)
+
     # initialize radial dependence given the source
-    r_n = radius**(-(nmin+2))
+    if unique_radius is None:
+        r_n = radius**(-(nmin+2))
+    else:
+        radius_u, radius_inv = unique_radius
+        r_n_u = radius_u**(-(nmin+2))
+        r_n = r_n_u[radius_inv]
 
     # compute associated Legendre polynomials as (n, m, theta-points)-array
-    Pnm = legendre_poly(nmax, theta)
-
-    # save sinth for fast access
-    sinth = Pnm[1, 1]
+    if unique_theta is None:
+        Pnm = legendre_poly(nmax, theta, dtype=dtype, backend=backend)
+    else:
+        Pnm = np.take(legendre_poly(nmax, unique_theta[0], dtype=dtype,
+                                    backend=backend),
+                      unique_theta[1], axis=-1)
+
+    # save sinth for fast access, with the poles set to one so that
+    # P(n,m)/sin(theta) needs no special casing in the loop below. By
+    # L'Hopital's rule its limit at the poles is +/-dP(n,m), which vanishes
+    # unless m = 1 (P(n,m) goes as sin(theta)**m), so that the limits are
+    # added for m = 1 only, with pole_sign +1 at the north pole, -1 at the
+    # south pole and 0 elsewhere
+    north = theta == 0.
+    south = theta == degrees(pi)
+    poles = np.any(north) or np.any(south)
+    if poles:
+        sinth = np.where(north | south, 1., Pnm[1, 1])
+        pole_sign = np.where(north, 1., np.where(south, -1., 0.))
+    else:
+        sinth = Pnm[1, 1]
 
     # calculate cos(m*phi) and sin(m*phi) as (m, phi-points)-array
-    phi = radians(phi)
-    cmp = np.cos(np.multiply.outer(np.arange(nmax+1), phi))
-    smp = np.sin(np.multiply.outer(np.arange(nmax+1), phi))
+    if unique_phi is None:
+        cmp, smp = trig_terms(nmax, phi, dtype=dtype)
+    else:
+        cmp, smp = trig_terms(nmax, unique_phi[0], dtype=dtype)
+        cmp = np.take(cmp, unique_phi[1], axis=1)
+        smp = np.take(smp, unique_phi[1], axis=1)
 
     # allocate arrays in memory
-    B_radius = np.zeros(grid_shape)
-    B_theta = np.zeros(grid_shape)
-    B_phi = np.zeros(grid_shape)
+    B_radius = [np.zeros(grid_shape, dtype=dtype) for c in coeffs]
+    B_theta = [np.zeros(grid_shape, dtype=dtype) for c in coeffs]
+    B_phi = [np.zeros(grid_shape, dtype=dtype) for c in coeffs]
+    nsets = range(len(coeffs))
 
     num = nmin**2 - 1
     for n in range(nmin, nmax+1):
-        B_radius += (n+1) * Pnm[n, 0] * r_n * coeffs[..., num]
+        # geometric factors shared by all sets of coefficients
+        fac_radius = (n+1) * Pnm[n, 0] * r_n
+        fac_theta = -Pnm[0, n+1] * r_n
+        for k in nsets:
+            B_radius[k] += fac_radius * coeffs[k][..., num]
 
-        B_theta += -Pnm[0, n+1] * r_n * coeffs[..., num]
+            B_theta[k] += fac_theta * coeffs[k][..., num]
 
         num += 1
 
         for m in range(1, n+1):
-            B_radius += ((n+1) * Pnm[n, m] * r_n
-                             * (coeffs[..., num] * cmp[m]
-                                + coeffs[..., num+1] * smp[m]))
-            
-            B_theta += (-Pnm[m, n+1] * r_n
-                        * (coeffs[..., num] * cmp[m]
-                           + coeffs[..., num+1] * smp[m]))
-
-            with np.errstate(divide='ignore', invalid='ignore'):
-                # handle poles using L'Hopital's rule
-                div_Pnm = np.where(theta == 0., Pnm[m, n+1], Pnm[n, m] / sinth)
-                div_Pnm = np.where(theta == degrees(pi), -Pnm[m, n+1], div_Pnm)
-
-            B_phi += (m * div_Pnm * r_n
-                      * (coeffs[..., num] * smp[m]
-                         - coeffs[..., num+1] * cmp[m]))
+            fac_radius = (n+1) * Pnm[n, m] * r_n
+            fac_theta = -Pnm[m, n+1] * r_n
+
+            div_Pnm = Pnm[n, m] / sinth
+            if poles and m == 1:
+                div_Pnm = div_Pnm + pole_sign * Pnm[1, n+1]
+
+            fac_phi = m * div_Pnm * r_n
+
+            for k in nsets:
+                g_nm = coeffs[k][..., num]
+                h_nm = coeffs[k][..., num+1]
+
+                B_radius[k] += fac_radius * (g_nm * cmp[m] + h_nm * smp[m])
+
+                B_theta[k] += fac_theta * (g_nm * cmp[m] + h_nm * smp[m])
+
+                B_phi[k] += fac_phi * (g_nm * smp[m] - h_nm * cmp[m])
 
             num += 2
 
-        r_n = r_n / radius  # equivalent to r_n = radius**(-(n+2))
+        # equivalent to r_n = radius**(-(n+2))
+        if unique_radius is None:
+            r_n = r_n / radius
+        else:
+            r_n_u = r_n_u / radius_u
+            r_n = r_n_u[radius_inv]
  
-    return B_radius, B_theta, B_phi
+    return list(zip(B_radius, B_theta, B_phi))
+
+
+@ins.instrumented('synth_gradient')
+def synth_gradient(coeffs, radius, theta, phi, nmax=None, nmin=None, \
+                   grid=None):
+    """
+    Computes the field components and their gradient tensor analytically, in
+    one pass over the spherical harmonic terms.
+
+    The derivatives of each term follow from the same P(n,m), dP(n,m) and
+    cos/sin(m*phi) as the field itself, and the second derivative in theta
+    from the associated Legendre equation,
+    d2P(n,m) = -cot(theta) dP(n,m) - (n(n+1) - m^2/sin^2(theta)) P(n,m).
+    This costs about one call of :func:`synth_values` (NumPy backend),
+    instead of six more calls for central finite differences, and is exact
+    up to rounding.
+
+    Parameters
+    ----------
+    coeffs, radius, theta, phi, nmax, nmin, grid :
+        As for :func:`synth_values`.
+
+    Returns
+    -------
+    B : tuple (B_radius, B_theta, B_phi) of ndarray, shape (...)
+        Field components, as returned by :func:`synth_values`.
+    grad_B : ndarray, shape (..., 3, 3)
+        Gradient tensor in nT/km in the local (radius, theta, phi) frame,
+        ``grad_B[..., i, j]`` the derivative of component `j` along
+        direction `i`, including the terms of the rotation of the frame. It
+        is symmetric and traceless (a potential field). NaN at the
+        geographic poles, where the theta and phi directions are undefined.
+
+    """
+
+    coeffs = np.asarray(coeffs, dtype=float)
+    radius = np.array(radius, dtype=float) / 6371.2  # Earth's average radius
+    theta = np.array(theta, dtype=float)
+    phi = np.array(phi, dtype=float)
+
+    nmax, nmin = _check_synth_args(theta, coeffs.shape[-1], nmax, nmin)
+
+    if grid:
+        theta = theta[..., None]  # first dimension is theta
+        phi = phi[None, ...]  # second dimension is phi
+
+    grid_shape = np.broadcast(radius, theta, phi,
+                              np.broadcast_to(0, coeffs.shape[:-1])).shape
+
+    Pnm = legendre_poly(nmax, theta, dtype=float, backend='numpy')
+
+    # sin(theta) and cot(theta), NaN at the poles where the frame is
+    # undefined; B_phi takes its limit there as in synth_values
+    north = theta == 0.
+    south = theta == degrees(pi)
+    sinth = np.where(north | south, np.nan, Pnm[1, 1])
+    cotth = np.cos(radians(theta)) / sinth
+
+    cmp, smp = trig_terms(nmax, phi)
+
+    # sums over the terms of the field components (B_*), their derivatives
+    # in radius (dr_*) and theta (dt_*) and azimuth (dp_*), in units of the
+    # Earth's average radius and without the sin(theta) of the phi
+    # derivative
+    B_radius, B_theta, B_phi, B_phi_pole = (np.zeros(grid_shape)
+                                            for _ in range(4))
+    dr_radius, dr_theta, dr_phi = (np.zeros(grid_shape) for _ in range(3))
+    dt_radius, dt_theta, dt_phi = (np.zeros(grid_shape) for _ in range(3))
+    dp_radius, dp_theta, dp_phi = (np.zeros(grid_shape) for _ in range(3))
+
+    r_n = radius**(-(nmin+2))
+    num = nmin**2 - 1
+    for n in range(nmin, nmax+1):
+        # sums over the orders m of T = g cos(m phi) + h sin(m phi) and
+        # U = m (g sin(m phi) - h cos(m phi)) times P(n,m), dP(n,m)
+        T = coeffs[..., num]
+        T_P = T * Pnm[n, 0]
+        T_dP = T * Pnm[0, n+1]
+        U_P = U_dP = m2_T_P = 0.
+        num += 1
+
+        for m in range(1, n+1):
+            g_nm = coeffs[..., num]
+            h_nm = coeffs[..., num+1]
+            T = g_nm * cmp[m] + h_nm * smp[m]
+            U = m * (g_nm * smp[m] - h_nm * cmp[m])
+
+            T_P = T_P + T * Pnm[n, m]
+            T_dP = T_dP + T * Pnm[m, n+1]
+            U_P = U_P + U * Pnm[n, m]
+            U_dP = U_dP + U * Pnm[m, n+1]
+            m2_T_P = m2_T_P + m * m * T * Pnm[n, m]
+
+            num += 2
+
+        T_d2P = -cotth * T_dP - n * (n+1) * T_P + m2_T_P / sinth**2
+
+        B_radius += (n+1) * r_n * T_P
+        B_theta -= r_n * T_dP
+        B_phi += r_n * U_P / sinth
+        B_phi_pole += r_n * U_dP
+
+        dr_radius -= (n+1) * (n+2) * r_n * T_P
+        dr_theta += (n+2) * r_n * T_dP
+        dr_phi -= (n+2) * r_n * U_P / sinth
+
+        dt_radius += (n+1) * r_n * T_dP
+        dt_theta -= r_n * T_d2P
+        dt_phi += r_n * (U_dP - cotth * U_P) / sinth
+
+        dp_radius -= (n+1) * r_n * U_P
+        dp_theta += r_n * U_dP
+        dp_phi += r_n * m2_T_P / sinth
+
+        r_n = r_n / radius
+
+    B_phi = np.where(north, B_phi_pole, np.where(south, -B_phi_pole, B_phi))
+
+    # derivatives per km (the sums above are of radius**-(n+3)) and the
+    # terms of the rotation of the local frame
+    r = radius * 6371.2
+    grad_B = np.empty(grid_shape + (3, 3))
+    grad_B[..., 0, 0] = dr_radius / r
+    grad_B[..., 0, 1] = dr_theta / r
+    grad_B[..., 0, 2] = dr_phi / r
+    grad_B[..., 1, 0] = (dt_radius - B_theta) / r
+    grad_B[..., 1, 1] = (dt_theta + B_radius) / r
+    grad_B[..., 1, 2] = dt_phi / r
+    grad_B[..., 2, 0] = (dp_radius / sinth - B_phi) / r
+    grad_B[..., 2, 1] = (dp_theta / sinth - B_phi * cotth) / r
+    grad_B[..., 2, 2] = (dp_phi / sinth + B_radius + B_theta * cotth) / r
+    grad_B[np.broadcast_to(north | south, grid_shape)] = np.nan
+
+    return (B_radius, B_theta, B_phi), grad_B
+
+
+def trig_terms(nmax, phi, dtype=None):
+    """
+    Returns cos(m*phi) and sin(m*phi) for m = 0, ..., nmax.
+
+    Only cos(phi) and sin(phi) are evaluated, the higher orders follow from
+    the angle-addition recurrence
+    cos((m+1)phi) = cos(m phi) cos(phi) - sin(m phi) sin(phi) and
+    sin((m+1)phi) = sin(m phi) cos(phi) + cos(m phi) sin(phi),
+    two transcendental calls per point instead of 2(nmax+1). The rounding
+    error grows by about one ulp per order.
+
+    Parameters
+    ----------
+    nmax : int
+        Maximum order.
+    phi : float or ndarray, shape (...)
+        Longitudes in degrees.
+    dtype : {float, np.float32}, optional
+        Floating point type of the computation (default is float64).
+
+    Returns
+    -------
+    cmp, smp : ndarray, shape (nmax+1, ...)
+        cos(m*phi) and sin(m*phi).
+
+    """
+    dtype = float if dtype is None else dtype
+    phi = radians(np.asarray(phi, dtype=dtype))
+    cmp = np.empty((nmax+1,) + phi.shape, dtype=phi.dtype)
+    smp = np.empty((nmax+1,) + phi.shape, dtype=phi.dtype)
+    cmp[0] = 1.
+    smp[0] = 0.
+    if nmax > 0:
+        cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+        cmp[1] = cos_phi
+        smp[1] = sin_phi
+        for m in range(1, nmax):
+            cmp[m+1] = cmp[m] * cos_phi - smp[m] * sin_phi
+            smp[m+1] = smp[m] * cos_phi + cmp[m] * sin_phi
+    return cmp, smp
+
+
+def get_backend(backend=None, size=None):
+    """
+    Resolve the implementation of the synthesis: ``backend`` if given,
+    otherwise the environment variable ``PYIGRF_BACKEND`` if set, otherwise
+    ``'numba'`` if Numba is installed and ``'numpy'`` if not.
+
+    Given the ``size`` (number of points) of a synthesis, the default is
+    ``'numpy'`` below NUMBA_MIN_SIZE points, where loading Numba would
+    cost more than it saves, so that small computations such as those of
+    pyIGRF.py start quickly. The choice only depends on the arguments and
+    the environment. Functions synthesising one request in several chunks
+    or threads (:func:`synth_values_chunked`, igrf_batch.synth_records,
+    trajectory.synth_track) resolve the backend once from the total size,
+    so that their chunks never mix backends.
+    """
+    if backend is None:
+        backend = os.environ.get('PYIGRF_BACKEND') or None
+    if backend is None:
+        backend = 'numba' if HAVE_NUMBA else 'numpy'
+        if size is not None and size < NUMBA_MIN_SIZE:
+            backend = 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend}, choose from '
+                         f'{BACKENDS}.')
+    if backend == 'numba' and not HAVE_NUMBA:
+        raise ValueError('The numba backend requires Numba to be installed.')
+    return backend
+
+
+def warm_up(backend=None):
+    """
+    Load the kernels of the synthesis backend now (compiling them if not
+    cached), e.g. when starting a service, rather than on the first
+    synthesis running on them (pass the resolved backend, e.g.
+    ``get_backend()``, to run small syntheses on them too).
+    """
+    if get_backend(backend) == 'numba':
+        legendre_poly(1, 90., backend='numba')
+        synth_values(np.zeros(3), 6371.2, 90., 0., backend='numba')
+
+
+def _synth_values_numba(coeffs, radius, theta, phi, grid_shape, nmax, nmin,
+                        dtype):
+    """synth_values_multi on the compiled point kernel of igrf_numba."""
+    import igrf_numba
+
+    radius, theta, phi = (
+        np.ascontiguousarray(np.broadcast_to(x, grid_shape)).reshape(-1)
+        for x in (radius, theta, phi))
+
+    # rows of coefficients of each set and the row used at each point
+    ncoeffs = coeffs[0].shape[-1]
+    rows = tuple(np.ascontiguousarray(c.reshape(-1, ncoeffs)) for c in coeffs)
+    index = np.zeros((len(rows), theta.size), dtype=np.intp)
+    for k, (c, r) in enumerate(zip(coeffs, rows)):
+        if len(r) > 1:
+            index[k] = np.broadcast_to(np.arange(len(r)).reshape(
+                c.shape[:-1]), grid_shape).reshape(-1)
+
+    out = np.empty((len(rows), 3, theta.size), dtype=dtype)
+    igrf_numba.synth_values(nmax, nmin, radius, theta, phi, rows, index,
+                            _legendre_rootn(nmax), out)
+    return [tuple(B.reshape(grid_shape) for B in B_set) for B_set in out]
+
+
+# Minimum size of an input array for synth_values to consider evaluating the
+# geometry on its unique values only, the largest fraction of unique values
+# for which this is done automatically and the size of the sample first
+# checked for repeated values
+_DEDUP_MIN_SIZE = 64
+_DEDUP_MAX_RATIO = 0.5
+_DEDUP_SAMPLE_SIZE = 256
+
+
+def _unique_values(values, dedup):
+    """
+    Unique values and inverse indices (shaped as ``values``) of an input of
+    synth_values if deduplication is requested (``dedup=True``) or, by
+    default, worthwhile; otherwise None.
+    """
+    if dedup is False or values.size < (1 if dedup else _DEDUP_MIN_SIZE):
+        return None
+    shape = values.shape
+    values = values.ravel()
+    if not dedup and values.size > 2*_DEDUP_SAMPLE_SIZE:
+        # skip sorting scattered inputs: repeated values show up in a random
+        # sample (a strided one can alias with the rows of a flattened grid
+        # and miss them), seeded for reproducible choices
+        index = np.random.default_rng(values.size).integers(
+            0, values.size, _DEDUP_SAMPLE_SIZE)
+        if np.unique(values[index]).size == np.unique(index).size:
+            return None
+    unique, inverse = np.unique(values, return_inverse=True)
+    if not dedup and unique.size > _DEDUP_MAX_RATIO * values.size:
+        return None
+    return unique, inverse.reshape(shape)
+
+
+def synth_values_chunked(coeffs, radius, theta, phi, nmax=None, nmin=None, \
+                         grid=None, dedup=None, dtype=None, chunk_size=None,
+                         max_memory=None, out=None, workers=None,
+                         backend=None):
+    """
+    Computes the field components as :func:`synth_values`, one chunk of
+    points at a time, so that the working memory stays bounded whatever the
+    number of points.
+
+    The broadcast grid of points is split into chunks which are synthesised
+    in turn and written into preallocated (or given) outputs. Only the
+    Legendre polynomials and trig terms of one chunk per worker are held in
+    memory. The NumPy arithmetic releases the GIL, so with several
+    ``workers`` the chunks are synthesised in parallel threads, writing
+    into the shared outputs.
+
+    Parameters
+    ----------
+    coeffs, radius, theta, phi, nmax, nmin, grid, dedup, dtype :
+        As for :func:`synth_values`.
+    chunk_size : int, optional
+        Number of points per chunk (default is derived from
+        ``max_memory``).
+    max_memory : int, optional
+        Bound in bytes on the working memory of all workers, excluding the
+        outputs (default is 256 MB). Ignored if ``chunk_size`` is given.
+    out : tuple of ndarray, optional
+        C-contiguous arrays of the broadcast shape (e.g. memory maps) into
+        which B_radius, B_theta and B_phi are written.
+    workers : int, optional
+        Number of threads synthesising chunks in parallel, e.g.
+        ``os.cpu_count()`` (default is 1).
+    backend : {'numpy', 'numba'}, optional
+        Implementation of the synthesis, resolved once for all chunks from
+        the total number of points (see :func:`get_backend`).
+
+    Returns
+    -------
+    B_radius, B_theta, B_phi : ndarray, shape (...)
+        Radial, colatitude and azimuthal field components, identical to
+        those of :func:`synth_values`.
+
+    """
+    dtype = np.dtype(float if dtype is None else dtype)
+    coeffs = np.asarray(coeffs)
+    radius = np.asarray(radius)
+    theta = np.asarray(theta)
+    phi = np.asarray(phi)
+
+    nmax, nmin = _check_synth_args(theta, coeffs.shape[-1], nmax, nmin)
+
+    if grid:
+        theta = theta[..., None]
+        phi = phi[None, ...]
+    shape = np.broadcast_shapes(radius.shape, theta.shape, phi.shape,
+                                coeffs.shape[:-1])
+    npoints = int(np.prod(shape))
+    workers = 1 if workers is None else int(workers)
+    backend = get_backend(backend, size=npoints)
+
+    if chunk_size is None:
+        max_memory = _CHUNK_MAX_MEMORY if max_memory is None else max_memory
+        per_point = _synth_point_bytes(nmax, coeffs.shape[-1],
+                                       coeffs.ndim > 1, dtype.itemsize)
+        chunk_size = max_memory // (per_point * workers)
+        if workers > 1:
+            # several chunks per worker to balance the load
+            chunk_size = min(chunk_size, -(-npoints // (4*workers)))
+    chunk_size = max(int(chunk_size), 1)
+
+    if out is None:
+        out = tuple(np.empty(shape, dtype=dtype) for _ in range(3))
+    else:
+        for o in out:
+            if o.shape != shape or not o.flags.c_contiguous:
+                raise ValueError(f'Outputs must be C-contiguous arrays of '
+                                 f'shape {shape}.')
+    out_flat = [o.reshape(-1) for o in out]
+
+    # views of the inputs on the full grid, no memory is allocated here
+    radius, theta, phi = (np.broadcast_to(x, shape)
+                          for x in (radius, theta, phi))
+    if coeffs.ndim > 1:
+        coeffs = np.broadcast_to(coeffs, shape + coeffs.shape[-1:])
+
+    def synth_chunk(start):
+        stop = min(start + chunk_size, npoints)
+        index = np.unravel_index(np.arange(start, stop), shape)
+        B = synth_values(coeffs[index] if coeffs.ndim > 1 else coeffs,
+                         radius[index], theta[index], phi[index],
+                         nmax=nmax, nmin=nmin, dedup=dedup, dtype=dtype,
+                         backend=backend)
+        for o, b in zip(out_flat, B):
+            o[start:stop] = b
+
+    starts = range(0, npoints, chunk_size)
+    if workers > 1 and len(starts) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(synth_chunk, starts))
+    else:
+        for start in starts:
+            synth_chunk(start)
+
+    return tuple(out)
+
+
+# Default bound on the working memory of synth_values_chunked (bytes)
+_CHUNK_MAX_MEMORY = 256 * 2**20
+
+
+def _synth_point_bytes(nmax, ncoeffs, varying_coeffs, itemsize):
+    """
+    Estimate of the working memory per point of synth_values: Legendre
+    polynomials, trig terms, inputs, outputs and temporaries of the loop,
+    plus the coefficients if they vary from point to point.
+    """
+    nvalues = (nmax+1)*(nmax+2) + 2*(nmax+1) + 40
+    if varying_coeffs:
+        nvalues += ncoeffs
+    return nvalues * itemsize
+
+
+@ins.instrumented('synth_grid')
+def synth_grid(coeffs, radius, theta, phi, nmax=None, nmin=None, \
+               method=None):
+    """
+    Computes radial, colatitude and azimuthal field components on a regular
+    grid of colatitudes and longitudes, separating the two directions.
+
+    The sum over degrees is first collapsed, per colatitude, into the
+    coefficients of a Fourier series in longitude of order `m`, which is then
+    evaluated at all longitudes by a matrix product (or an FFT if the
+    longitudes are equally spaced around the full circle). This costs
+    O(nmax^2 Ntheta + nmax Ntheta Nphi) instead of O(nmax^2 Ntheta Nphi) for
+    ``synth_values(..., grid=True)``, with the same results up to rounding.
+
+    Parameters
+    ----------
+    coeffs : ndarray, shape (..., N)
+        Coefficients of the spherical harmonic expansion. Leading dimensions
+        are independent sets of coefficients (e.g. main field and secular
+        variation), all evaluated on the same grid.
+    radius : float or ndarray, shape (Ntheta, 1)
+        Radius in kilometers, constant or depending on colatitude only (e.g.
+        a geodetic grid at constant altitude).
+    theta : ndarray, shape (Ntheta,)
+        Colatitudes of the grid in degrees :math:`[0^\\circ,180^\\circ]`.
+    phi : ndarray, shape (Nphi,)
+        Longitudes of the grid in degrees.
+    nmax, nmin : int, positive, optional
+        As for :func:`synth_values`.
+    method : {'matmul', 'fft'}, optional
+        Evaluation of the Fourier series in longitude. The FFT requires
+        equally spaced longitudes covering 360 degrees, more than twice
+        ``nmax`` of them. Defaults to the FFT where possible for high degree
+        models, where it is faster, and the matrix product otherwise.
+
+    Returns
+    -------
+    B_radius, B_theta, B_phi : ndarray, shape (..., Ntheta, Nphi)
+        Radial, colatitude and azimuthal field components, as returned by
+        ``synth_values(coeffs, radius, theta, phi, grid=True)`` for a single
+        set of coefficients.
+
+    """
+    coeffs = np.array(coeffs, dtype=float)
+    theta = np.array(theta, dtype=float).reshape(-1)
+    phi = np.array(phi, dtype=float).reshape(-1)
+    radius = np.array(radius, dtype=float) / 6371.2  # Earth's average radius
+    radius = np.broadcast_to(radius, (theta.size, 1))[:, 0]
+
+    nmax, nmin = _check_synth_args(theta, coeffs.shape[-1], nmax, nmin)
+
+    if method is None:
+        method = 'fft' if (nmax >= _FFT_MIN_NMAX
+                           and _is_full_circle(phi, nmax)) else 'matmul'
+    elif method == 'fft' and not _is_full_circle(phi, nmax):
+        raise ValueError('The FFT requires more than 2*nmax equally spaced '
+                         'longitudes covering 360 degrees.')
+    elif method not in ('matmul', 'fft'):
+        raise ValueError(f'Unknown method {method}.')
+
+    # Gauss coefficients g(n,m) and h(n,m) as (..., n, m)-arrays
+    degree, order = _shc_degree_order(1, nmax)
+    is_h = np.concatenate(([False], order[1:] == order[:-1]))
+    used = degree >= nmin
+    g = np.zeros(coeffs.shape[:-1] + (nmax+1, nmax+1))
+    h = np.zeros(coeffs.shape[:-1] + (nmax+1, nmax+1))
+    g[..., degree[used & ~is_h], order[used & ~is_h]] = \
+        coeffs[..., :degree.size][..., used & ~is_h]
+    h[..., degree[used & is_h], order[used & is_h]] = \
+        coeffs[..., :degree.size][..., used & is_h]
+
+    # P(n,m), dP(n,m) and P(n,m)/sin(theta) as (n, m, theta)-arrays, zero
+    # for m > n
+    Pnm = legendre_poly(nmax, theta)
+    lower = np.tril(np.ones((nmax+1, nmax+1), dtype=bool))[..., None]
+    P = np.where(lower, Pnm[:, :nmax+1], 0.)
+    dP = np.where(lower, np.swapaxes(Pnm[:, 1:], 0, 1), 0.)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # handle poles using L'Hopital's rule
+        div_P = np.where(theta == 0., dP, P / Pnm[1, 1])
+        div_P = np.where(theta == degrees(pi), -dP, div_P)
+
+    n = np.arange(nmax+1)[:, None, None]
+    m = np.arange(nmax+1)[None, :, None]
+    r_n = radius ** -(n+2)  # (n, 1, theta)
+
+    # sum over degrees: cos(m*phi) and sin(m*phi) coefficients of each
+    # component per colatitude as (..., m, theta)-arrays
+    B = []
+    for weights, is_phi in (((n+1) * r_n * P, False),
+                            (-r_n * dP, False),
+                            (m * r_n * div_P, True)):
+        a = np.einsum('...nm,nmt->...mt', g, weights)
+        b = np.einsum('...nm,nmt->...mt', h, weights)
+        if is_phi:
+            a, b = -b, a  # B_phi goes with g*sin(m*phi) - h*cos(m*phi)
+        B.append(_synth_fourier(a, b, phi, method))
+
+    return tuple(B)
+
+
+# Degree from which synth_grid evaluates full circles of longitude by FFT
+_FFT_MIN_NMAX = 100
+
+
+def _is_full_circle(phi, nmax):
+    """Longitudes equally spaced over 360 degrees, enough for an FFT."""
+    if phi.size <= 2*nmax:
+        return False
+    return np.allclose(np.diff(phi), 360. / phi.size, rtol=0., atol=1e-9)
+
+
+def _synth_fourier(a, b, phi, method):
+    """
+    Evaluate sum_m a(m) cos(m*phi) + b(m) sin(m*phi) at the longitudes, for
+    coefficient arrays of shape (..., m, theta); returns (..., theta, phi).
+    """
+    if method == 'fft':
+        M = a.shape[-2]
+        K = phi.size
+        X = np.zeros(a.shape[:-2] + (a.shape[-1], K//2 + 1), dtype=complex)
+        shift = np.exp(1j * np.arange(M) * radians(phi[0]))
+        X[..., :M] = np.swapaxes(a - 1j*b, -1, -2) * shift * (K / 2)
+        X[..., 0] = np.swapaxes(a, -1, -2)[..., 0] * K
+        return np.fft.irfft(X, n=K, axis=-1)
+
+    mphi = np.multiply.outer(np.arange(a.shape[-2]), radians(phi))
+    trig = np.concatenate((np.cos(mphi), np.sin(mphi)))
+    return np.swapaxes(np.concatenate((a, b), axis=-2), -1, -2) @ trig
+
+
+class SynthBasis:
+    """
+    Design matrices of the field components at a fixed set of points, for
+    repeated synthesis of many sets of coefficients (e.g. dates or IGRF
+    generations) at the same locations.
+
+    The Legendre polynomials, cos/sin(m*phi) terms and radial powers are
+    computed once; the field of any set of coefficients is then a single
+    matrix product.
+
+    Parameters
+    ----------
+    radius, theta, phi : float or ndarray, shape (...)
+        Geocentric position, as for :func:`synth_values`.
+    nmax : int, positive
+        Maximum degree of the synthesis.
+    nmin : int, positive, optional
+        Minimum degree of the synthesis (default is 1).
+    grid : {False, True}, optional
+        As for :func:`synth_values`.
+
+    Attributes
+    ----------
+    shape : tuple
+        Broadcast shape of the points.
+    G_radius, G_theta, G_phi : ndarray, shape (nmax(nmax+2), npoints)
+        Field components of each coefficient at each (flattened) point.
+
+    Examples
+    --------
+    .. code-block:: python
+
+      basis = iut.SynthBasis(radius, theta, phi, nmax=13)
+      coeffs, _ = igrf.interpolate(dates)  # shape (Ndates, N)
+      B_radius, B_theta, B_phi = basis.synth(coeffs)  # (Ndates, ...)
 
-def legendre_poly(nmax, theta):
+    """
+
+    @ins.instrumented('SynthBasis')
+    def __init__(self, radius, theta, phi, nmax, nmin=None, grid=None):
+        radius = np.array(radius, dtype=float) / 6371.2
+        theta = np.array(theta, dtype=float)
+        phi = np.array(phi, dtype=float)
+
+        nmax, nmin = _check_synth_args(theta, nmax*(nmax+2), nmax, nmin)
+
+        if grid:
+            theta = theta[..., None]
+            phi = phi[None, ...]
+
+        self.shape = np.broadcast_shapes(radius.shape, theta.shape, phi.shape)
+        self.nmax = nmax
+        self.nmin = nmin
+
+        radius, theta, phi = (np.broadcast_to(x, self.shape).ravel()
+                              for x in (radius, theta, phi))
+
+        Pnm = legendre_poly(nmax, theta)
+        degree, order = _shc_degree_order(1, nmax)
+        is_h = np.concatenate(([False], order[1:] == order[:-1]))[:, None]
+        n = degree[:, None]
+        m = order[:, None]
+
+        P = Pnm[degree, order]
+        dP = Pnm[order, degree+1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # handle poles using L'Hopital's rule
+            div_P = np.where(theta == 0., dP, P / Pnm[1, 1])
+            div_P = np.where(theta == degrees(pi), -dP, div_P)
+
+        cmp, smp = trig_terms(nmax, phi)
+        cmp = cmp[order]
+        smp = smp[order]
+        r_n = radius ** -(n+2.)
+        r_n[n[:, 0] < nmin] = 0.  # exclude degrees below nmin
+
+        trig = np.where(is_h, smp, cmp)
+        self.G_radius = (n+1) * P * r_n * trig
+        self.G_theta = -dP * r_n * trig
+        self.G_phi = m * div_P * r_n * np.where(is_h, -cmp, smp)
+
+    @ins.instrumented('SynthBasis.synth')
+    def synth(self, coeffs):
+        """
+        Field components of one or several sets of coefficients.
+
+        Parameters
+        ----------
+        coeffs : ndarray, shape (..., N)
+            Coefficients, leading dimensions are independent sets evaluated
+            at all points. Coefficients beyond degree `nmax` are ignored.
+
+        Returns
+        -------
+        B_radius, B_theta, B_phi : ndarray, shape (..., *shape)
+            Radial, colatitude and azimuthal field components.
+
+        """
+        coeffs = np.array(coeffs, dtype=float)
+        ncoeffs = self.G_radius.shape[0]
+        if coeffs.shape[-1] < ncoeffs:
+            raise ValueError(f'Expected at least {ncoeffs} coefficients for '
+                             f'nmax = {self.nmax}, got {coeffs.shape[-1]}.')
+        coeffs = coeffs[..., :ncoeffs]
+        shape = coeffs.shape[:-1] + self.shape
+        return tuple((coeffs @ G).reshape(shape)
+                     for G in (self.G_radius, self.G_theta, self.G_phi))
+
+    def elements(self, coeffs, coeffs_sv, coeffs_start, sd=None, cd=None):
+        """
+        All fourteen geomagnetic elements, as returned by
+        :func:`synth_elements`, with the same coefficient arguments.
+        """
+        return field_elements(self.synth(coeffs), self.synth(coeffs_sv),
+                               self.synth(coeffs_start), sd, cd)
+
+
+@ins.instrumented('legendre_poly', points=lambda nmax, theta, *args,
+                  **kwargs: np.size(theta))
+def legendre_poly(nmax, theta, dtype=None, backend=None):
     """
     Returns associated Legendre polynomials `P(n,m)` (Schmidt quasi-normalized)
     and the derivative :math:`dP(n,m)/d\\theta` evaluated at :math:`\\theta`.
@@ -512,6 +1661,11 @@ def legendre_poly(nmax, theta):
     theta : ndarray, shape (...)
         Colatitude in degrees :math:`[0^\\circ, 180^\\circ]`
         of arbitrary shape.
+    dtype : {float, np.float32}, optional
+        Floating point type of the output (default is float64).
+    backend : {'numpy', 'numba'}, optional
+        Implementation (see :func:`get_backend`), with identical results in
+        float64.
 
     Returns
     -------
@@ -524,45 +1678,129 @@ def legendre_poly(nmax, theta):
 
     costh = np.cos(radians(theta))
     sinth = np.sqrt(1-costh**2)
+    grid_shape = costh.shape
+    # work on flat (n, m, points)-arrays, rounded to dtype only after the
+    # cancellation in sinth near the poles
+    dtype = np.dtype(float if dtype is None else dtype)
+    costh = costh.reshape(-1).astype(dtype, copy=False)
+    sinth = sinth.reshape(-1).astype(dtype, copy=False)
+
+    Pnm = np.zeros((nmax+1, nmax+2) + costh.shape, dtype=dtype)
+
+    if get_backend(backend, size=costh.size) == 'numba':
+        import igrf_numba
+
+        igrf_numba.legendre_poly(nmax, costh, sinth, _legendre_rootn(nmax),
+                                 Pnm)
+        return Pnm.reshape((nmax+1, nmax+2) + grid_shape)
+
+    # the recursion is vectorised over the orders, so work on blocks of
+    # points to keep the temporaries of large grids small
+    for start in range(0, max(costh.size, 1), _LEGENDRE_BLOCK_SIZE):
+        points = slice(start, start + _LEGENDRE_BLOCK_SIZE)
+        _legendre_block(nmax, costh[points], sinth[points], Pnm[..., points])
+
+    return Pnm.reshape((nmax+1, nmax+2) + grid_shape)
+
+
+# Number of points per block of legendre_poly
+_LEGENDRE_BLOCK_SIZE = 8192
+
+
+def _legendre_block(nmax, costh, sinth, Pnm):
+    """Fill ``Pnm``, shape (nmax+1, nmax+2, points), for a block of points."""
+    tab = _legendre_tables(nmax, Pnm.dtype)
 
-    Pnm = np.zeros((nmax+1, nmax+2) + costh.shape)
     Pnm[0, 0] = 1  # is copied into trailing dimenions
     Pnm[1, 1] = sinth  # write theta into trailing dimenions via broadcasting
 
-    rootn = np.sqrt(np.arange(2 * nmax**2 + 1))
-
     # Recursion relations after Langel "The Main Field" (1987),
-    # eq. (27) and Table 2 (p. 256)
-    for m in range(nmax):
-        Pnm_tmp = rootn[m+m+1] * Pnm[m, m]
-        Pnm[m+1, m] = costh * Pnm_tmp
+    # eq. (27) and Table 2 (p. 256). First the sectoral terms P(m,m), which
+    # depend on each other, then P(m+1,m) for all orders at once
+    for m in range(1, nmax):
+        Pnm[m+1, m+1] = sinth*(tab.sect_a[m] * Pnm[m, m]) / tab.sect_b[m]
 
-        if m > 0:
-            Pnm[m+1, m+1] = sinth*Pnm_tmp / rootn[m+m+2]
+    m = tab.orders
+    Pnm[m+1, m] = costh * (tab.sect_a[:, None] * Pnm[m, m])
 
-        for n in np.arange(m+2, nmax+1):
-            d = n * n - m * m
-            e = n + n - 1
-            Pnm[n, m] = ((e * costh * Pnm[n-1, m] - rootn[d-e] * Pnm[n-2, m])
-                         / rootn[d])
+    # the remaining P(n,m) follow from P(n-1,m) and P(n-2,m), so each degree
+    # is computed for all orders m < n-1 in one step
+    for n, e, rootn_de, rootn_d in tab.degrees:
+        Pnm[n, :n-1] = ((e * costh * Pnm[n-1, :n-1] - rootn_de * Pnm[n-2, :n-1])
+                        / rootn_d)
 
     # dP(n,m) = Pnm(m,n+1) is the derivative of P(n,m) vrt. theta
     Pnm[0, 2] = -Pnm[1, 1]
     Pnm[1, 2] = Pnm[1, 0]
-    for n in range(2, nmax+1):
-        Pnm[0, n+1] = -np.sqrt((n*n + n) / 2) * Pnm[n, 1]
-        Pnm[1, n+1] = ((np.sqrt(2 * (n*n + n)) * Pnm[n, 0]
-                       - np.sqrt((n*n + n - 2)) * Pnm[n, 2]) / 2)
 
-        for m in np.arange(2, n):
-            Pnm[m, n+1] = (0.5*(np.sqrt((n + m) * (n - m + 1)) * Pnm[n, m-1]
-                           - np.sqrt((n + m + 1) * (n - m)) * Pnm[n, m+1]))
+    # orders 0 and 1 for all degrees n >= 2 at once
+    Pnm[0, 3:] = tab.d0 * Pnm[2:, 1]
+    Pnm[1, 3:] = (tab.d1a * Pnm[2:, 0] - tab.d1b * Pnm[2:, 2]) / 2
+
+    # orders 1 < m < n, for all orders of a degree at once
+    for n, dma, dmb in tab.dnm:
+        Pnm[2:n, n+1] = 0.5*(dma * Pnm[n, 1:n-1] - dmb * Pnm[n, 3:n+1])
+
+    n = tab.dn
+    Pnm[n, n+1] = tab.dnn * Pnm[n, n-1] / 2
+
+
+@lru_cache(maxsize=None)
+def _legendre_rootn(nmax):
+    """Square roots of the integers used by the point kernels of igrf_numba."""
+    return np.sqrt(np.arange(2 * nmax**2 + 1))
 
-        Pnm[n, n+1] = np.sqrt(2 * n) * Pnm[n, n-1] / 2
 
-    return Pnm
+_LegendreTables = namedtuple('_LegendreTables', [
+    'orders', 'sect_a', 'sect_b', 'degrees', 'dn', 'd0', 'd1a', 'd1b', 'dnm',
+    'dnn'])
+
+
+@lru_cache(maxsize=None)
+def _legendre_tables(nmax, dtype=np.dtype(float)):
+    """
+    Recursion constants of :func:`legendre_poly` up to degree ``nmax``, as
+    column vectors of type ``dtype`` to broadcast against the flat
+    (points,)-shaped grid.
+    """
+    rootn = np.sqrt(np.arange(2 * nmax**2 + 1))
+
+    orders = np.arange(nmax)
+    sect_a = rootn[orders+orders+1]
+    sect_b = rootn[orders+orders+2]
 
-def xyz2dhif(x, y, z):
+    degrees = []
+    for n in range(2, nmax+1):
+        m = np.arange(n-1)
+        d = n * n - m * m
+        e = n + n - 1
+        degrees.append((n, e, rootn[d-e][:, None], rootn[d][:, None]))
+
+    dn = np.arange(2, nmax+1)
+    d0 = -np.sqrt((dn*dn + dn) / 2)[:, None]
+    d1a = np.sqrt(2 * (dn*dn + dn))[:, None]
+    d1b = np.sqrt((dn*dn + dn - 2))[:, None]
+    dnn = np.sqrt(2 * dn)[:, None]
+
+    dnm = []
+    for n in range(3, nmax+1):
+        m = np.arange(2, n)
+        dnm.append((n, np.sqrt((n + m) * (n - m + 1))[:, None],
+                    np.sqrt((n + m + 1) * (n - m))[:, None]))
+
+    if dtype != np.dtype(float):
+        sect_a, sect_b, d0, d1a, d1b, dnn = (
+            x.astype(dtype) for x in (sect_a, sect_b, d0, d1a, d1b, dnn))
+        degrees = [(n, e, rootn_de.astype(dtype), rootn_d.astype(dtype))
+                   for n, e, rootn_de, rootn_d in degrees]
+        dnm = [(n, dma.astype(dtype), dmb.astype(dtype))
+               for n, dma, dmb in dnm]
+
+    return _LegendreTables(orders, sect_a, sect_b, tuple(degrees), dn, d0,
+                           d1a, d1b, tuple(dnm), dnn)
+
+@ins.instrumented('xyz2dhif')
+def xyz2dhif(x, y, z, dtype=None):
     """Calculate D, H, I and F from (X, Y, Z)
       
     Based on code from D. Kerridge, 2019
@@ -572,6 +1810,7 @@ def xyz2dhif(x, y, z):
     X: north component (nT) : float
     Y: east component (nT) : float
     Z: vertical component (nT) : float
+    dtype: floating point type of the computation, e.g. np.float32 (optional)
     
     Returns
     ------
@@ -584,6 +1823,8 @@ def xyz2dhif(x, y, z):
 
 
     """
+    if dtype is not None:
+        x, y, z = (np.asarray(v, dtype=dtype) for v in (x, y, z))
     hsq = x*x + y*y
     hoz  = np.sqrt(hsq)
     eff = np.sqrt(hsq + z*z)
@@ -593,7 +1834,8 @@ def xyz2dhif(x, y, z):
     return r2d(dec), hoz, r2d(inc), eff
 
 
-def xyz2dhif_sv(x, y, z, xdot, ydot, zdot):
+@ins.instrumented('xyz2dhif_sv')
+def xyz2dhif_sv(x, y, z, xdot, ydot, zdot, dtype=None):
     """Calculate secular variation in D, H, I and F from (X, Y, Z) and
     (Xdot, Ydot, Zdot)
     
@@ -607,6 +1849,7 @@ def xyz2dhif_sv(x, y, z, xdot, ydot, zdot):
     Xdot=dX/dt : rate of change of X : float
     Ydot=dY/dt : rate of change of Y : float
     Zdot=dZ/dt : rate of change of Z : float
+    dtype: floating point type of the computation, e.g. np.float32 (optional)
     
     Returns
     ------
@@ -619,6 +1862,9 @@ def xyz2dhif_sv(x, y, z, xdot, ydot, zdot):
 
 
     """
+    if dtype is not None:
+        x, y, z, xdot, ydot, zdot = (np.asarray(v, dtype=dtype) for v in
+                                     (x, y, z, xdot, ydot, zdot))
     h2  = x*x + y*y
     h   = np.sqrt(h2)
     f2  = h2 + z*z
@@ -628,3 +1874,82 @@ def xyz2dhif_sv(x, y, z, xdot, ydot, zdot):
     idot = r2d((h*zdot - hdot*z)/f2)*60
     
     return ddot, hdot, idot, fdot
+
+
+def synth_elements(coeffs, coeffs_sv, coeffs_start, radius, theta, phi, \
+                   nmax=None, nmin=None, grid=None, sd=None, cd=None,
+                   dedup=None, backend=None):
+    """
+    Computes all fourteen geomagnetic elements, main field and secular
+    variation, in a single pass over the spherical harmonic expansion.
+
+    Parameters
+    ----------
+    coeffs : ndarray, shape (..., N)
+        Main field coefficients at the date(s) of interest.
+    coeffs_sv : ndarray, shape (..., N)
+        Secular variation coefficients (per year).
+    coeffs_start : ndarray, shape (..., N)
+        Main field coefficients at the start of the epoch(s) of the secular
+        variation, to which the SV of D, H, I and F is relative.
+    radius, theta, phi, nmax, nmin, grid, dedup, backend :
+        Geocentric position and options, as for :func:`synth_values`. With
+        ``grid='separable'``, the coefficients are single sets of shape (N,)
+        evaluated on a regular grid with :func:`synth_grid`, the radius
+        depending on colatitude only.
+    sd, cd : ndarray, shape (...), optional
+        Rotation from geocentric to geodetic components, as returned by
+        :func:`gg_to_geo`. X and Z are not rotated if not given. Shape
+        (Ntheta,) with ``grid='separable'``.
+
+    Returns
+    -------
+    X, Y, Z, dX, dY, dZ : ndarray, shape (...)
+        North, east and vertical components (nT) and their SV (nT/yr).
+    dec, hoz, inc, eff : ndarray, shape (...)
+        D (degrees), H (nT), I (degrees) and F (nT).
+    decs, hozs, incs, effs : ndarray, shape (...)
+        SV of D (arcmin/yr), H (nT/yr), I (arcmin/yr) and F (nT/yr).
+
+    """
+    if grid == 'separable':
+        (Br, Brs, Brm), (Bt, Bts, Btm), (Bp, Bps, Bpm) = synth_grid(
+            np.stack((coeffs, coeffs_sv, coeffs_start)),
+            np.reshape(radius, (-1, 1)), theta, phi,
+            nmax=nmax, nmin=nmin)
+        if sd is not None:
+            sd = np.reshape(sd, (-1, 1)); cd = np.reshape(cd, (-1, 1))
+    else:
+        (Br, Bt, Bp), (Brs, Bts, Bps), (Brm, Btm, Bpm) = synth_values_multi(
+            (coeffs, coeffs_sv, coeffs_start), radius, theta, phi,
+            nmax=nmax, nmin=nmin, grid=grid, dedup=dedup, backend=backend)
+
+    return field_elements((Br, Bt, Bp), (Brs, Bts, Bps), (Brm, Btm, Bpm),
+                           sd, cd)
+
+
+def field_elements(B, B_sv, B_start, sd=None, cd=None):
+    """
+    The elements of :func:`synth_elements` from the synthesised components
+    (B_radius, B_theta, B_phi) of the main field ``B``, its SV ``B_sv`` and
+    the main field ``B_start`` at the start of the epoch.
+    """
+    (Br, Bt, Bp), (Brs, Bts, Bps), (Brm, Btm, Bpm) = B, B_sv, B_start
+
+    # Rearrange to X, Y, Z components
+    X = -Bt; Y = Bp; Z = -Br
+    dX = -Bts; dY = Bps; dZ = -Brs
+    Xm = -Btm; Ym = Bpm; Zm = -Brm
+    # Rotate back to geodetic coords if needed
+    if sd is not None:
+        with ins.stage('rotation', np.size(X)):
+            t = X; X = X*cd + Z*sd;  Z = Z*cd - t*sd
+            t = dX; dX = dX*cd + dZ*sd;  dZ = dZ*cd - t*sd
+            t = Xm; Xm = Xm*cd + Zm*sd;  Zm = Zm*cd - t*sd
+
+    dec, hoz, inc, eff = xyz2dhif(X, Y, Z)
+    # The SV of the non-linear components is relative to the main field at
+    # the start of the epoch
+    decs, hozs, incs, effs = xyz2dhif_sv(Xm, Ym, Zm, dX, dY, dZ)
+
+    return X, Y, Z, dX, dY, dZ, dec, hoz, inc, eff, decs, hozs, incs, effs
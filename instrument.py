@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Opt-in timing and memory instrumentation of the stages of a computation:
+loading and parsing the shc-files, interpolating the coefficients, the
+Legendre functions, the synthesis, the geodetic rotation, the elements and
+the output.
+
+Each stage records its number of calls, wall time, number of points (or
+rows) and, optionally, its peak allocation above the memory in use when it
+started, traced with tracemalloc. Stages nest, and the time and memory of a
+stage include those of the stages it calls (e.g. synth_values includes
+legendre_poly with the NumPy backend; the Numba kernels compute the
+Legendre functions inline and allocate outside tracemalloc).
+
+Instrumentation is off by default, with a single flag check per
+instrumented call. It is switched on for a block with a context manager,
+
+    import instrument
+
+    with instrument.profile(memory=True):
+        ...
+    print(instrument.report())
+
+or for a whole run with the environment variable PYIGRF_PROFILE set to
+``time`` (or ``1``) or ``memory``, in which case pyIGRF.py and igrf_batch.py
+print the report to stderr on exit:
+
+    >> PYIGRF_PROFILE=memory python igrf_batch.py points.csv values.csv
+
+"""
+
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+# Values of the environment variable PYIGRF_PROFILE
+MODES = ('time', 'memory')
+
+_enabled = False
+_memory = False
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()
+_NULL = contextlib.nullcontext()
+
+
+def enabled():
+    """Whether the stages are being recorded."""
+    return _enabled
+
+
+def enable(memory=False):
+    """
+    Start recording the stages, and their peak allocation with tracemalloc
+    if memory is true (tracing slows down allocations noticeably).
+    """
+    global _enabled, _memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _memory = bool(memory)
+    _enabled = True
+
+
+def disable():
+    """Stop recording the stages, keeping the statistics."""
+    global _enabled, _memory
+    _enabled = False
+    _memory = False
+
+
+def reset():
+    """Drop the statistics of all stages."""
+    with _lock:
+        _stats.clear()
+
+
+def report():
+    """
+    Statistics of the recorded stages, in the order they first completed.
+
+    Returns
+    -------
+    stats : dict
+        Per stage name, a dict of ``calls``, ``seconds`` (total wall time),
+        ``points`` (total number of points or rows) and ``peak_bytes`` (the
+        largest peak allocation of a call, or None if memory was not traced).
+
+    """
+    with _lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
+
+
+def format_report(stats=None):
+    """The report as a table of text."""
+    stats = report() if stats is None else stats
+    lines = [f'{"stage":24s} {"calls":>8s} {"seconds":>10s} {"points":>12s} '
+             f'{"peak MiB":>10s}']
+    for name, s in stats.items():
+        peak = '' if s['peak_bytes'] is None \
+            else f'{s["peak_bytes"] / 2**20:10.2f}'
+        lines.append(f'{name:24s} {s["calls"]:8d} {s["seconds"]:10.4f} '
+                     f'{s["points"]:12d} {peak:>10s}')
+    return '\n'.join(lines)
+
+
+def print_report(file=None):
+    """Print the report (to stderr by default) if anything was recorded."""
+    stats = report()
+    if stats:
+        print(format_report(stats), file=sys.stderr if file is None else file)
+
+
+@contextlib.contextmanager
+def profile(memory=False, reset_stats=True):
+    """
+    Record the stages within a block, then restore the previous state.
+
+    Parameters
+    ----------
+    memory : {False, True}, optional
+        Trace the peak allocation of each stage (default is False).
+    reset_stats : {True, False}, optional
+        Drop the statistics of earlier blocks first (default is True).
+
+    """
+    previous = (_enabled, _memory)
+    started = memory and not tracemalloc.is_tracing()
+    if reset_stats:
+        reset()
+    enable(memory)
+    try:
+        yield
+    finally:
+        if previous[0]:
+            enable(previous[1])
+        else:
+            disable()
+        if started:
+            tracemalloc.stop()
+
+
+class _Stage:
+
+    __slots__ = ('name', 'points', 'start', 'base', 'peak')
+
+    def __init__(self, name, points):
+        self.name = name
+        self.points = points
+
+    def __enter__(self):
+        if _memory and tracemalloc.is_tracing():
+            stack = _stack()
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:  # the peak so far belongs to the enclosing stage
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.base = self.peak = current
+            stack.append(self)
+        else:
+            self.base = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        peak_bytes = None
+        if self.base is not None and tracemalloc.is_tracing():
+            stack = _stack()
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            peak_bytes = self.peak - self.base
+            if stack and stack[-1] is self:
+                stack.pop()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+            tracemalloc.reset_peak()
+        _record(self.name, seconds, self.points, peak_bytes)
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _record(name, seconds, points, peak_bytes):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = dict(calls=0, seconds=0., points=0,
+                                        peak_bytes=None)
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+        stats['points'] += int(points)
+        if peak_bytes is not None:
+            stats['peak_bytes'] = max(stats['peak_bytes'] or 0, peak_bytes)
+
+
+def stage(name, points=0):
+    """
+    Context manager recording a block as a call of the stage ``name``
+    processing ``points`` points (a no-op when disabled).
+    """
+    if not _enabled:
+        return _NULL
+    return _Stage(name, points)
+
+
+def _count(result):
+    # number of points of a result: size of its first array
+    while isinstance(result, (tuple, list)) and result:
+        result = result[0]
+    return np.size(result) if isinstance(result, np.ndarray) else 0
+
+
+def instrumented(name, points=None):
+    """
+    Decorator recording each call of a function as a call of the stage
+    ``name``. The number of points is ``points(*args, **kwargs)`` if given,
+    otherwise the size of the (first array of the) result.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name, 0) as record:
+                result = func(*args, **kwargs)
+                record.points = _count(result) if points is None \
+                    else points(*args, **kwargs)
+            return result
+        return wrapper
+    return decorator
+
+
+def enable_from_env():
+    """
+    Enable the instrumentation as set by the environment variable
+    PYIGRF_PROFILE (``time`` or ``1``, or ``memory``), returning whether it
+    is enabled.
+    """
+    mode = os.environ.get('PYIGRF_PROFILE', '').strip().lower()
+    if mode in ('', '0'):
+        return False
+    if mode == '1':
+        mode = 'time'
+    if mode not in MODES:
+        warnings.warn(f'Unknown PYIGRF_PROFILE {mode}, use one of {MODES}; '
+                      'instrumentation stays disabled.')
+        return False
+    enable(memory=mode == 'memory')
+    return True
+
+
+enable_from_env()
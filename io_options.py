@@ -12,11 +12,107 @@ A set of functions to parse the three input options of the IGRF code
 
 """
 
+import itertools
+import os
+
 import igrf_utils as iut
+import instrument as ins
 import numpy as np
 
 degree_sign= u'\N{DEGREE SIGN}'
 
+# Row layouts of the elements D, I, H, F, X, Y, Z and their SV written by
+# write2 and write3 to screen and to file
+SCREEN_FORMAT = ('% .3f % .3f % .1f % .1f % .1f % .1f % .1f '
+                 '% .2f % .2f % .1f % .1f % .1f % .1f % .1f\n')
+FILE_FORMAT = ('% 6.2f% 6.2f% 9.1f% 9.1f% 9.1f% 9.1f% 9.1f'
+               '% 5.2f% 5.2f% 7.1f% 7.1f% 7.1f% 7.1f% 7.1f\n')
+
+# Number of rows formatted at a time by format_rows
+FORMAT_CHUNK_SIZE = 4096
+
+
+def format_rows(fmt, columns, chunk_size=FORMAT_CHUNK_SIZE):
+    '''
+    Format the rows of equally long columns with the %-format ``fmt`` of a
+    single row, a block of rows at a time, yielding the text of each block.
+    
+    The format is repeated over the rows of a block and applied to all their
+    values at once, which gives the same text as formatting each row in a
+    Python loop (``%s`` of a float is ``str``, ``% 9.1f`` is ``{: 9.1f}``).
+    '''
+    columns = [np.asarray(column).tolist() for column in columns]
+    nrows = len(columns[0]) if columns else 0
+    for start in range(0, nrows, chunk_size):
+        block = [column[start:start + chunk_size] for column in columns]
+        values = tuple(itertools.chain.from_iterable(zip(*block)))
+        yield (fmt * len(block[0])) % values
+
+
+# Fields of the binary output files: the coordinates, then the elements in
+# the column order of the text files (degrees, nT and arcmin/yr, nT/yr for
+# the SV). alt is the altitude (geodetic) or radius (geocentric) in km.
+FIELDS = ('date', 'lat', 'lon', 'alt', 'D', 'I', 'H', 'F', 'X', 'Y', 'Z',
+          'SV_D', 'SV_I', 'SV_H', 'SV_F', 'SV_X', 'SV_Y', 'SV_Z')
+
+# Output file extensions written in binary instead of text
+BINARY_EXTENSIONS = ('.npy', '.npz')
+
+
+def is_binary(name):
+    '''
+    Whether the output file ``name`` is written in binary (.npy or .npz).
+    '''
+    return os.path.splitext(name)[1].lower() in BINARY_EXTENSIONS
+
+
+def records_dtype(dtype=float):
+    '''
+    Structured dtype of the records of the binary files, with the fields
+    FIELDS.
+    '''
+    return np.dtype([(field, dtype) for field in FIELDS])
+
+
+def open_records(name, size, dtype=float):
+    '''
+    Create a .npy file of ``size`` records with the fields FIELDS,
+    memory-mapped for writing. Fill it chunk by chunk while the values are
+    computed, e.g. with igrf_batch.synth_records(..., out=records), and
+    flush() it at the end. The file is read back without parsing or copying
+    with np.load(name, mmap_mode='r'). Its header is written first, so open
+    a temporary name and rename it once filled (as igrf_batch.py does),
+    otherwise an interrupted run leaves a file that looks complete.
+    '''
+    return np.lib.format.open_memmap(name, mode='w+', shape=(size,),
+                                     dtype=records_dtype(dtype))
+
+
+def write_binary(name, date, alt, lat, lon, X, Y, Z, dX, dY, dZ, \
+                 dec, hoz, inc, eff, decs, hozs, incs, effs):
+    '''
+    Write the coordinates and the main field and SV values to a .npy file, as
+    a structured array with the fields FIELDS, or a .npz file, with one array
+    per field
+    '''
+    columns = np.broadcast_arrays(*(np.reshape(x, -1) for x in (
+        date, lat, lon, alt, dec, inc, hoz, eff, X, Y, Z,
+        decs, incs, hozs, effs, dX, dY, dZ)))
+    if os.path.splitext(name)[1].lower() == '.npz':
+        np.savez(name, **dict(zip(FIELDS, columns)))
+        return
+    tmp = f'{name}.{os.getpid()}.tmp'
+    try:
+        records = open_records(tmp, columns[0].size)
+        for field, column in zip(FIELDS, columns):
+            records[field] = column
+        records.flush()
+        del records  # close the memory map before renaming
+        os.replace(tmp, name)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
 def option1():
     '''
     Option 1 is the simplest: a single point and time
@@ -274,6 +370,12 @@ def option3():
     return date, alt, lat, colat, lon, itype, sd, cd
 
 
+def _rows(*args, **kwargs):
+    # number of rows written by write1/2/3: the size of X
+    return np.size(args[6])
+
+
+@ins.instrumented('write1', points=_rows)
 def write1(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
                   dec, hoz, inc, eff, decs, hozs, incs, effs, itype, igrf_gen):
     '''
@@ -283,6 +385,11 @@ def write1(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
          alt, lat = iut.geo_to_gg(alt, colat)
          lat = 90-lat
     
+    if name and is_binary(name): # Write to a binary file
+        write_binary(name, date, alt, lat, lon, X, Y, Z, dX, dY, dZ,
+                     dec, hoz, inc, eff, decs, hozs, incs, effs)
+        return
+    
     if not name: # Print to screen
         print('\nGeomagnetic field values at: ', str(np.round(lat, decimals=4)) 
             + degree_sign  + ' / ' + str(lon) 
@@ -325,6 +432,7 @@ def write1(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
             file.writelines(['Vertical SV (Z)    :', '{: 7.1f}'.format(dZ), 'nT/yr\n'])
             
             
+@ins.instrumented('write2', points=_rows)
 def write2(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
                   dec, hoz, inc, eff, decs, hozs, incs, effs, itype, igrf_gen):
      '''
@@ -335,6 +443,11 @@ def write2(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
          alt, lat = iut.geo_to_gg(alt, colat)
          lat = 90-lat
     
+     if name and is_binary(name): # Write to a binary file
+         write_binary(name, date, alt, lat, lon, X, Y, Z, dX, dY, dZ,
+                      dec, hoz, inc, eff, decs, hozs, incs, effs)
+         return
+    
      if not name: # Print to screen
         print('\nGeomagnetic field values at: ', str(np.round(lat[0], decimals=4)) 
             + degree_sign  + ' / ' + str(lon[0]) 
@@ -345,22 +458,11 @@ def write2(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
               ' F(nT) X(nT) Y(nT)  Z(nT)     '
               'SV_D(min/yr)  SV_I(min/yr)  SV_H(nT/yr) ' 
               ' SV_F(nT/yr)  SV_X(nT/yr)  SV_Y(nT/yr)  SV_Z(nT/yr) ' )
-         #for loop to write to screen ...
-        for i in range(len(date)):
-            print(str(date[i]), '{: .3f}'.format(dec[i]),
-             '{: .3f}'.format(inc[i]),
-             '{: .1f}'.format(hoz[i]), 
-             '{: .1f}'.format(eff[i]),
-             '{: .1f}'.format(X[i]), 
-             '{: .1f}'.format(Y[i]),
-             '{: .1f}'.format(Z[i]),
-             '{: .2f}'.format(decs[i]), 
-             '{: .2f}'.format(incs[i]),
-             '{: .1f}'.format(hozs[i]), 
-             '{: .1f}'.format(effs[i]),
-             '{: .1f}'.format(dX[i]),
-             '{: .1f}'.format(dY[i]),
-             '{: .1f}'.format(dZ[i]))
+        # write to screen a block of rows at a time
+        for text in format_rows('%s ' + SCREEN_FORMAT,
+                                (date, dec, inc, hoz, eff, X, Y, Z,
+                                 decs, incs, hozs, effs, dX, dY, dZ)):
+            print(text, end='')
      else: # Print to filename 
         with open(name, 'w') as file: 
             file.writelines(['Geomagnetic field values at: ',  str(np.round(lat[0], decimals=4)) 
@@ -372,26 +474,15 @@ def write2(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
               ' F(nT) X(nT) Y(nT)  Z(nT)     '
               'SV_D(min/yr)  SV_I(min/yr)  SV_H(nT/yr) ' 
               ' SV_F(nT/yr)  SV_X(nT/yr)  SV_Y(nT/yr)  SV_Z(nT/yr) \n'])
-            # Write out in a loop
-            for i in range(len(date)):
-                file.writelines([str(date[i]), ' ',
-                 '{: 6.2f}'.format(dec[i]),
-                 '{: 6.2f}'.format(inc[i]),
-                 '{: 9.1f}'.format(hoz[i]), 
-                 '{: 9.1f}'.format(eff[i]),
-                 '{: 9.1f}'.format(X[i]), 
-                 '{: 9.1f}'.format(Y[i]),
-                 '{: 9.1f}'.format(Z[i]),
-                 '{: 5.2f}'.format(decs[i]), 
-                 '{: 5.2f}'.format(incs[i]),
-                 '{: 7.1f}'.format(hozs[i]), 
-                 '{: 7.1f}'.format(effs[i]),
-                 '{: 7.1f}'.format(dX[i]),
-                 '{: 7.1f}'.format(dY[i]),
-                 '{: 7.1f}'.format(dZ[i]), '\n'])
+            # Write out a block of rows at a time
+            for text in format_rows('%s ' + FILE_FORMAT,
+                                    (date, dec, inc, hoz, eff, X, Y, Z,
+                                     decs, incs, hozs, effs, dX, dY, dZ)):
+                file.write(text)
     
 
 
+@ins.instrumented('write3', points=_rows)
 def write3(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
                   dec, hoz, inc, eff, decs, hozs, incs, effs, itype, igrf_gen):
      '''
@@ -402,6 +493,11 @@ def write3(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
          alt, lat = iut.geo_to_gg(alt, colat)
          lat = 90-lat
     
+     if name and is_binary(name): # Write to a binary file
+         write_binary(name, date, alt, lat, lon, X, Y, Z, dX, dY, dZ,
+                      dec, hoz, inc, eff, decs, hozs, incs, effs)
+         return
+    
      if not name: # Print to screen
         print('\nGeomagnetic field values for: ', str(date[0]) + ', at altitude ' 
             + str(np.round(alt[0], decimals=3)) 
@@ -410,23 +506,13 @@ def write3(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
               ' F(nT) X(nT) Y(nT)  Z(nT)     '
               'SV_D(min/yr)  SV_I(min/yr)  SV_H(nT/yr) ' 
               ' SV_F(nT/yr)  SV_X(nT/yr)  SV_Y(nT/yr)  SV_Z(nT/yr) ' )
-         #for loop to write to screen ...         
-        for i in range(len(lon)):
-            print(str(np.round(lat[i], decimals=4)), str(np.round(lon[i], decimals=4)), 
-             '{: .3f}'.format(dec[i]),
-             '{: .3f}'.format(inc[i]),
-             '{: .1f}'.format(hoz[i]), 
-             '{: .1f}'.format(eff[i]),
-             '{: .1f}'.format(X[i]), 
-             '{: .1f}'.format(Y[i]),
-             '{: .1f}'.format(Z[i]),
-             '{: .2f}'.format(decs[i]), 
-             '{: .2f}'.format(incs[i]),
-             '{: .1f}'.format(hozs[i]), 
-             '{: .1f}'.format(effs[i]),
-             '{: .1f}'.format(dX[i]),
-             '{: .1f}'.format(dY[i]),
-             '{: .1f}'.format(dZ[i]))
+        # write to screen a block of rows at a time
+        for text in format_rows('%s %s ' + SCREEN_FORMAT,
+                                (np.round(lat, decimals=4),
+                                 np.round(lon, decimals=4),
+                                 dec, inc, hoz, eff, X, Y, Z,
+                                 decs, incs, hozs, effs, dX, dY, dZ)):
+            print(text, end='')
      else: # Print to filename 
         with open(name, 'w') as file: 
             file.writelines(['\nGeomagnetic field values for: ', str(date[0]) + ', at altitude ' 
@@ -436,21 +522,10 @@ def write3(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ, \
               ' F(nT) X(nT) Y(nT)  Z(nT)     '
               'SV_D(min/yr)  SV_I(min/yr)  SV_H(nT/yr) ' 
               ' SV_F(nT/yr)  SV_X(nT/yr)  SV_Y(nT)  SV_Z(nT/yr) \n'])
-            # Write out in a loop
-            for i in range(len(lon)):
-                file.writelines([str(np.round(lat[i], decimals=4)), ' ', 
-                                 str(np.round(lon[i], decimals=4)), ' ',
-                 '{: 6.2f}'.format(dec[i]),
-                 '{: 6.2f}'.format(inc[i]),
-                 '{: 9.1f}'.format(hoz[i]), 
-                 '{: 9.1f}'.format(eff[i]),
-                 '{: 9.1f}'.format(X[i]), 
-                 '{: 9.1f}'.format(Y[i]),
-                 '{: 9.1f}'.format(Z[i]),
-                 '{: 5.2f}'.format(decs[i]), 
-                 '{: 5.2f}'.format(incs[i]),
-                 '{: 7.1f}'.format(hozs[i]), 
-                 '{: 7.1f}'.format(effs[i]),
-                 '{: 7.1f}'.format(dX[i]),
-                 '{: 7.1f}'.format(dY[i]),
-                 '{: 7.1f}'.format(dZ[i]), '\n'])
\ No newline at end of file
+            # Write out a block of rows at a time
+            for text in format_rows('%s %s ' + FILE_FORMAT,
+                                    (np.round(lat, decimals=4),
+                                     np.round(lon, decimals=4),
+                                     dec, inc, hoz, eff, X, Y, Z,
+                                     decs, incs, hozs, effs, dX, dY, dZ)):
+                file.write(text)
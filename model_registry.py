@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registry of the IGRF generations bundled in the SHC_files directory.
+
+Models are loaded lazily on first use and kept in a bounded least recently
+used (LRU) store, so that switching between generations (e.g. IGRF-12, 13
+and 14) does not reload the coefficients each time. A registry can be
+shared between threads.
+
+    import model_registry as reg
+
+    print(reg.available_generations())  # [1, 2, ..., 14]
+    igrf = reg.get_model(14)            # loaded once, then reused
+
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import igrf_utils as iut
+
+# Directory of the shc-files shipped with the code, independent of the
+# current working directory
+SHC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       'SHC_files')
+
+
+def user_cache_dir():
+    """
+    Per-user directory of the binary coefficient caches of the registry,
+    writable even if the code is installed read-only: the environment
+    variable PYIGRF_CACHE_DIR if set, otherwise ``pyIGRF`` in
+    ``$XDG_CACHE_HOME`` (``~/.cache`` by default) or, on Windows,
+    ``%LOCALAPPDATA%``.
+    """
+    cache_dir = os.environ.get('PYIGRF_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        base = os.environ['LOCALAPPDATA']
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or \
+            os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pyIGRF')
+
+
+def available_generations(shc_dir=None):
+    """
+    List the IGRF generations with an ``IGRF<gen>.SHC`` file in ``shc_dir``
+    (defaults to the bundled SHC_files directory), in increasing order.
+    """
+    shc_dir = SHC_DIR if shc_dir is None else shc_dir
+    generations = []
+    for name in os.listdir(shc_dir):
+        match = re.fullmatch(r'IGRF(\d+)\.SHC', name, flags=re.IGNORECASE)
+        if match:
+            generations.append(int(match.group(1)))
+    return sorted(generations)
+
+
+def model_nbytes(igrf):
+    """
+    Memory held by the coefficient arrays of a loaded model, including the
+    knots and slopes precomputed for interpolation.
+    """
+    return (igrf.time.nbytes + igrf.coeffs.nbytes + igrf.knots.nbytes
+            + igrf.slopes.nbytes)
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, thread-safe LRU store of IGRF models.
+
+    Parameters
+    ----------
+    shc_dir : str, optional
+        Directory of the ``IGRF<gen>.SHC`` files (defaults to the bundled
+        SHC_files directory).
+    max_models : int, optional
+        Maximum number of models kept in memory (default is no limit).
+    max_bytes : int, optional
+        Maximum memory of the coefficient arrays kept in memory (default is
+        no limit). The most recently used model is always kept.
+    cache : {True, False}, optional
+        Load the coefficients through the binary cache of
+        :func:`igrf_utils.load_shcfile` (default is ``True``).
+    cache_dir : str, optional
+        Directory of the binary caches (default is :func:`user_cache_dir`).
+    preload : bool or list of int, optional
+        Generations to load in parallel on creation, ``True`` for all
+        available generations (default is none).
+    workers : int, optional
+        Number of threads used to preload (defaults to one per generation).
+
+    """
+
+    def __init__(self, shc_dir=None, max_models=None, max_bytes=None,
+                 cache=True, cache_dir=None, preload=None, workers=None):
+        self.shc_dir = SHC_DIR if shc_dir is None else shc_dir
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.cache_dir = user_cache_dir() if cache_dir is None else cache_dir
+        self.hits = 0
+        self.misses = 0
+
+        self._generations = available_generations(self.shc_dir)
+        self._models = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+        if preload:
+            self.preload(None if preload is True else preload, workers)
+
+    @property
+    def generations(self):
+        """Available generations, loaded or not."""
+        return list(self._generations)
+
+    def loaded(self):
+        """Generations currently held in memory, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def nbytes(self):
+        """Memory held by the loaded models."""
+        with self._lock:
+            return sum(model_nbytes(m) for m in self._models.values())
+
+    def path(self, generation):
+        """File path of the shc-file of a generation."""
+        generation = self._check_generation(generation)
+        for name in os.listdir(self.shc_dir):
+            if name.upper() == f'IGRF{generation}.SHC':
+                return os.path.join(self.shc_dir, name)
+        raise ValueError(f'IGRF-{generation} not found in {self.shc_dir}.')
+
+    def get(self, generation):
+        """
+        Return the model of a generation (int or str, e.g. ``14``), loading
+        it on first use.
+        """
+        generation = self._check_generation(generation)
+        with self._lock:
+            model = self._lookup(generation)
+            if model is not None:
+                return model
+            # one lock per generation, so a model is only loaded once
+            # while other generations stay available
+            gen_lock = self._loading.setdefault(generation, threading.Lock())
+
+        with gen_lock:
+            with self._lock:
+                model = self._lookup(generation)
+                if model is not None:
+                    return model
+                self.misses += 1
+
+            model = iut.load_shcfile(self.path(generation), cache=self.cache,
+                                     cache_dir=self.cache_dir)
+
+            with self._lock:
+                self._models[generation] = model
+                self._loading.pop(generation, None)
+                self._evict()
+        return model
+
+    __getitem__ = get
+
+    def preload(self, generations=None, workers=None):
+        """
+        Load several generations (default all) in parallel threads.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        generations = self.generations if generations is None else generations
+        if not generations:
+            return
+        workers = len(generations) if workers is None else workers
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(self.get, generations))
+
+    def clear(self):
+        """Drop all loaded models."""
+        with self._lock:
+            self._models.clear()
+
+    def _check_generation(self, generation):
+        try:
+            generation = int(generation)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid IGRF generation {generation}.') \
+                from None
+        if generation not in self._generations:
+            raise ValueError(f'IGRF-{generation} is not available, choose '
+                             f'from {self.generations}.')
+        return generation
+
+    def _lookup(self, generation):
+        # call with self._lock held
+        model = self._models.get(generation)
+        if model is not None:
+            self._models.move_to_end(generation)
+            self.hits += 1
+        return model
+
+    def _evict(self):
+        # call with self._lock held, drop least recently used models
+        while len(self._models) > 1:
+            if self.max_models is not None \
+                    and len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            elif self.max_bytes is not None and sum(
+                    model_nbytes(m) for m in self._models.values()) \
+                    > self.max_bytes:
+                self._models.popitem(last=False)
+            else:
+                break
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def default_registry():
+    """The registry shared by :func:`get_model` (created on first use)."""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry()
+        return _default_registry
+
+
+def get_model(generation):
+    """Return the model of an IGRF generation from the default registry."""
+    return default_registry().get(generation)
@@ -67,7 +67,7 @@ pyIGRF: code to synthesise magnetic field values from any generation of the
  
  Dependencies: 
  -------------
-     : numpy, scipy
+     : numpy (scipy is only used by the tests)
  
  Recent history of code:
  -----------------------
@@ -78,13 +78,22 @@ pyIGRF: code to synthesise magnetic field values from any generation of the
  
     
 """
-from scipy import interpolate
+import atexit
+
+import numpy as np
+
 import igrf_utils as iut
+import instrument as ins
 import io_options as ioo
+import model_registry as reg
 
 
 
 if __name__ == '__main__':
+    # With PYIGRF_PROFILE set, report the time spent in each stage on exit
+    if ins.enabled():
+        atexit.register(ins.print_report)
+
     # Introduction text and initial option selection
     # -=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
     
@@ -120,9 +129,8 @@ if __name__ == '__main__':
             igrf_gen = input("Enter generation number: ") 
 
 
-    # Load in the file of coefficients
-    IGRF_FILE = r'./SHC_files/IGRF' + igrf_gen + '.SHC'
-    igrf = iut.load_shcfile(IGRF_FILE, None)
+    # Load in the coefficients of that generation from the bundled files
+    igrf = reg.get_model(igrf_gen)
     
     
     print('Enter name of output file')
@@ -159,47 +167,46 @@ if __name__ == '__main__':
         
     # Interpolate the geomagnetic coefficients to the desired date(s)
     # -=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=
-    f = interpolate.interp1d(igrf.time, igrf.coeffs, fill_value='extrapolate')
-    coeffs = f(date)    
-    
-    # Compute the main field B_r, B_theta and B_phi value for the location(s) 
-    Br, Bt, Bp = iut.synth_values(coeffs.T, alt, colat, lon,
-                              igrf.parameters['nmax'])
-    
     # For the SV, find the 5 year period in which the date lies and compute
     # the SV within that period. IGRF has constant SV between each 5 year period
-    # We don't need to subtract 1900 but it makes it clearer:
-    epoch = (date-1900)//5    
-    epoch_start = epoch*5
-    # Add 1900 back on plus 1 year to account for SV in nT per year (nT/yr):
-    coeffs_sv = f(1900+epoch_start+1) - f(1900+epoch_start)   
-    Brs, Bts, Bps = iut.synth_values(coeffs_sv.T, alt, colat, lon,
-                              igrf.parameters['nmax'])
-    
-    # Use the main field coefficients from the start of each five epoch
-    # to compute the SV for Dec, Inc, Hor and Total Field (F) 
+    # The slope of the coefficients over the period is the SV in nT per year
+    # (nT/yr), and the main field coefficients from the start of each five
+    # epoch are used to compute the SV for Dec, Inc, Hor and Total Field (F)
     # [Note: these are non-linear components of X, Y and Z so treat separately]
-    coeffsm = f(1900+epoch_start);
-    Brm, Btm, Bpm = iut.synth_values(coeffsm.T, alt, colat, lon,
-                              igrf.parameters['nmax'])
-    
-    
-    # Rearrange to X, Y, Z components 
-    X = -Bt; Y = Bp; Z = -Br
-    # For the SV
-    dX = -Bts; dY = Bps; dZ = -Brs 
-    Xm = -Btm; Ym = Bpm; Zm = -Brm
-    # Rotate back to geodetic coords if needed
-    if (itype == 1):
-        t = X; X = X*cd + Z*sd;  Z = Z*cd - t*sd
-        t = dX; dX = dX*cd + dZ*sd;  dZ = dZ*cd - t*sd
-        t = Xm; Xm = Xm*cd + Zm*sd;  Zm = Zm*cd - t*sd
-        
-    # Compute the four non-linear components 
-    dec, hoz, inc, eff = iut.xyz2dhif(X,Y,Z)
-    # The IGRF SV coefficients are relative to the main field components 
-    # at the start of each five year epoch e.g. 2010, 2015, 2020
-    decs, hozs, incs, effs = iut.xyz2dhif_sv(Xm, Ym, Zm, dX, dY, dZ)
+    coeffs, coeffs_sv, coeffsm = igrf.epoch_coeffs(date)
+    
+    # Compute the main field and SV for the location(s) in a single pass and
+    # rearrange to X, Y, Z components. Rotate back to geodetic coords if
+    # needed. The IGRF SV coefficients are relative to the main field
+    # components at the start of each five year epoch e.g. 2010, 2015, 2020
+    if (itype != 1):
+        sd = None; cd = None
+    if iopt == 3:
+        # The grid is listed longitude by longitude at a single date, so
+        # sum over degrees once per latitude and expand in longitude
+        nlat = np.count_nonzero(lon == lon[0])
+        first_row = lambda x: np.reshape(np.broadcast_to(x, lon.shape),
+                                         (-1, nlat))[0]
+        if sd is not None:
+            sd = first_row(sd); cd = first_row(cd)
+        elements = iut.synth_elements(
+            coeffs[0], coeffs_sv[0], coeffsm[0], first_row(alt),
+            first_row(colat), lon[::nlat], igrf.parameters['nmax'],
+            grid='separable', sd=sd, cd=cd)
+        elements = [B.T.ravel() for B in elements]
+    elif iopt == 2:
+        # A time series at one location: compute the geometry once and
+        # apply it to the coefficients of every date
+        basis = iut.SynthBasis(alt[0], colat[0], lon[0],
+                               igrf.parameters['nmax'])
+        if sd is not None:
+            sd = sd[0]; cd = cd[0]
+        elements = basis.elements(coeffs, coeffs_sv, coeffsm, sd=sd, cd=cd)
+    else:
+        elements = iut.synth_elements(
+            coeffs, coeffs_sv, coeffsm, alt, colat, lon,
+            igrf.parameters['nmax'], sd=sd, cd=cd)
+    X, Y, Z, dX, dY, dZ, dec, hoz, inc, eff, decs, hozs, incs, effs = elements
     
     
     # Finally, parse the outputs for writing to screen or file
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Least recently used (LRU) cache of spot values for repetitive queries, e.g.
+the same sites at the same daily dates.
+
+Queries are quantised to a grid of dates, latitudes, longitudes and
+altitudes, and the values are computed at the grid point, so that all
+queries falling on the same point share one entry (and get the same values,
+whichever came first). The steps set the trade-off between hit rate and the
+position error; the defaults (0.01 deg, 10 m and one day) are well within
+the accuracy of the IGRF.
+
+    import spot_cache
+
+    cache = spot_cache.SpotCache(maxsize=10000)
+    record = cache.lookup(2025.5, 45., -3., 0.)   # computed
+    record = cache.lookup(2025.5, 45., -3., 0.)   # cached
+    print(cache.info())
+
+"""
+
+import threading
+from collections import OrderedDict
+
+import igrf_batch
+import model_registry as reg
+
+# Default number of entries and quantisation steps (degrees, km, years)
+MAXSIZE = 65536
+LAT_STEP = 0.01
+LON_STEP = 0.01
+ALT_STEP = 0.01
+DATE_STEP = 1 / 365
+
+
+class SpotCache:
+    """
+    Thread-safe LRU cache of spot values keyed by (generation, coordinate
+    type, quantised date, lat, lon, alt).
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries (default is MAXSIZE).
+    lat_step, lon_step, alt_step, date_step : float, optional
+        Quantisation steps of the latitude and longitude (degrees), altitude
+        or radius (km) and date (years).
+    registry : model_registry.ModelRegistry, optional
+        Models used on a miss (default is the shared registry of get_model).
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of lookups found in the cache or computed.
+
+    """
+
+    def __init__(self, maxsize=MAXSIZE, lat_step=LAT_STEP, lon_step=LON_STEP,
+                 alt_step=ALT_STEP, date_step=DATE_STEP, registry=None):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+        self.maxsize = maxsize
+        self.steps = (date_step, lat_step, lon_step, alt_step)
+        self.registry = reg.default_registry() if registry is None \
+            else registry
+        self.hits = 0
+        self.misses = 0
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, date, lat, lon, alt, itype=1, igrf=14):
+        """Cache key of a query, with the grid indices of its position."""
+        return (int(igrf), itype) + tuple(
+            round(float(x) / step) for x, step in zip((date, lat, lon, alt),
+                                                      self.steps))
+
+    def point(self, key):
+        """Date, lat, lon and alt of the grid point of a key."""
+        return tuple(index * step for index, step in zip(key[2:], self.steps))
+
+    def get(self, key):
+        """Cached record of a key (a copy), or None, counting hits/misses."""
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                self.misses += 1
+                return None
+            self._records.move_to_end(key)
+            self.hits += 1
+        return dict(record)
+
+    def put(self, key, record):
+        """Store the record of a key, dropping the least recently used."""
+        with self._lock:
+            self._records[key] = dict(record)
+            self._records.move_to_end(key)
+            while len(self._records) > self.maxsize:
+                self._records.popitem(last=False)
+
+    def lookup(self, date, lat, lon, alt, itype=1, igrf=14):
+        """
+        Spot value at the grid point of a query: a dict of the columns of
+        :func:`igrf_batch.synth_records`, computed on a miss. Concurrent
+        misses of the same key may both compute it.
+        """
+        key = self.key(date, lat, lon, alt, itype, igrf)
+        record = self.get(key)
+        if record is None:
+            record = dict(zip(igrf_batch.COLUMNS, igrf_batch.synth_records(
+                self.registry.get(igrf), *self.point(key),
+                itype=itype)[0].tolist()))
+            self.put(key, record)
+        return record
+
+    def info(self):
+        """Counters, size and hit rate of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return dict(hits=self.hits, misses=self.misses,
+                        size=len(self._records), maxsize=self.maxsize,
+                        hit_rate=self.hits / lookups if lookups else None)
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._records.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
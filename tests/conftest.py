@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures of the tests.
+
+"""
+
+import igrf_utils as iut
+import pytest
+
+
+@pytest.fixture(scope='module', params=['numpy', pytest.param(
+    'numba', marks=pytest.mark.skipif(not iut.HAVE_NUMBA,
+                                      reason='Numba is not installed'))])
+def backend(request):
+    """Each implementation of the synthesis, the installed ones only."""
+    return request.param
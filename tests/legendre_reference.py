@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reference implementation of legendre_poly, the straightforward recursion over
+every (n, m) that it replaces, shared by tests/tests_legendre.py and
+benchmarks/bench_legendre.py.
+
+"""
+
+import numpy as np
+
+
+def legendre_poly_loop(nmax, theta):
+    """Reference recursion of legendre_poly, one step per (n, m)."""
+    costh = np.cos(np.radians(theta))
+    sinth = np.sqrt(1-costh**2)
+
+    Pnm = np.zeros((nmax+1, nmax+2) + costh.shape)
+    Pnm[0, 0] = 1
+    Pnm[1, 1] = sinth
+
+    rootn = np.sqrt(np.arange(2 * nmax**2 + 1))
+
+    for m in range(nmax):
+        Pnm_tmp = rootn[m+m+1] * Pnm[m, m]
+        Pnm[m+1, m] = costh * Pnm_tmp
+
+        if m > 0:
+            Pnm[m+1, m+1] = sinth*Pnm_tmp / rootn[m+m+2]
+
+        for n in np.arange(m+2, nmax+1):
+            d = n * n - m * m
+            e = n + n - 1
+            Pnm[n, m] = ((e * costh * Pnm[n-1, m] - rootn[d-e] * Pnm[n-2, m])
+                         / rootn[d])
+
+    Pnm[0, 2] = -Pnm[1, 1]
+    Pnm[1, 2] = Pnm[1, 0]
+    for n in range(2, nmax+1):
+        Pnm[0, n+1] = -np.sqrt((n*n + n) / 2) * Pnm[n, 1]
+        Pnm[1, n+1] = ((np.sqrt(2 * (n*n + n)) * Pnm[n, 0]
+                       - np.sqrt((n*n + n - 2)) * Pnm[n, 2]) / 2)
+
+        for m in np.arange(2, n):
+            Pnm[m, n+1] = (0.5*(np.sqrt((n + m) * (n - m + 1)) * Pnm[n, m-1]
+                           - np.sqrt((n + m + 1) * (n - m)) * Pnm[n, m+1]))
+
+        Pnm[n, n+1] = np.sqrt(2 * n) * Pnm[n, n-1] / 2
+
+    return Pnm
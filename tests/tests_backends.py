@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests of the NumPy and (if installed) Numba implementations of synth_values
+and legendre_poly: the check values of tests_igrf14.py for each backend, and
+agreement between the two.
+
+    >> python -m pytest tests/tests_backends.py
+
+"""
+
+import os
+import subprocess
+import sys
+
+import igrf_utils as iut
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+igrf = reg.get_model(14)
+
+requires_numba = pytest.mark.skipif(not iut.HAVE_NUMBA,
+                                    reason='Numba is not installed')
+
+
+# Check values of tests_igrf14.py: date, colatitude, longitude, radius and
+# the expected X, Y, Z (nT)
+CHECK_VALUES = [
+    (1900, 175, -150, 6300, (-5072.93, 10620.34, -67233.55)),
+    (1915, 155, -120, 6350, (14692.62, 12387.97, -59640.81)),
+    (1930, 135, -90, 6400, (23925.47, 10358.94, -30640.98)),
+    (1945, 115, -60, 6450, (23642.86, -200.29, -7607.92)),
+    (1960, 95, -30, 6500, (23647.00, -9302.27, -3610.73)),
+    (1975, 75, 0, 6550, (30050.59, -3367.82, 6332.69)),
+    (1990, 55, 30, 6600, (25224.81, 1058.25, 30965.61)),
+    (2005, 35, 60, 6650, (14718.37, 2842.99, 46050.88)),
+    (2010, 170, 0, 6371, (17529.48, -7143.78, -42722.46)),
+    (2020, 15, 90, 6700, (3734.07, 1294.17, 50833.13)),
+    (2025, 56, -3, 6375, (28927.56, 261.98, 30910.08)),
+    (2030, 45, -5, 6375, (22959.82, 224.80, 40764.14)),
+]
+
+
+@pytest.mark.parametrize('date, colat, lon, radius, expected_xyz',
+                         CHECK_VALUES)
+def test_synth_values(backend, date, colat, lon, radius, expected_xyz):
+    coeffs, _ = igrf.interpolate(date)
+    found = iut.synth_values(coeffs, radius, colat, lon,
+                             igrf.parameters['nmax'], backend=backend)
+    found_xyz = np.array([-found[1], found[2], -found[0]])
+    assert_allclose(found_xyz, expected_xyz, rtol=1e-02, atol=1e-02)
+
+
+@requires_numba
+@pytest.mark.parametrize('nmax', [1, 2, 13, 45])
+def test_legendre_identical(nmax):
+    theta = np.concatenate(([0., 180.], np.linspace(0.1, 179.9, 150)))
+    assert_array_equal(iut.legendre_poly(nmax, theta, backend='numba'),
+                       iut.legendre_poly(nmax, theta, backend='numpy'))
+
+
+@requires_numba
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_synth_agrees(dtype):
+    rng = np.random.default_rng(5)
+    theta = np.concatenate(([0., 180.], rng.uniform(0., 180., 200)))
+    phi = rng.uniform(-180., 360., theta.size)
+    radius = rng.uniform(6371.2, 7000., theta.size)
+    coeffs, coeffs_sv = igrf.interpolate(rng.uniform(1900., 2030., 202))
+    atol = 1e-8 if dtype == np.float64 else 0.1
+
+    for kwargs in ({}, dict(nmin=3, nmax=9)):
+        found = iut.synth_values_multi(
+            [coeffs, coeffs_sv, coeffs[0]], radius, theta, phi,
+            dtype=dtype, backend='numba', **kwargs)
+        expected = iut.synth_values_multi(
+            [coeffs, coeffs_sv, coeffs[0]], radius, theta, phi,
+            dtype=dtype, backend='numpy', **kwargs)
+        for B_found, B_expected in zip(found, expected):
+            for b_found, b_expected in zip(B_found, B_expected):
+                assert b_found.dtype == dtype
+                assert_allclose(b_found, b_expected, rtol=0., atol=atol)
+
+
+@requires_numba
+def test_synth_grid_agrees():
+    coeffs, _ = igrf.interpolate(2011.)
+    colat = np.linspace(0., 180., 37)
+    lon = np.arange(-180., 180., 5.)
+    found = iut.synth_values(coeffs, 6371.2, colat, lon, grid=True,
+                             backend='numba')
+    expected = iut.synth_values(coeffs, 6371.2, colat, lon, grid=True,
+                                backend='numpy')
+    for b_found, b_expected in zip(found, expected):
+        assert b_found.shape == (37, 72)
+        assert_allclose(b_found, b_expected, rtol=0., atol=1e-8)
+
+
+def test_get_backend(monkeypatch):
+    monkeypatch.delenv('PYIGRF_BACKEND', raising=False)
+    assert iut.get_backend() == ('numba' if iut.HAVE_NUMBA else 'numpy')
+    assert iut.get_backend('numpy') == 'numpy'
+    monkeypatch.setenv('PYIGRF_BACKEND', 'numpy')
+    assert iut.get_backend() == 'numpy'
+    with pytest.raises(ValueError):
+        iut.get_backend('fortran')
+
+
+@requires_numba
+def test_get_backend_size(monkeypatch):
+    # syntheses of fewer than NUMBA_MIN_SIZE points run on NumPy by default,
+    # whatever ran before
+    monkeypatch.delenv('PYIGRF_BACKEND', raising=False)
+    iut.warm_up()
+    for _ in range(3):
+        assert iut.get_backend(size=1) == 'numpy'
+        assert iut.get_backend(size=iut.NUMBA_MIN_SIZE - 1) == 'numpy'
+        assert iut.get_backend(size=iut.NUMBA_MIN_SIZE) == 'numba'
+    assert iut.get_backend() == 'numba'
+    assert iut.get_backend('numba', size=1) == 'numba'
+    monkeypatch.setenv('PYIGRF_BACKEND', 'numba')
+    assert iut.get_backend(size=1) == 'numba'
+    monkeypatch.setenv('PYIGRF_BACKEND', 'numpy')
+    assert iut.get_backend(size=10**6) == 'numpy'
+
+
+@requires_numba
+def test_chunks_one_backend(monkeypatch):
+    # the chunks of one call run on the backend of the total size
+    monkeypatch.delenv('PYIGRF_BACKEND', raising=False)
+    synth_values, found = iut.synth_values, set()
+
+    def record(*args, backend=None, **kwargs):
+        found.add(backend)
+        return synth_values(*args, backend=backend, **kwargs)
+
+    monkeypatch.setattr(iut, 'synth_values', record)
+    coeffs, _ = igrf.interpolate(2020.)
+    theta = np.linspace(1., 179., iut.NUMBA_MIN_SIZE)
+    iut.synth_values_chunked(coeffs, 6371.2, theta, 0., chunk_size=100)
+    assert found == {'numba'}
+
+
+def test_spot_imports():
+    # a spot value as computed by pyIGRF.py imports neither Numba nor SciPy
+    code = (
+        'import sys, igrf_utils as iut, io_options, model_registry as reg\n'
+        'igrf = reg.get_model(14)\n'
+        'radius, colat, sd, cd = iut.gg_to_geo(0., 45.)\n'
+        'iut.synth_elements(*igrf.epoch_coeffs(2025.5), radius, colat, -3.,'
+        ' 13, sd=sd, cd=cd)\n'
+        'print(sorted({m.split(".")[0] for m in sys.modules} &'
+        ' {"numba", "scipy", "igrf_numba"}))\n')
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(iut.__file__))
+    env.pop('PYIGRF_BACKEND', None)
+    result = subprocess.run([sys.executable, '-c', code], env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the non-interactive batch entry point (igrf_batch.py).
+
+    >> python -m pytest tests/tests_batch.py
+
+"""
+
+import igrf_batch
+import igrf_utils as iut
+import io_options as ioo
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+igrf = reg.get_model(14)
+
+rng = np.random.default_rng(7)
+date = rng.uniform(1900., 2030., 300)
+lat = rng.uniform(-89., 89., 300)
+lon = rng.uniform(-180., 180., 300)
+alt = rng.uniform(0., 400., 300)
+
+
+def expected_elements(itype):
+    # the pipeline of pyIGRF.py
+    colat = 90 - lat
+    if itype == 1:
+        radius, colat, sd, cd = iut.gg_to_geo(alt, colat)
+    else:
+        radius, sd, cd = alt + 6371.2, None, None
+    coeffs, coeffs_sv, coeffsm = igrf.epoch_coeffs(date)
+    X, Y, Z, dX, dY, dZ, dec, hoz, inc, eff, decs, hozs, incs, effs = \
+        iut.synth_elements(coeffs, coeffs_sv, coeffsm, radius, colat, lon,
+                           igrf.parameters['nmax'], sd=sd, cd=cd)
+    return dict(D=dec, I=inc, H=hoz, F=eff, X=X, Y=Y, Z=Z, SV_D=decs,
+                SV_I=incs, SV_H=hozs, SV_F=effs, SV_X=dX, SV_Y=dY, SV_Z=dZ)
+
+
+def test_csv_geodetic(tmp_path):
+    infile = tmp_path / 'points.csv'
+    outfile = tmp_path / 'values.csv'
+    with open(infile, 'w') as file:
+        file.write('# test points\ndate,lat,lon,alt\n')
+        for row in zip(date, lat, lon, alt):
+            file.write(','.join(repr(float(x)) for x in row) + '\n')
+
+    assert igrf_batch.main([str(infile), str(outfile)]) == 0
+
+    with open(outfile) as file:
+        assert file.readline().strip() == ','.join(igrf_batch.COLUMNS)
+    values = np.loadtxt(outfile, delimiter=',', skiprows=1)
+    assert values.shape == (300, len(igrf_batch.COLUMNS))
+    for k, (name, expected) in enumerate(expected_elements(1).items()):
+        # as rounded in the file
+        assert_allclose(values[:, k+4], expected, rtol=0., atol=0.01)
+
+
+def test_npy_geocentric(tmp_path):
+    infile = tmp_path / 'points.npy'
+    outfile = tmp_path / 'values.npy'
+    np.save(infile, np.stack((date, lat, lon, alt + 6371.2), axis=-1))
+
+    igrf_batch.main([str(infile), str(outfile), '--coords', 'geocentric',
+                     '--igrf', '14', '--chunk-size', '64'])
+
+    records = np.load(outfile)
+    assert records.dtype.names == igrf_batch.COLUMNS
+    assert_array_equal(records['lat'], lat)
+    for name, expected in expected_elements(2).items():
+        assert_allclose(records[name], expected, rtol=1e-12, atol=1e-9)
+
+
+def test_npz_output(tmp_path):
+    infile = tmp_path / 'points.npy'
+    outfile = tmp_path / 'values.npz'
+    np.save(infile, np.stack((date, lat, lon, alt), axis=-1))
+
+    igrf_batch.main([str(infile), str(outfile)])
+
+    with np.load(outfile) as values:
+        assert tuple(values.files) == igrf_batch.COLUMNS
+        assert_array_equal(values['date'], date)
+        for name, expected in expected_elements(1).items():
+            assert_allclose(values[name], expected, rtol=1e-12, atol=1e-9)
+
+
+def test_memmap_out(tmp_path):
+    outfile = tmp_path / 'values.npy'
+    out = ioo.open_records(str(outfile), date.size)
+    records = igrf_batch.synth_records(igrf, date, lat, lon, alt,
+                                       chunk_size=64, out=out)
+    assert records is out
+    out.flush()
+    del out, records
+
+    records = np.load(outfile, mmap_mode='r')
+    assert isinstance(records, np.memmap)
+    for name, expected in expected_elements(1).items():
+        assert_allclose(records[name], expected, rtol=1e-12, atol=1e-9)
+
+    with pytest.raises(ValueError):
+        igrf_batch.synth_records(igrf, date, lat, lon, alt,
+                                 out=np.empty(date.size - 1,
+                                              dtype=ioo.records_dtype()))
+
+
+def test_structured_input_and_chunks(tmp_path):
+    infile = tmp_path / 'points.npy'
+    points = np.empty(300, dtype=[(name, float) for name in
+                                  ('alt', 'lon', 'lat', 'date')])
+    points['date'] = date
+    points['lat'] = lat
+    points['lon'] = lon
+    points['alt'] = alt
+    np.save(infile, points)
+
+    records = igrf_batch.synth_records(
+        igrf, *igrf_batch.read_records(str(infile)), chunk_size=7)
+    for name, expected in expected_elements(1).items():
+        assert_allclose(records[name], expected, rtol=1e-12, atol=1e-9)
+
+
+def test_invalid_input(tmp_path):
+    infile = tmp_path / 'points.csv'
+    infile.write_text('2020.0,95.0,10.0,0.0\n')
+    with pytest.raises(SystemExit) as err:
+        igrf_batch.main([str(infile), str(tmp_path / 'values.csv')])
+    assert err.value.code == 1
+
+
+def test_npy_failure(tmp_path, monkeypatch):
+    # a synthesis failing partway leaves no .npy output behind
+    infile = tmp_path / 'points.npy'
+    outfile = tmp_path / 'values.npy'
+    np.save(infile, np.stack((date, lat, lon, alt), axis=-1))
+    synth_elements, calls = iut.synth_elements, []
+
+    def fail(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 2:
+            raise ValueError('failure in the third chunk')
+        return synth_elements(*args, **kwargs)
+
+    monkeypatch.setattr(iut, 'synth_elements', fail)
+    with pytest.raises(SystemExit) as err:
+        igrf_batch.main([str(infile), str(outfile), '--chunk-size', '64'])
+    assert err.value.code == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['points.npy']
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the memory-bounded chunked synthesis (synth_values_chunked), in
+serial and with a pool of threads.
+
+    >> python -m pytest tests/tests_chunked.py
+
+"""
+
+import tracemalloc
+
+import igrf_utils as iut
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+igrf = reg.get_model(14)
+
+rng = np.random.default_rng(3)
+theta = rng.uniform(0., 180., 1000)
+phi = rng.uniform(-180., 360., 1000)
+radius = rng.uniform(6371.2, 7000., 1000)
+coeffs, _ = igrf.interpolate(2017.3)
+
+
+@pytest.mark.parametrize('chunk_size', [3, 7, 256, 1000, 5000])
+def test_equals_synth_values(chunk_size, backend):
+    expected = iut.synth_values(coeffs, radius, theta, phi, backend=backend)
+    found = iut.synth_values_chunked(coeffs, radius, theta, phi,
+                                     chunk_size=chunk_size, backend=backend)
+    for b_found, b_expected in zip(found, expected):
+        assert_array_equal(b_found, b_expected)
+
+
+def test_grid_and_varying_coefficients(backend):
+    # one set of coefficients per longitude, broadcast over the grid
+    coeffs_lon, _ = igrf.interpolate(np.linspace(1950., 2020., 40))
+    colat = np.linspace(0., 180., 31)
+    lon = np.linspace(-180., 180., 40)
+    expected = iut.synth_values(coeffs_lon, 6500., colat, lon, grid=True,
+                                nmax=10, backend=backend)
+    found = iut.synth_values_chunked(coeffs_lon, 6500., colat, lon,
+                                     grid=True, nmax=10, chunk_size=97,
+                                     backend=backend)
+    for b_found, b_expected in zip(found, expected):
+        assert b_found.shape == (31, 40)
+        assert_array_equal(b_found, b_expected)
+
+
+def test_out(backend):
+    out = tuple(np.full(theta.shape, np.nan) for _ in range(3))
+    found = iut.synth_values_chunked(coeffs, radius, theta, phi,
+                                     chunk_size=300, out=out, backend=backend)
+    for b_found, o, b_expected in zip(found, out, iut.synth_values(
+            coeffs, radius, theta, phi, backend=backend)):
+        assert b_found is o
+        assert_array_equal(o, b_expected)
+
+    with pytest.raises(ValueError):
+        iut.synth_values_chunked(coeffs, radius, theta, phi,
+                                 out=tuple(np.empty(999) for _ in range(3)))
+
+
+def test_max_memory():
+    npoints = 50000
+    theta = rng.uniform(0., 180., npoints)
+    phi = rng.uniform(-180., 180., npoints)
+    max_memory = 4 * 2**20
+    outputs = 3 * npoints * 8
+
+    # the NumPy backend, whose allocations are traced
+    tracemalloc.start()
+    try:
+        iut.synth_values_chunked(coeffs, 6371.2, theta, phi,
+                                 max_memory=max_memory, backend='numpy')
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < outputs + max_memory
+
+
+@pytest.mark.parametrize('workers', [2, 4])
+@pytest.mark.parametrize('chunk_size', [None, 33])
+def test_workers(workers, chunk_size, backend):
+    expected = iut.synth_values(coeffs, radius, theta, phi, backend=backend)
+    found = iut.synth_values_chunked(coeffs, radius, theta, phi,
+                                     chunk_size=chunk_size, workers=workers,
+                                     backend=backend)
+    for b_found, b_expected in zip(found, expected):
+        assert_array_equal(b_found, b_expected)
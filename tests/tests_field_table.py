@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the interpolation tables of the main field (field_table.py).
+
+    >> python -m pytest tests/tests_field_table.py
+
+"""
+
+import field_table as ft
+import igrf_utils as iut
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+igrf = reg.get_model(14)
+
+
+@pytest.fixture(scope='module')
+def table():
+    return ft.FieldTable(igrf, (2018., 2027.), alts=(0., 50.), step=2.)
+
+
+def test_nodes(table):
+    # the snapshots of 2020 and 2025 are nodes, so that the interpolation
+    # in time is exact
+    assert_allclose(table.date, [2018., 2020., 2025., 2027.])
+    assert table.lat.size == 91 and table.lon.size == 181
+
+    # exact at the lattice nodes, at any date
+    rng = np.random.default_rng(1)
+    lat = table.lat[rng.integers(0, 91, 200)]
+    lon = table.lon[rng.integers(0, 181, 200)]
+    date = rng.uniform(2018., 2027., 200)
+    alt = np.where(rng.random(200) < 0.5, 0., 50.)
+    assert_allclose(table(date, lat, lon, alt),
+                    table.reference(date, lat, lon, alt), rtol=0, atol=1e-6)
+
+
+def test_errors(table):
+    errors = table.check()
+    assert errors == table.errors
+    assert set(errors) == set(ft.ELEMENTS)
+
+    # measured error is a bound on other points
+    rng = np.random.default_rng(2)
+    lat, lon = rng.uniform(-90., 90., 5000), rng.uniform(-180., 180., 5000)
+    date, alt = rng.uniform(2018., 2027., 5000), rng.uniform(0., 50., 5000)
+    for k, name in enumerate('XYZ'):
+        error = np.abs(table(date, lat, lon, alt)[k]
+                       - table.reference(date, lat, lon, alt)[k])
+        assert error.max() <= 1.1 * errors[name]
+
+
+def test_bicubic_more_accurate():
+    errors = {method: ft.FieldTable(igrf, 2025., step=2., method=method,
+                                    check_points=4000).errors
+              for method in ft.METHODS}
+    for name in ft.ELEMENTS:
+        assert errors['bicubic'][name] < 0.1 * errors['bilinear'][name]
+
+
+def test_geocentric_and_elements():
+    table = ft.FieldTable(igrf, 2025., alts=6371.2, step=1., itype=2)
+    assert table.errors['X'] < 0.2
+    lat, lon = np.array([45., -33.3]), np.array([-3., 151.2])
+    B_radius, B_theta, B_phi = iut.synth_values(
+        igrf.interpolate(2025.)[0], 6371.2, 90. - lat, lon)
+    expected = iut.xyz2dhif(-B_theta, B_phi, -B_radius)
+    assert_allclose(table.elements(2025., lat, lon), expected, atol=0.1)
+
+
+def test_longitude_wrap(table):
+    assert_allclose(table(2025., 10., 190., 0.), table(2025., 10., -170., 0.))
+    assert_allclose(table(2025., 10., -180., 0.), table(2025., 10., 180., 0.))
+
+
+def test_from_tolerance():
+    table = ft.FieldTable.from_tolerance(igrf, (2020., 2025.), 0.05,
+                                         element='D', check_points=4000)
+    assert table.errors['D'] <= 0.05
+    coarser = ft.STEPS[ft.STEPS.index(table.step) - 1]
+    assert ft.FieldTable(igrf, (2020., 2025.), step=coarser,
+                         check_points=4000).errors['D'] > 0.05
+
+    with pytest.raises(ValueError):
+        ft.FieldTable.from_tolerance(igrf, 2025., 1e-9, steps=(5.,),
+                                     check_points=100)
+
+
+def test_invalid(table):
+    with pytest.raises(ValueError):
+        ft.FieldTable(igrf, 2025., step=0.7)
+    with pytest.raises(ValueError):
+        ft.FieldTable(igrf, 2025., method='nearest')
+    with pytest.raises(ValueError):
+        ft.FieldTable(igrf, 2025., itype=2)  # radius 0 km
+    with pytest.raises(ValueError):
+        table(2030., 0., 0., 0.)
+    with pytest.raises(ValueError):
+        table(2025., 0., 0., 100.)
+    with pytest.raises(ValueError):
+        table(2025., 91., 0., 0.)
+    with pytest.raises(ValueError):
+        table(2025., 0., 0.)  # several altitudes
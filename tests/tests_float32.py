@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Worst-case error of the single precision synthesis (dtype=np.float32)
+against float64, over the globe and the full 1900-2035 range of IGRF-14,
+for each backend.
+
+    >> python -m pytest tests/tests_float32.py
+
+"""
+
+import igrf_utils as iut
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+igrf = reg.get_model(14)
+
+# global grid including both poles, every five years (and the end of the
+# extrapolated range)
+colat = np.arange(0., 180.1, 2.)
+lon = np.arange(-180., 180., 2.)
+dates = np.arange(1900., 2035.1, 5.)
+
+
+def synth_all(coeffs, coeffs_sv, dtype, backend):
+    B = iut.synth_values(coeffs, 6371.2, colat, lon, grid=True, dtype=dtype,
+                         backend=backend)
+    S = iut.synth_values(coeffs_sv, 6371.2, colat, lon, grid=True,
+                         dtype=dtype, backend=backend)
+    X, Y, Z = -B[1], B[2], -B[0]
+    dX, dY, dZ = -S[1], S[2], -S[0]
+    return (B, iut.xyz2dhif(X, Y, Z, dtype=dtype),
+            iut.xyz2dhif_sv(X, Y, Z, dX, dY, dZ, dtype=dtype))
+
+
+@pytest.fixture(scope='module')
+def worst_errors(backend):
+    errors = np.zeros((3, 4))
+    for date in dates:
+        coeffs, coeffs_sv = igrf.interpolate(date)
+        B64, E64, S64 = synth_all(coeffs, coeffs_sv, None, backend)
+        B32, E32, S32 = synth_all(coeffs, coeffs_sv, np.float32, backend)
+        assert all(x.dtype == np.float32 for x in B32 + E32 + S32)
+
+        # the SV of D diverges with 1/H near the magnetic poles
+        strong = E64[1] > 1000.
+        errors[0, :3] = np.maximum(errors[0, :3], [
+            np.max(np.abs(a - b)) for a, b in zip(B64, B32)])
+        errors[1] = np.maximum(errors[1], [
+            np.max(np.abs(a - b)) for a, b in zip(E64, E32)])
+        errors[2] = np.maximum(errors[2], [
+            np.max(np.abs(a - b)[strong]) for a, b in zip(S64, S32)])
+    return errors
+
+
+def test_components(worst_errors):
+    # B_radius, B_theta, B_phi in nT
+    assert np.all(worst_errors[0, :3] < 0.1)
+
+
+def test_elements(worst_errors):
+    dec, hoz, inc, eff = worst_errors[1]
+    assert dec < 0.02  # degrees
+    assert hoz < 0.1 and eff < 0.1  # nT
+    assert inc < 1e-3  # degrees
+
+
+def test_secular_variation(worst_errors):
+    # where H > 1000 nT
+    decs, hozs, incs, effs = worst_errors[2]
+    assert decs < 0.01 and incs < 0.01  # arcmin/yr
+    assert hozs < 0.01 and effs < 0.01  # nT/yr
+
+
+def test_legendre_float32(backend):
+    theta = np.linspace(0., 180., 101)
+    Pnm64 = iut.legendre_poly(13, theta, backend=backend)
+    Pnm32 = iut.legendre_poly(13, theta, dtype=np.float32, backend=backend)
+    assert Pnm32.dtype == np.float32
+    # values and derivatives reach about 10 at degree 13
+    assert np.max(np.abs(Pnm64 - Pnm32)) < 1e-4
+
+
+def test_default_is_float64(backend):
+    coeffs, _ = igrf.interpolate(2020.)
+    B = iut.synth_values(coeffs, 6371.2, colat, lon, grid=True,
+                         backend=backend)
+    B64 = iut.synth_values(coeffs, 6371.2, colat, lon, grid=True,
+                           dtype=np.float64, backend=backend)
+    for b, b64 in zip(B, B64):
+        assert b.dtype == np.float64
+        assert_array_equal(b, b64)
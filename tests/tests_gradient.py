@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the analytic gradient tensor of the field (synth_gradient and
+synth_values(..., gradient=True) in igrf_utils.py).
+
+    >> python -m pytest tests/tests_gradient.py
+
+"""
+
+import igrf_utils as iut
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+coeffs, _ = reg.get_model(14).interpolate(2025.)
+
+rng = np.random.default_rng(21)
+npoints = 200
+radius = rng.uniform(6371.2, 12000., npoints)
+theta = np.degrees(np.arccos(rng.uniform(-0.999, 0.999, npoints)))
+phi = rng.uniform(-180., 180., npoints)
+
+
+def local_frame(theta, phi):
+    # unit vectors of the radius, theta and phi directions, (..., 3, 3)
+    th, ph = np.radians(theta), np.radians(phi)
+    return np.stack((
+        np.stack((np.sin(th)*np.cos(ph), np.sin(th)*np.sin(ph), np.cos(th)),
+                 axis=-1),
+        np.stack((np.cos(th)*np.cos(ph), np.cos(th)*np.sin(ph), -np.sin(th)),
+                 axis=-1),
+        np.stack((-np.sin(ph), np.cos(ph), np.zeros_like(ph)), axis=-1)),
+        axis=-2)
+
+
+def cartesian_field(x):
+    # field in Cartesian components at Cartesian positions (..., 3) in km
+    radius = np.linalg.norm(x, axis=-1)
+    theta = np.degrees(np.arccos(x[..., 2] / radius))
+    phi = np.degrees(np.arctan2(x[..., 1], x[..., 0]))
+    B = np.stack(iut.synth_values(coeffs, radius, theta, phi,
+                                  backend='numpy'), axis=-1)
+    return np.einsum('...i,...ij->...j', B, local_frame(theta, phi))
+
+
+def test_field_matches_synth_values(backend):
+    B, grad_B = iut.synth_gradient(coeffs, radius, theta, phi)
+    assert grad_B.shape == (npoints, 3, 3)
+    assert_allclose(B, iut.synth_values(coeffs, radius, theta, phi,
+                                        backend=backend),
+                    rtol=1e-12, atol=1e-8)
+
+    # also at the poles, where only the gradient is undefined
+    B, grad_B = iut.synth_gradient(coeffs, 6371.2, [0., 180.], [10., 10.])
+    assert_allclose(B, iut.synth_values(coeffs, 6371.2, [0., 180.],
+                                        [10., 10.], backend=backend),
+                    rtol=1e-12)
+    assert np.all(np.isnan(grad_B))
+
+
+def test_symmetric_traceless():
+    _, grad_B = iut.synth_gradient(coeffs, radius, theta, phi)
+    scale = np.abs(grad_B).max()
+    assert_allclose(grad_B, np.swapaxes(grad_B, -1, -2), atol=1e-12*scale)
+    assert_allclose(np.trace(grad_B, axis1=-2, axis2=-1), 0.,
+                    atol=1e-12*scale)
+
+
+def test_finite_differences():
+    _, grad_B = iut.synth_gradient(coeffs, radius, theta, phi)
+
+    # central differences of the Cartesian field, rotated to the local frame
+    frame = local_frame(theta, phi)
+    x = radius[:, None] * frame[:, 0]
+    step = 1e-2  # km
+    jacobian = np.stack([
+        (cartesian_field(x + step*e) - cartesian_field(x - step*e)) / (2*step)
+        for e in np.eye(3)], axis=-2)
+    expected = frame @ jacobian @ np.swapaxes(frame, -1, -2)
+
+    assert_allclose(grad_B, expected, rtol=0., atol=1e-6)
+
+
+def test_synth_values_option_and_grid():
+    colat = np.linspace(1., 179., 7)
+    lon = np.linspace(-180., 150., 12)
+    B_radius, B_theta, B_phi, grad_B = iut.synth_values(
+        coeffs, 6371.2, colat, lon, grid=True, gradient=True)
+    assert B_radius.shape == (7, 12) and grad_B.shape == (7, 12, 3, 3)
+
+    theta_grid, phi_grid = np.meshgrid(colat, lon, indexing='ij')
+    _, expected = iut.synth_gradient(coeffs, 6371.2, theta_grid, phi_grid)
+    assert_allclose(grad_B, expected, rtol=1e-12, atol=1e-12)
+
+    # nmin skips the lowest degrees in the gradient too
+    _, grad_dipole = iut.synth_gradient(coeffs[:3], radius, theta, phi)
+    _, grad_nondipole = iut.synth_gradient(coeffs, radius, theta, phi, nmin=2)
+    assert_allclose(grad_dipole + grad_nondipole,
+                    iut.synth_gradient(coeffs, radius, theta, phi)[1],
+                    rtol=1e-10, atol=1e-10)
+
+
+@pytest.mark.parametrize('n', [1, 2, 3])
+def test_laplace(n):
+    # single degree fields: the radial derivative of B_radius scales as
+    # -(n+2)/r B_radius
+    c = np.zeros(n*(n+2))
+    c[(n-1)*(n+1):] = rng.standard_normal(2*n+1)
+    B, grad_B = iut.synth_gradient(c, radius, theta, phi)
+    assert_allclose(grad_B[..., 0, 0], -(n+2) / radius * B[0],
+                    rtol=1e-10, atol=1e-14)
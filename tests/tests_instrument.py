@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the stage instrumentation (instrument.py).
+
+    >> python -m pytest tests/tests_instrument.py
+
+"""
+
+import os
+import tracemalloc
+
+import igrf_batch
+import igrf_utils as iut
+import instrument as ins
+import io_options as ioo
+import model_registry as reg
+import numpy as np
+import pytest
+
+igrf = reg.get_model(14)
+
+
+@pytest.fixture(autouse=True)
+def restore():
+    state = ins.enabled(), ins._memory, tracemalloc.is_tracing()
+    ins.disable()
+    ins.reset()
+    yield
+    ins.disable()
+    ins.reset()
+    if not state[2] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    if state[0]:
+        ins.enable(state[1])
+
+
+def test_disabled():
+    iut.synth_values(igrf.interpolate(2020.)[0], 6371.2, 45., 0.)
+    with ins.stage('block', 10):
+        pass
+    assert ins.report() == {}
+    assert ins.stage('block') is ins.stage('other')  # shared null context
+
+
+def test_profile():
+    coeffs, _ = igrf.interpolate(np.linspace(2000., 2020., 5))
+    theta = np.linspace(1., 179., 50)
+    with ins.profile():
+        igrf.interpolate(np.linspace(2000., 2020., 30))
+        iut.synth_values(coeffs[0], 6371.2, theta, 0., backend='numpy')
+        iut.synth_values(coeffs[0], 6371.2, theta[:20], 0.,
+                         backend='numpy')
+        with ins.stage('block', 7):
+            iut.gg_to_geo(np.zeros(3), np.array([10., 20., 30.]))
+    assert not ins.enabled()
+
+    stats = ins.report()
+    assert set(stats) == {'interpolate', 'synth_values', 'legendre_poly',
+                          'block', 'gg_to_geo'}
+    assert stats['interpolate']['calls'] == 1
+    assert stats['interpolate']['points'] == 30
+    assert stats['synth_values']['calls'] == 2
+    assert stats['synth_values']['points'] == 70
+    assert stats['legendre_poly']['points'] == 70
+    assert stats['block'] == dict(calls=1, seconds=stats['block']['seconds'],
+                                  points=7, peak_bytes=None)
+    assert stats['gg_to_geo']['points'] == 3
+    # nested stages are included in the time of the enclosing stage
+    assert stats['legendre_poly']['seconds'] <= \
+        stats['synth_values']['seconds']
+    assert stats['gg_to_geo']['seconds'] <= stats['block']['seconds']
+
+    with ins.profile(reset_stats=False):
+        igrf.interpolate(2020.)
+    assert ins.report()['interpolate']['calls'] == 2
+    with ins.profile():
+        pass
+    assert ins.report() == {}
+
+
+def test_memory():
+    with ins.profile(memory=True):
+        with ins.stage('outer'):
+            with ins.stage('inner'):
+                inner = np.ones(2**20)  # 8 MiB
+                del inner
+            outer = np.ones(2**19)  # 4 MiB
+            del outer
+        with ins.stage('after'):
+            pass
+    stats = ins.report()
+    assert 8 * 2**20 <= stats['inner']['peak_bytes'] < 9 * 2**20
+    # the peak of the outer stage includes the inner one
+    assert 8 * 2**20 <= stats['outer']['peak_bytes'] < 9 * 2**20
+    assert stats['after']['peak_bytes'] < 2**20
+
+
+def test_load_shcfile(tmp_path):
+    # one stage per load: parsing on a cache miss, reading on a hit
+    filepath = os.path.join(reg.SHC_DIR, 'IGRF14.SHC')
+    with ins.profile():
+        iut.load_shcfile(filepath)
+        iut.load_shcfile(filepath, cache=True, cache_dir=str(tmp_path))
+    stats = ins.report()
+    assert stats['load_shcfile']['calls'] == 2
+    assert stats['load_shcfile[cache]']['calls'] == 1
+    with ins.profile():
+        iut.load_shcfile(filepath, cache=True, cache_dir=str(tmp_path))
+    assert set(ins.report()) == {'load_shcfile[cache]'}
+
+
+def test_writers(tmp_path):
+    n = 100
+    values = list(np.random.default_rng(0).uniform(-6e4, 6e4, (14, n)))
+    lat = np.linspace(-80., 80., n)
+    with ins.profile():
+        ioo.write3(str(tmp_path / 'grid.txt'), np.array([2025.]),
+                   np.array([6371.2]), lat, 90 - lat, lat + 100., *values,
+                   2, '14')
+    assert ins.report()['write3']['points'] == n
+
+
+def test_decorator():
+    assert iut.synth_values_multi.__name__ == 'synth_values_multi'
+    assert 'several sets' in iut.synth_values_multi.__doc__
+    assert iut.legendre_poly.__wrapped__ is not None
+
+
+@pytest.mark.parametrize('value, enabled, memory', [
+    ('', False, False), ('0', False, False), ('1', True, False),
+    ('time', True, False), ('Memory', True, True)])
+def test_env(monkeypatch, value, enabled, memory):
+    monkeypatch.setenv('PYIGRF_PROFILE', value)
+    assert ins.enable_from_env() == enabled
+    assert ins.enabled() == enabled
+    assert ins._memory == memory
+
+
+def test_env_unknown(monkeypatch):
+    monkeypatch.setenv('PYIGRF_PROFILE', 'verbose')
+    with pytest.warns(UserWarning):
+        assert not ins.enable_from_env()
+    assert not ins.enabled()
+
+
+def test_cli_report(tmp_path, capsys):
+    infile = tmp_path / 'points.csv'
+    infile.write_text('2020.5,45,-3,0\n2021.5,-10,100,400\n')
+    ins.enable()
+    assert igrf_batch.main([str(infile), str(tmp_path / 'values.csv')]) == 0
+    report = capsys.readouterr().err
+    assert 'synth_values' in report and 'rotation' in report
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the piecewise linear coefficient interpolation of the igrf class,
+checked against scipy.interpolate.interp1d.
+
+    >> python -m pytest tests/tests_interpolate.py
+
+"""
+
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+from scipy import interpolate
+
+igrf = reg.get_model(14)
+f = interpolate.interp1d(igrf.time, igrf.coeffs, fill_value='extrapolate')
+
+
+def test_matches_interp1d():
+    dates = np.random.default_rng(0).uniform(1890., 2040., 1000)
+    coeffs, _ = igrf.interpolate(dates)
+    assert coeffs.shape == (1000, 195)
+    assert_allclose(coeffs, f(dates).T, rtol=1e-13, atol=1e-10)
+
+    coeffs, _ = igrf.interpolate(2017.3)
+    assert coeffs.shape == (195,)
+    assert_allclose(coeffs, f(2017.3), rtol=1e-13, atol=1e-10)
+
+
+def test_derivative():
+    dates = np.array([[1900., 1902.5], [2020., 2031.]])
+    _, coeffs_sv = igrf.interpolate(dates)
+    assert coeffs_sv.shape == (2, 2, 195)
+    # constant within each piece, from the piece starting at a snapshot
+    for date, sv in zip(dates.ravel(), coeffs_sv.reshape(-1, 195)):
+        start = min(5*((date - 1900)//5) + 1900, 2025.)
+        assert_allclose(sv, f(start+1) - f(start), atol=1e-9)
+
+
+@pytest.mark.parametrize('extrapolate', ['linear', 'constant', 'nan',
+                                         'raise'])
+def test_extrapolation(extrapolate):
+    dates = np.array([1850., 1990., 2050.])
+    if extrapolate == 'raise':
+        with pytest.raises(ValueError):
+            igrf.interpolate(dates, extrapolate=extrapolate)
+        return
+
+    coeffs, coeffs_sv = igrf.interpolate(dates, extrapolate=extrapolate)
+    assert_allclose(coeffs[1], f(1990.), atol=1e-9)
+    if extrapolate == 'linear':
+        assert_allclose(coeffs, f(dates).T, atol=1e-9)
+    elif extrapolate == 'constant':
+        assert_array_equal(coeffs[0], igrf.coeffs[:, 0])
+        assert_allclose(coeffs[2], igrf.coeffs[:, -1], atol=1e-9)
+        assert np.all(coeffs_sv[[0, 2]] == 0)
+    else:
+        assert np.all(np.isnan(coeffs[[0, 2]]))
+        assert np.all(np.isnan(coeffs_sv[[0, 2]]))
+
+
+@pytest.mark.parametrize('extrapolate', ['constant', 'nan'])
+def test_extrapolation_scalar(extrapolate):
+    # the policies must not modify the model shared through the registry
+    expected = igrf.interpolate(1850.)
+    slopes = igrf.slopes.copy()
+    coeffs, coeffs_sv = igrf.interpolate(1850., extrapolate=extrapolate)
+    assert coeffs.shape == coeffs_sv.shape == (195,)
+    assert np.all(coeffs_sv == 0) if extrapolate == 'constant' \
+        else np.all(np.isnan(coeffs_sv))
+    assert_array_equal(igrf.slopes, slopes)
+    for result, reference in zip(igrf.interpolate(1850.), expected):
+        assert_array_equal(result, reference)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the output of write1, write2 and write3 (io_options.py): the text
+rows are formatted in blocks and must match the row-by-row formatting they
+replace, and .npy/.npz names write the values in binary.
+
+    >> python -m pytest tests/tests_io_options.py
+
+"""
+
+import io_options as ioo
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+rng = np.random.default_rng(3)
+nrows = 9000  # more than one block of rows
+# values of the columns, with rounding ties, signed zeros and large values
+values = rng.uniform(-6e4, 6e4, (14, nrows))
+values[:, :6] = [0.05, -0.05, 0., -0., 0.125, -2.5e-3]
+values[:, 6] = 123456.789
+date = np.round(rng.uniform(1900., 2030., nrows), 3)
+date[:3] = [2000., 1985.5, 2024.123]
+lat = rng.uniform(-90., 90., nrows)
+lon = rng.uniform(-180., 180., nrows)
+lat[:2] = lon[:2] = [-0., 89.99995]
+
+SCREEN = ['{: .3f}', '{: .3f}', '{: .1f}', '{: .1f}', '{: .1f}', '{: .1f}',
+          '{: .1f}', '{: .2f}', '{: .2f}', '{: .1f}', '{: .1f}', '{: .1f}',
+          '{: .1f}', '{: .1f}']
+FILE = ['{: 6.2f}', '{: 6.2f}', '{: 9.1f}', '{: 9.1f}', '{: 9.1f}',
+        '{: 9.1f}', '{: 9.1f}', '{: 5.2f}', '{: 5.2f}', '{: 7.1f}',
+        '{: 7.1f}', '{: 7.1f}', '{: 7.1f}', '{: 7.1f}']
+
+
+def write_args(name):
+    # write(name, date, alt, lat, colat, lon, X, Y, Z, dX, dY, dZ,
+    #       dec, hoz, inc, eff, decs, hozs, incs, effs, itype, igrf_gen)
+    dec, inc, hoz, eff, X, Y, Z, decs, incs, hozs, effs, dX, dY, dZ = values
+    return (name, date, np.full(nrows, 6371.2), lat, 90 - lat, lon,
+            X, Y, Z, dX, dY, dZ, dec, hoz, inc, eff, decs, hozs, incs, effs,
+            2, '14')
+
+
+def reference_rows(leading, screen):
+    # one row at a time, as written before the block formatting
+    lines = []
+    for i in range(nrows):
+        fields = [str(column[i]) for column in leading]
+        if screen:
+            fields += [fmt.format(column[i])
+                       for fmt, column in zip(SCREEN, values)]
+            lines.append(' '.join(fields) + '\n')
+        else:
+            lines.append(''.join(field + ' ' for field in fields)
+                         + ''.join(fmt.format(column[i])
+                                   for fmt, column in zip(FILE, values))
+                         + '\n')
+    return ''.join(lines)
+
+
+@pytest.mark.parametrize('write, leading', [
+    (ioo.write2, lambda: [date]),
+    (ioo.write3, lambda: [np.round(lat, decimals=4),
+                          np.round(lon, decimals=4)])])
+def test_screen_rows(write, leading, capsys):
+    write(*write_args(None))
+    text = capsys.readouterr().out
+    assert text.split('\n', 3)[3] == reference_rows(leading(), True)
+
+
+@pytest.mark.parametrize('write, leading', [
+    (ioo.write2, lambda: [date]),
+    (ioo.write3, lambda: [np.round(lat, decimals=4),
+                          np.round(lon, decimals=4)])])
+def test_file_rows(write, leading, tmp_path):
+    filename = tmp_path / 'values.txt'
+    write(*write_args(str(filename)))
+    text = filename.read_text()
+    assert text.split('\n', 2)[2] == reference_rows(leading(), False)
+
+
+def test_format_rows_blocks():
+    columns = (np.arange(10.), -np.arange(10.))
+    blocks = list(ioo.format_rows('%s % .1f\n', columns, chunk_size=4))
+    assert len(blocks) == 3
+    assert ''.join(blocks) == ''.join(
+        f'{a} {b: .1f}\n' for a, b in zip(*columns))
+    assert list(ioo.format_rows('%s\n', (np.empty(0),))) == []
+
+
+@pytest.mark.parametrize('extension', ['.npy', '.npz'])
+@pytest.mark.parametrize('write', [ioo.write2, ioo.write3])
+def test_binary_files(write, extension, tmp_path):
+    filename = tmp_path / ('values' + extension)
+    write(*write_args(str(filename)))
+    data = np.load(filename)
+    if extension == '.npy':
+        assert data.dtype == ioo.records_dtype()
+    else:
+        assert tuple(data.files) == ioo.FIELDS
+    assert_array_equal(data['lat'], lat)
+    assert_array_equal(data['lon'], lon)
+    assert_array_equal(data['alt'], 6371.2)
+    assert_array_equal(data['date'], date)
+    for field, column in zip(ioo.FIELDS[4:], values):
+        assert_array_equal(data[field], column)
+
+
+def test_binary_spot_value(tmp_path):
+    filename = tmp_path / 'values.npy'
+    args = [np.float64(x) for x in range(14)]
+    # X, Y, Z, dX, dY, dZ, dec, hoz, inc, eff, decs, hozs, incs, effs
+    ioo.write1(str(filename), 2020., 6371.2, 45., 45., 10., *args, 2, '14')
+    records = np.load(filename)
+    assert records.shape == (1,)
+    assert records[['date', 'lat', 'lon', 'alt']].item() == (
+        2020., 45., 10., 6371.2)
+    assert records[['D', 'I', 'H', 'F', 'X', 'SV_D', 'SV_Z']].item() == (
+        6., 8., 7., 9., 0., 10., 5.)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for legendre_poly, checked against the straightforward recursion over
+every (n, m) that it replaces, and against closed forms for low degrees.
+
+    >> python -m pytest tests/tests_legendre.py
+
+"""
+
+import igrf_utils as iut
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+from legendre_reference import legendre_poly_loop
+
+
+@pytest.mark.parametrize('nmax', [1, 2, 3, 8, 13, 30, 60])
+def test_matches_loop(nmax, backend):
+    rng = np.random.default_rng(nmax)
+    for theta in [rng.uniform(0., 180., 100), np.array(32.5),
+                  rng.uniform(0., 180., (3, 7)), np.array([0., 90., 180.])]:
+        assert_array_equal(iut.legendre_poly(nmax, theta, backend=backend),
+                           legendre_poly_loop(nmax, theta))
+
+
+def test_blocks():
+    # more points than one block of the vectorised recursion
+    theta = np.linspace(0., 180., 2*iut._LEGENDRE_BLOCK_SIZE + 5)
+    assert_array_equal(iut.legendre_poly(5, theta, backend='numpy'),
+                       legendre_poly_loop(5, theta))
+
+
+def test_closed_form(backend):
+    theta = np.linspace(1., 179., 50)
+    c = np.cos(np.radians(theta))
+    s = np.sin(np.radians(theta))
+    Pnm = iut.legendre_poly(2, theta, backend=backend)
+
+    assert_allclose(Pnm[1, 0], c, atol=1e-15)
+    assert_allclose(Pnm[1, 1], s, atol=1e-15)
+    assert_allclose(Pnm[2, 0], 1.5*c**2 - 0.5, atol=1e-15)
+    assert_allclose(Pnm[2, 1], np.sqrt(3)*c*s, atol=1e-15)
+    assert_allclose(Pnm[2, 2], np.sqrt(3)/2*s**2, atol=1e-15)
+    # derivatives with respect to theta
+    assert_allclose(Pnm[0, 3], -3*c*s, atol=1e-14)
+    assert_allclose(Pnm[2, 3], np.sqrt(3)*s*c, atol=1e-14)
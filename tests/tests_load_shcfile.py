@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for load_shcfile: parsing of high degree files, checks on the
+coefficient ordering, the binary coefficient cache and the packed archive of
+all IGRF generations.
+
+    >> python -m pytest tests/tests_load_shcfile.py
+
+"""
+
+import glob
+import os
+import shutil
+
+import igrf_utils as iut
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+SHC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                       'SHC_files')
+SHC_FILES = sorted(glob.glob(os.path.join(SHC_DIR, 'IGRF*.SHC')))
+
+
+def assert_same_model(found, expected):
+    assert_array_equal(found.time, expected.time)
+    assert_array_equal(found.coeffs, expected.coeffs)
+    assert found.parameters == expected.parameters
+
+
+def write_shcfile(filepath, coeffs, degree, order, time):
+    with open(filepath, 'w') as f:
+        f.write('# test model\n')
+        f.write(f'1 {degree.max()} {time.size} 2 1 {time[0]} {time[-1]}\n')
+        f.write(' '.join(str(t) for t in time) + '\n')
+        for n, m, row in zip(degree, order, coeffs):
+            f.write(f'{n} {m} ' + ' '.join(repr(v) for v in row.tolist()) + '\n')
+
+
+def test_load_high_degree(tmp_path):
+    nmax = 60
+    time = np.array([2000., 2005., 2010.])
+    degree, order = iut._shc_degree_order(1, nmax)
+    coeffs = np.random.default_rng(0).normal(size=(degree.size, time.size))
+    filepath = str(tmp_path / 'model.shc')
+    write_shcfile(filepath, coeffs, degree, order, time)
+
+    model = iut.load_shcfile(filepath)
+    assert model.parameters['nmax'] == nmax
+    assert model.coeffs.shape == (nmax*(nmax+2), 3)
+    assert_array_equal(model.time, time)
+    assert_array_equal(model.coeffs, coeffs)
+
+
+def test_load_wrong_ordering(tmp_path):
+    time = np.array([2000., 2005.])
+    degree, order = iut._shc_degree_order(1, 3)
+    coeffs = np.zeros((degree.size, time.size))
+    filepath = str(tmp_path / 'model.shc')
+
+    write_shcfile(filepath, coeffs, degree, order[::-1], time)
+    with pytest.raises(ValueError, match='Unexpected coefficient'):
+        iut.load_shcfile(filepath)
+
+    write_shcfile(filepath, coeffs[:-1], degree[:-1], order[:-1], time)
+    with pytest.raises(ValueError, match='Expected'):
+        iut.load_shcfile(filepath)
+
+
+def test_cache_roundtrip(tmp_path):
+    filepath = os.path.join(SHC_DIR, 'IGRF14.SHC')
+    expected = iut.load_shcfile(filepath)
+
+    first = iut.load_shcfile(filepath, cache=True, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+    second = iut.load_shcfile(filepath, cache=True, cache_dir=str(tmp_path))
+
+    assert_same_model(first, expected)
+    assert_same_model(second, expected)
+
+
+def test_cache_invalidated_on_change(tmp_path):
+    filepath = str(tmp_path / 'IGRF13.SHC')
+    shutil.copy(os.path.join(SHC_DIR, 'IGRF13.SHC'), filepath)
+    iut.load_shcfile(filepath, cache=True)
+    cache_file = iut._shc_cache_path(filepath)
+    assert os.path.exists(cache_file)
+
+    # replace the file with another generation, keeping the old cache
+    shutil.copy(os.path.join(SHC_DIR, 'IGRF12.SHC'), filepath)
+    os.utime(filepath, ns=(0, 0))
+    with pytest.raises(ValueError):
+        iut._read_archive(cache_file, key=iut._shc_cache_key(filepath))
+
+    found = iut.load_shcfile(filepath, cache=True)
+    expected = iut.load_shcfile(filepath)
+    assert_same_model(found, expected)
+    assert found.time[-1] == 2020
+
+
+def test_cache_long_path(tmp_path):
+    # paths longer than the default width of the index are stored in full,
+    # so that the cache stays valid
+    directory = tmp_path
+    for part in range(4):
+        directory = directory / (f'{part}' * 100)
+    directory.mkdir(parents=True)
+    filepath = str(directory / 'IGRF14.SHC')
+    shutil.copy(os.path.join(SHC_DIR, 'IGRF14.SHC'), filepath)
+    assert len(os.path.abspath(filepath)) > 256
+
+    cache_dir = str(tmp_path / 'cache')
+    iut.load_shcfile(filepath, cache=True, cache_dir=cache_dir)
+    cache_file = iut._shc_cache_path(filepath, cache_dir)
+    mtime = os.stat(cache_file).st_mtime_ns
+    found = iut._read_archive(cache_file, key=iut._shc_cache_key(filepath))
+    assert_same_model(found, iut.load_shcfile(filepath))
+    iut.load_shcfile(filepath, cache=True, cache_dir=cache_dir)
+    assert os.stat(cache_file).st_mtime_ns == mtime  # not rewritten
+
+
+def test_packed_archive(tmp_path):
+    archive = str(tmp_path / 'igrf_all.shcb')
+    names = iut.pack_shcfiles(SHC_FILES, archive)
+    assert len(names) == 14
+
+    for filepath, name in zip(SHC_FILES, names):
+        assert_same_model(iut.load_packed(archive, name),
+                          iut.load_shcfile(filepath))
+    assert_same_model(iut.load_packed(archive, 'IGRF14.SHC', verify=True),
+                      iut.load_shcfile(SHC_FILES[names.index('IGRF14.SHC')]))
+
+    with pytest.raises(KeyError):
+        iut.load_packed(archive, 'IGRF15.SHC')
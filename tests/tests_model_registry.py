@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the lazily loaded LRU registry of IGRF generations.
+
+    >> python -m pytest tests/tests_model_registry.py
+
+"""
+
+import os
+import threading
+
+import igrf_utils as iut
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+
+def test_available_generations():
+    assert reg.available_generations() == list(range(1, 15))
+
+
+def test_lazy_loading():
+    registry = reg.ModelRegistry(cache=False)
+    assert registry.loaded() == []
+
+    igrf = registry.get('14')
+    expected = iut.load_shcfile(os.path.join(reg.SHC_DIR, 'IGRF14.SHC'))
+    assert_array_equal(igrf.coeffs, expected.coeffs)
+    assert igrf.parameters == expected.parameters
+
+    assert registry.get(14) is igrf
+    assert registry.loaded() == [14]
+    assert (registry.hits, registry.misses) == (1, 1)
+
+    with pytest.raises(ValueError):
+        registry.get(15)
+
+
+def test_user_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv('PYIGRF_CACHE_DIR', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    if os.name != 'nt':
+        assert reg.user_cache_dir() == str(tmp_path / 'xdg' / 'pyIGRF')
+    monkeypatch.setenv('PYIGRF_CACHE_DIR', str(tmp_path / 'env'))
+    assert reg.user_cache_dir() == str(tmp_path / 'env')
+
+    # the caches go to the user directory, not next to the shc-files
+    registry = reg.ModelRegistry(cache_dir=str(tmp_path / 'cache'))
+    registry.get(14)
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+
+
+def test_lru_eviction():
+    registry = reg.ModelRegistry(max_models=2, cache=False)
+    for gen in [12, 13, 14, 13]:
+        registry.get(gen)
+    assert registry.loaded() == [14, 13]
+
+    model = registry.get(14)
+    one_model = reg.model_nbytes(model)
+    assert one_model == sum(x.nbytes for x in (
+        model.time, model.coeffs, model.knots, model.slopes))
+    registry = reg.ModelRegistry(max_bytes=2*one_model, cache=False)
+    for gen in [12, 13, 14]:
+        registry.get(gen)
+    assert registry.loaded() == [13, 14]
+    assert registry.nbytes() <= 2*one_model
+
+
+def test_threads_share_one_model():
+    registry = reg.ModelRegistry(cache=False)
+    found = []
+
+    def worker():
+        found.append(registry.get(14))
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert registry.misses == 1
+    assert all(model is found[0] for model in found)
+
+
+def test_preload():
+    registry = reg.ModelRegistry(preload=[12, 13, 14], cache=False)
+    assert sorted(registry.loaded()) == [12, 13, 14]
+
+    registry = reg.ModelRegistry(preload=True, workers=4, cache=False)
+    assert sorted(registry.loaded()) == list(range(1, 15))
+    assert np.all([registry.get(g).parameters['nmax'] == 13
+                   for g in registry.generations])
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the micro-batching field service (igrf_server.py), on localhost.
+
+    >> python -m pytest tests/tests_server.py
+
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import igrf_batch
+import igrf_server
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+igrf = reg.get_model(14)
+
+rng = np.random.default_rng(11)
+npoints = 64
+date = rng.uniform(1950., 2030., npoints)
+lat = rng.uniform(-89., 89., npoints)
+lon = rng.uniform(-180., 180., npoints)
+alt = rng.uniform(0., 400., npoints)
+
+
+@pytest.fixture
+def server():
+    batcher = igrf_server.MicroBatcher(window=0.05, max_batch=16)
+    server = igrf_server.FieldServer(('127.0.0.1', 0), batcher)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,),
+                              daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def get(server, query):
+    url = f'http://127.0.0.1:{server.server_address[1]}{query}'
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as err:
+        return err.code, json.loads(err.read())
+
+
+def test_batcher_matches_synth_records():
+    expected = igrf_batch.synth_records(igrf, date, lat, lon, alt)
+    with igrf_server.MicroBatcher(window=0.05) as batcher:
+        futures = [batcher.submit(*point) for point in
+                   zip(date, lat, lon, alt)]
+        records = [future.result(10) for future in futures]
+
+    for record, row in zip(records, expected):
+        assert list(record) == list(igrf_batch.COLUMNS)
+        assert_allclose(list(record.values()), row.tolist(),
+                        rtol=1e-12, atol=1e-9)
+    stats = batcher.stats.summary()
+    assert stats['requests'] == npoints
+    assert stats['batches'] < npoints
+    assert stats['batch_size']['max'] > 1
+
+
+def test_batcher_mixed_groups_and_max_batch():
+    with igrf_server.MicroBatcher(window=0.05, max_batch=8) as batcher:
+        futures = [batcher.submit(d, a, o, r, itype=itype, igrf=gen)
+                   for d, a, o, r, itype, gen in zip(
+                       date[:24], lat[:24], lon[:24], alt[:24] + 6371.2,
+                       [1, 2, 2] * 8, [13, 14] * 12)]
+        records = [future.result(10) for future in futures]
+    assert batcher.stats.summary()['batch_size']['max'] <= 8
+
+    for k, record in enumerate(records):
+        itype, gen = [1, 2, 2][k % 3], [13, 14][k % 2]
+        expected = igrf_batch.synth_records(
+            reg.get_model(gen), date[k], lat[k], lon[k], alt[k] + 6371.2,
+            itype=itype)
+        assert_allclose(list(record.values()), expected[0].tolist(),
+                        rtol=1e-12, atol=1e-9)
+
+
+def test_batcher_invalid_input():
+    with igrf_server.MicroBatcher() as batcher:
+        for args, kwargs in [((2020., 95., 0., 0.), {}),
+                             ((2020., 'x', 0., 0.), {}),
+                             ((np.nan, 45., 0., 0.), {}),
+                             ((2020., 45., 0., 100.), {'itype': 2}),
+                             ((2020., 45., 0., 0.), {'itype': 3}),
+                             ((2020., 45., 0., 0.), {'igrf': 99})]:
+            with pytest.raises(ValueError):
+                batcher.submit(*args, **kwargs)
+        assert batcher.lookup(2020., 45., 0., 0.)['lat'] == 45.
+
+
+def test_http_field_and_stats(server):
+    queries = [f'/field?date={d}&lat={a}&lon={o}&alt={r}'
+               for d, a, o, r in zip(date, lat, lon, alt)]
+    with ThreadPoolExecutor(16) as executor:
+        responses = list(executor.map(lambda q: get(server, q), queries))
+
+    expected = igrf_batch.synth_records(igrf, date, lat, lon, alt)
+    for (status, record), row in zip(responses, expected):
+        assert status == 200
+        assert_allclose([record[name] for name in igrf_batch.COLUMNS],
+                        row.tolist(), rtol=1e-12, atol=1e-9)
+
+    status, stats = get(server, '/stats')
+    assert status == 200
+    assert stats['requests'] == npoints and stats['errors'] == 0
+    assert stats['batches'] < npoints
+    assert 1 < stats['batch_size']['max'] <= 16
+    assert 0 < stats['latency_ms']['p50'] <= stats['latency_ms']['p99']
+
+
+def test_http_geocentric(server):
+    status, record = get(server, '/field?date=2020&lat=45&lon=10&alt=6371.2'
+                                 '&coords=geocentric&igrf=13')
+    assert status == 200
+    expected = igrf_batch.synth_records(reg.get_model(13), 2020., 45., 10.,
+                                        6371.2, itype=2)
+    assert_allclose([record[name] for name in igrf_batch.COLUMNS],
+                    expected[0].tolist(), rtol=1e-12)
+
+
+@pytest.mark.parametrize('query, status', [
+    ('/field?date=2020&lat=45&lon=10', 400),
+    ('/field?date=2020&lat=95&lon=10&alt=0', 400),
+    ('/field?date=2020&lat=45&lon=10&alt=0&coords=polar', 400),
+    ('/field?date=2020&lat=45&lon=10&alt=0&igrf=0', 400),
+    ('/other', 404)])
+def test_http_errors(server, query, status):
+    code, content = get(server, query)
+    assert code == status
+    assert 'error' in content
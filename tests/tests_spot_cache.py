@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the quantised LRU cache of spot values (spot_cache.py).
+
+    >> python -m pytest tests/tests_spot_cache.py
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import igrf_batch
+import igrf_server
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+import spot_cache
+
+igrf = reg.get_model(14)
+
+
+def test_hits_share_the_grid_point():
+    cache = spot_cache.SpotCache(lat_step=0.1, lon_step=0.1, alt_step=1.,
+                                 date_step=1.)
+    first = cache.lookup(2020.2, 45.04, -3.01, 0.3)
+    second = cache.lookup(2019.8, 44.96, -2.97, -0.4)
+    assert cache.info()['hits'] == 1 and cache.info()['misses'] == 1
+    assert first == second
+
+    # values at the grid point, not at the query
+    expected = igrf_batch.synth_records(igrf, 2020., 45., -3., 0.)
+    assert_allclose([first[name] for name in igrf_batch.COLUMNS],
+                    expected[0].tolist(), rtol=1e-12, atol=1e-9)
+
+    # other generation, coordinates or cell
+    cache.lookup(2020.2, 45.04, -3.01, 6371.2, itype=2)
+    cache.lookup(2020.2, 45.04, -3.01, 0.3, igrf=13)
+    cache.lookup(2020.2, 45.06, -3.01, 0.3)
+    assert cache.info() == dict(hits=1, misses=4, size=4,
+                                maxsize=cache.maxsize, hit_rate=0.2)
+
+
+def test_lru_eviction():
+    cache = spot_cache.SpotCache(maxsize=2)
+    cache.lookup(2020., 10., 0., 0.)
+    cache.lookup(2020., 20., 0., 0.)
+    cache.lookup(2020., 10., 0., 0.)  # most recently used
+    cache.lookup(2020., 30., 0., 0.)  # drops 20
+    assert len(cache) == 2
+    assert cache.get(cache.key(2020., 20., 0., 0.)) is None
+    assert cache.get(cache.key(2020., 10., 0., 0.)) is not None
+
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == cache.misses == 0
+    with pytest.raises(ValueError):
+        spot_cache.SpotCache(maxsize=0)
+
+
+def test_records_are_copies():
+    cache = spot_cache.SpotCache()
+    record = cache.lookup(2020., 10., 0., 0.)
+    record['D'] = 1e9
+    assert cache.lookup(2020., 10., 0., 0.)['D'] != 1e9
+
+
+def test_threads():
+    cache = spot_cache.SpotCache(maxsize=50)
+    rng = np.random.default_rng(5)
+    sites = rng.integers(0, 100, 2000)
+    with ThreadPoolExecutor(8) as executor:
+        records = list(executor.map(
+            lambda k: cache.lookup(2020., k - 50., 2. * k, 0.), sites))
+    info = cache.info()
+    assert info['hits'] + info['misses'] == sites.size
+    assert info['size'] == 50
+    for k, record in zip(sites, records):
+        assert record['lat'] == pytest.approx(k - 50.)
+
+
+def test_batcher_cache():
+    cache = spot_cache.SpotCache()
+    with igrf_server.MicroBatcher(cache=cache) as batcher:
+        first = batcher.lookup(2020., 45.001, -3., 0.)
+        second = batcher.submit(2020., 44.999, -3., 0.)
+        assert second.done()
+        assert second.result() == first
+    assert first['lat'] == 45.
+    assert cache.info()['hits'] == 1 and batcher.stats.requests == 1
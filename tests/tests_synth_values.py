@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the options of synth_values, the single pass synthesis of several
+coefficient sets (synth_values_multi), of all fourteen elements
+(synth_elements), of the separable grid synthesis (synth_grid) and of the
+precomputed design matrices of fixed points (SynthBasis).
+
+    >> python -m pytest tests/tests_synth_values.py
+
+"""
+
+import igrf_utils as iut
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+igrf = reg.get_model(14)
+
+rng = np.random.default_rng(1)
+dates = rng.uniform(1900., 2030., 50)
+theta = rng.uniform(1., 179., 50)
+phi = rng.uniform(-180., 180., 50)
+radius = rng.uniform(6300., 7000., 50)
+
+
+def test_multi_equals_separate_calls(backend):
+    coeffs, coeffs_sv = igrf.interpolate(dates)
+    sets = [coeffs, coeffs_sv, coeffs[0]]
+    found = iut.synth_values_multi(sets, radius, theta, phi, backend=backend)
+    for c, B in zip(sets, found):
+        for b_found, b_expected in zip(B, iut.synth_values(
+                c, radius, theta, phi, backend=backend)):
+            assert_array_equal(b_found, b_expected)
+
+
+def test_elements_geodetic(backend):
+    alt, colat, sd, cd = iut.gg_to_geo(radius - 6371.2, theta)
+    coeffs, _ = igrf.interpolate(dates)
+    epoch_start = 1900 + 5*((dates - 1900)//5)
+    coeffsm, coeffs_sv = igrf.interpolate(epoch_start)
+
+    found = iut.synth_elements(coeffs, coeffs_sv, coeffsm, alt, colat, phi,
+                               sd=sd, cd=cd, backend=backend)
+    assert len(found) == 14
+
+    # reference: three separate syntheses as in the command line program
+    Br, Bt, Bp = iut.synth_values(coeffs, alt, colat, phi, backend=backend)
+    Brs, Bts, Bps = iut.synth_values(coeffs_sv, alt, colat, phi,
+                                     backend=backend)
+    Brm, Btm, Bpm = iut.synth_values(coeffsm, alt, colat, phi,
+                                     backend=backend)
+    X = -Bt*cd - Br*sd; Z = -Br*cd + Bt*sd
+    dX = -Bts*cd - Brs*sd; dZ = -Brs*cd + Bts*sd
+    Xm = -Btm*cd - Brm*sd; Zm = -Brm*cd + Btm*sd
+    expected = ((X, Bp, Z, dX, Bps, dZ) + iut.xyz2dhif(X, Bp, Z)
+                + iut.xyz2dhif_sv(Xm, Bpm, Zm, dX, Bps, dZ))
+    for f, e in zip(found, expected):
+        assert_allclose(f, e, rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize('dedup', [True, None])
+def test_dedup(dedup, monkeypatch):
+    # ship track along a parallel, stations sampled at many dates and a
+    # flattened grid, on NumPy (the Numba kernels ignore dedup)
+    coeffs, _ = igrf.interpolate(np.tile(dates, 20))
+    cases = [(coeffs[0], 6371.2, np.full(1000, 60.),
+              np.linspace(0, 360, 1000)),
+             (coeffs, np.repeat(radius[:20], 50), np.repeat(theta[:20], 50),
+              np.repeat(phi[:20], 50))]
+    colat, lon = np.meshgrid(np.arange(5., 180., 10.),
+                             np.arange(0., 360., 10))
+    cases.append((coeffs[0], 6371.2, colat.ravel(), lon.ravel()))
+
+    unique_values, deduplicated = iut._unique_values, []
+
+    def record(values, dedup):
+        unique = unique_values(values, dedup)
+        deduplicated.append(unique is not None)
+        return unique
+
+    for c, r, th, ph in cases:
+        expected = iut.synth_values(c, r, th, ph, dedup=False,
+                                    backend='numpy')
+        monkeypatch.setattr(iut, '_unique_values', record)
+        found = iut.synth_values(c, r, th, ph, dedup=dedup, backend='numpy')
+        monkeypatch.undo()
+        assert any(deduplicated[-3:])
+        for b_found, b_expected in zip(found, expected):
+            assert_array_equal(b_found, b_expected)
+
+
+def test_dedup_auto():
+    assert iut._unique_values(theta, None) is None
+    assert iut._unique_values(theta, False) is None
+    assert iut._unique_values(theta, True)[0].size == theta.size
+
+    values, inverse = iut._unique_values(np.tile(theta, (2, 4)), None)
+    assert values.size == theta.size
+    assert inverse.shape == (2, 200)
+    assert_array_equal(values[inverse], np.tile(theta, (2, 4)))
+
+    # flattened meshgrids, whose row length may alias with a strided sample
+    for step, nlat, nlon in ((0.5, 360, 720), (1., 180, 360)):
+        colat, lon = np.meshgrid(np.arange(step/2, 180., step),
+                                 np.arange(-180., 180., step), indexing='ij')
+        for values, size in ((colat.ravel(), nlat), (lon.ravel(), nlon)):
+            unique = iut._unique_values(values, None)
+            assert unique is not None and unique[0].size == size
+
+    scattered = np.random.default_rng(2).uniform(0., 180., 100_000)
+    assert iut._unique_values(scattered, None) is None
+
+
+@pytest.mark.parametrize('method', ['matmul', 'fft'])
+@pytest.mark.parametrize('nmin', [1, 3])
+def test_grid_equals_synth_values(method, nmin, backend):
+    # regular grid including both poles and several sets of coefficients
+    coeffs, coeffs_sv = igrf.interpolate(2021.7)
+    sets = np.stack((coeffs, coeffs_sv))
+    colat = np.linspace(0., 180., 19)
+    lon = np.arange(-180., 180., 10.)
+    alt = np.linspace(6371.2, 6800., colat.size)[:, None]
+
+    found = iut.synth_grid(sets, alt, colat, lon, nmax=10, nmin=nmin,
+                           method=method)
+    for k, c in enumerate(sets):
+        expected = iut.synth_values(c, alt, colat, lon, nmax=10, nmin=nmin,
+                                    grid=True, backend=backend)
+        for b_found, b_expected in zip(found, expected):
+            assert b_found.shape == (2, colat.size, lon.size)
+            assert_allclose(b_found[k], b_expected, rtol=0., atol=1e-8)
+
+
+def test_grid_elements_geodetic():
+    lat = np.arange(-85., 90., 10.)
+    lon = np.array([-170., -20., 0., 35., 150.])
+    alt, colat, sd, cd = iut.gg_to_geo(np.full(lat.size, 100.), 90. - lat)
+    coeffs, coeffs_sv = igrf.interpolate(2024.2)
+    coeffsm, _ = igrf.interpolate(2020.)
+
+    found = iut.synth_elements(coeffs, coeffs_sv, coeffsm, alt, colat, lon,
+                               grid='separable', sd=sd, cd=cd)
+    expected = iut.synth_elements(coeffs, coeffs_sv, coeffsm,
+                                  alt[:, None], colat[:, None], lon,
+                                  sd=sd[:, None], cd=cd[:, None])
+    for e_found, e_expected in zip(found, expected):
+        assert_allclose(e_found, e_expected, rtol=1e-10, atol=1e-8)
+
+
+def test_grid_fft_requires_full_circle():
+    coeffs, _ = igrf.interpolate(2000.)
+    with pytest.raises(ValueError):
+        iut.synth_grid(coeffs, 6371.2, [45.], np.arange(0., 180., 5.),
+                       method='fft')
+
+
+@pytest.mark.parametrize('nmin', [1, 4])
+def test_basis_equals_synth_values(nmin, backend):
+    # include both poles
+    colat = np.concatenate(([0., 180.], theta))
+    lon = np.concatenate(([10., -45.], phi))
+    alt = np.concatenate(([6371.2, 6500.], radius))
+    coeffs, _ = igrf.interpolate(dates[:7])
+
+    basis = iut.SynthBasis(alt, colat, lon, nmax=11, nmin=nmin)
+    found = basis.synth(coeffs)
+    for k, c in enumerate(coeffs):
+        expected = iut.synth_values(c, alt, colat, lon, nmax=11, nmin=nmin,
+                                    backend=backend)
+        for b_found, b_expected in zip(found, expected):
+            assert b_found.shape == (7, colat.size)
+            assert_allclose(b_found[k], b_expected, rtol=0., atol=1e-8)
+
+
+def test_basis_elements_time_series(backend):
+    alt, colat, sd, cd = iut.gg_to_geo(250., 35.)
+    coeffs, _ = igrf.interpolate(dates)
+    epoch_start = 1900 + 5*((dates - 1900)//5)
+    coeffsm, coeffs_sv = igrf.interpolate(epoch_start)
+
+    basis = iut.SynthBasis(alt, colat, 120., nmax=13, grid=False)
+    found = basis.elements(coeffs, coeffs_sv, coeffsm, sd=sd, cd=cd)
+    expected = iut.synth_elements(coeffs, coeffs_sv, coeffsm, alt, colat,
+                                  120., sd=sd, cd=cd, backend=backend)
+    for e_found, e_expected in zip(found, expected):
+        assert e_found.shape == dates.shape
+        assert_allclose(e_found, e_expected, rtol=1e-10, atol=1e-8)
+
+
+def test_basis_too_few_coefficients():
+    basis = iut.SynthBasis(6371.2, theta, phi, nmax=13)
+    with pytest.raises(ValueError):
+        basis.synth(np.zeros(120))
+
+
+@pytest.mark.parametrize('pole', [0., 180.])
+def test_poles_are_limits(pole, backend):
+    # the field at the poles is the limit of the field next to them, for
+    # scalar and array inputs
+    coeffs, _ = igrf.interpolate(2015.)
+    near = pole + (1e-3 if pole == 0. else -1e-3)
+    with pytest.warns(UserWarning):
+        at_pole = iut.synth_values(coeffs, 6371.2, pole, 30., backend=backend)
+    for b_pole, b_near in zip(at_pole, iut.synth_values(
+            coeffs, 6371.2, near, 30., backend=backend)):
+        assert_allclose(b_pole, b_near, rtol=0., atol=1.)
+
+    with pytest.warns(UserWarning):
+        at_poles = iut.synth_values(coeffs, 6371.2, [pole, 45.], 30.,
+                                    backend=backend)
+    for b_poles, b_pole in zip(at_poles, at_pole):
+        assert_array_equal(b_poles[0], b_pole)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the trajectory mode (trajectory.py) and the recurrence of the
+cos(m*phi) and sin(m*phi) terms.
+
+    >> python -m pytest tests/tests_trajectory.py
+
+"""
+
+import igrf_batch
+import igrf_utils as iut
+import model_registry as reg
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+import trajectory
+
+igrf = reg.get_model(14)
+
+rng = np.random.default_rng(11)
+date = np.sort(rng.uniform(1895., 2035., 2000))
+lat = rng.uniform(-89., 89., 2000)
+lon = rng.uniform(-180., 360., 2000)
+alt = rng.uniform(0., 800., 2000)
+
+
+def assert_records_close(records, expected):
+    for name in igrf_batch.COLUMNS:
+        assert_allclose(records[name], expected[name], rtol=0, atol=1e-8,
+                        err_msg=name)
+
+
+@pytest.mark.parametrize('dtype, atol', [(float, 1e-13),
+                                         (np.float32, 5e-5)])
+def test_trig_terms(dtype, atol):
+    phi = rng.uniform(-360., 720., 1000)
+    cmp, smp = iut.trig_terms(13, phi, dtype=dtype)
+    mphi = np.multiply.outer(np.arange(14), np.radians(phi))
+    assert cmp.dtype == dtype and cmp.shape == (14, 1000)
+    assert_allclose(cmp, np.cos(mphi), rtol=0, atol=atol)
+    assert_allclose(smp, np.sin(mphi), rtol=0, atol=atol)
+
+    cmp, smp = iut.trig_terms(0, 30.)
+    assert_array_equal(cmp, [1.])
+    assert_array_equal(smp, [0.])
+
+
+def test_piece():
+    k = igrf.piece(np.array([1850., 1900., 1902.5, 2025., 2030., 2040.]))
+    assert_array_equal(k, [0, 0, 0, 25, 25, 25])
+    coeffs, _ = igrf.interpolate(date)
+    k = igrf.piece(date)
+    assert_allclose(coeffs, igrf.knots[k] + (date - igrf.time[k])[:, None]
+                    * igrf.slopes[k], rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize('itype', [1, 2])
+def test_synth_track(itype, backend):
+    alts = alt if itype == 1 else alt + 6371.2
+    expected = igrf_batch.synth_records(igrf, date, lat, lon, alts,
+                                        itype=itype, backend=backend)
+    chunks = list(trajectory.synth_track(igrf, (date, lat, lon, alts),
+                                         itype=itype, chunk_size=300,
+                                         backend=backend))
+    assert [chunk.size for chunk in chunks] == [300]*6 + [200]
+    assert_records_close(np.concatenate(chunks), expected)
+
+
+def test_synth_track_generator(backend):
+    expected = igrf_batch.synth_records(igrf, date, lat, lon, alt,
+                                        backend=backend)
+
+    # single samples, blocks of arrays and a mix of both
+    samples = zip(date, lat, lon, alt)
+    records = np.concatenate(list(trajectory.synth_track(
+        igrf, samples, chunk_size=128, backend=backend)))
+    assert_records_close(records, expected)
+
+    def blocks():
+        for start in range(0, 1000, 50):
+            stop = start + 50
+            yield date[start:stop], lat[start:stop], lon[start:stop], \
+                alt[start:stop]
+        yield from zip(date[1000:], lat[1000:], lon[1000:], alt[1000:])
+
+    records = np.concatenate(list(trajectory.synth_track(
+        igrf, blocks(), chunk_size=256, backend=backend)))
+    assert_records_close(records, expected)
+
+
+def test_synth_track_arrays():
+    expected = igrf_batch.synth_records(igrf, date, 45., lon, 0.)
+    data = np.stack(np.broadcast_arrays(date, 45., lon, 0.), axis=-1)
+    assert_records_close(np.concatenate(list(
+        trajectory.synth_track(igrf, data))), expected)
+    assert_records_close(np.concatenate(list(
+        trajectory.synth_track(igrf, expected, chunk_size=999))), expected)
+    # broadcasting of the arrays of a block
+    assert_records_close(np.concatenate(list(
+        trajectory.synth_track(igrf, (date, 45., lon, 0.)))), expected)
+
+
+def test_unaligned_epochs():
+    # snapshots not on the five year epochs of the SV of D, H, I and F
+    shifted = iut.igrf(igrf.time + 1.5, igrf.coeffs, igrf.parameters)
+    expected = igrf_batch.synth_records(shifted, date, lat, lon, alt)
+    assert_records_close(trajectory.synth_chunk(shifted, date, lat, lon, alt),
+                         expected)
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        list(trajectory.iter_chunks((date, lat, lon, alt), chunk_size=0))
+    with pytest.raises(ValueError):
+        list(trajectory.iter_chunks(np.zeros((10, 3))))
+    with pytest.raises(ValueError):
+        list(trajectory.iter_chunks([(2020., 45., 0.)]))
+    with pytest.raises(ValueError):
+        list(trajectory.synth_track(igrf, [(2020., 95., 0., 0.)]))
+    with pytest.raises(ValueError):
+        list(trajectory.synth_track(igrf, [(2020., 45., 0., 100.)], itype=2))
+    assert list(trajectory.synth_track(igrf, iter(()))) == []
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Main field and SV of the IGRF along satellite (or any other) trajectories,
+streamed chunk by chunk from arrays or generators of time-tagged positions.
+
+The coefficients are linear in time between the snapshots of the model, so
+the field at each sample follows exactly from the field of the snapshot and
+of the slope of its linear piece, B(t) = B(knot) + (t - t_knot) B(slope),
+and the SV is B(slope). Each chunk is therefore synthesised with one or two
+shared sets of coefficients per piece (a chunk of a trajectory rarely spans
+more than one), instead of interpolating and gathering a full set of
+coefficients per sample as igrf_batch does for unordered records. The
+cos(m*phi) and sin(m*phi) terms come from the angle-addition recurrence of
+igrf_utils.trig_terms.
+
+    import trajectory
+    import model_registry as reg
+
+    samples = ((date, lat, lon, r) for date, lat, lon, r in orbit)
+    for records in trajectory.synth_track(reg.get_model(14), samples,
+                                          itype=2):
+        ...  # structured array of igrf_batch.COLUMNS per chunk
+
+"""
+
+import numpy as np
+
+import igrf_batch
+import igrf_utils as iut
+import io_options as ioo
+
+# Number of samples synthesised at a time
+CHUNK_SIZE = 4096
+
+# Types of the values of single samples (anything else is taken as arrays)
+_SCALARS = (float, int, np.floating, np.integer)
+
+
+def iter_chunks(samples, chunk_size=None):
+    """
+    Regroup samples into chunks of a fixed number of samples.
+
+    Parameters
+    ----------
+    samples : tuple, ndarray or iterable
+        Either a tuple of arrays (date, lat, lon, alt), an (N, 4)-array or
+        structured array with these fields (see igrf_batch), or an iterable
+        of (date, lat, lon, alt) tuples of single samples or of arrays, e.g.
+        a generator reading a file or receiving telemetry.
+    chunk_size : int, optional
+        Number of samples per chunk (default is CHUNK_SIZE). The last chunk
+        may be shorter.
+
+    Yields
+    ------
+    date, lat, lon, alt : ndarray, shape (chunk_size,)
+
+    """
+    chunk_size = CHUNK_SIZE if chunk_size is None else int(chunk_size)
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1.')
+    if isinstance(samples, np.ndarray):
+        if samples.dtype.names is not None:
+            samples = tuple(samples[name]
+                            for name in igrf_batch.INPUT_COLUMNS)
+        elif samples.ndim == 2 and samples.shape[1] == 4:
+            samples = tuple(samples.T)
+        else:
+            raise ValueError(f'Expected an (N, 4)-array of samples, found '
+                             f'shape {samples.shape}.')
+    if isinstance(samples, tuple):
+        samples = (samples,)
+
+    # single samples are collected in a list, arrays as (4, n) blocks
+    blocks, rows, size = [], [], 0
+    for sample in samples:
+        if len(sample) != 4:
+            raise ValueError('Expected samples of (date, lat, lon, alt).')
+        if all(isinstance(x, _SCALARS) for x in sample):
+            rows.append(sample)
+            size += 1
+        else:
+            if rows:
+                blocks.append(np.array(rows, dtype=float).T)
+                rows = []
+            blocks.append(np.array(np.broadcast_arrays(
+                *(np.asarray(x, dtype=float).reshape(-1) for x in sample))))
+            size += blocks[-1].shape[1]
+        if size < chunk_size:
+            continue
+        if rows:
+            blocks.append(np.array(rows, dtype=float).T)
+            rows = []
+        data = np.concatenate(blocks, axis=1)
+        while data.shape[1] >= chunk_size:
+            yield tuple(data[:, :chunk_size])
+            data = data[:, chunk_size:]
+        blocks, size = [data], data.shape[1]
+
+    if rows:
+        blocks.append(np.array(rows, dtype=float).T)
+    if size > 0:
+        yield tuple(np.concatenate(blocks, axis=1))
+
+
+def synth_chunk(igrf, date, lat, lon, alt, itype=1, backend=None):
+    """
+    Main field and SV elements of the IGRF at the samples of one chunk.
+
+    Parameters
+    ----------
+    igrf : igrf_utils.igrf
+        Loaded model, e.g. ``model_registry.get_model(14)``.
+    date, lat, lon, alt : ndarray, shape (N,)
+        Samples as described in igrf_batch.
+    itype : {1, 2}, optional
+        Geodetic (1, default) or geocentric (2) coordinates.
+    backend : {'numpy', 'numba'}, optional
+        Implementation of the synthesis, see :func:`igrf_utils.get_backend`.
+
+    Returns
+    -------
+    records : ndarray, shape (N,)
+        Structured array with the fields igrf_batch.COLUMNS, the same values
+        as :func:`igrf_batch.synth_records` up to rounding.
+
+    """
+    date, lat, lon, alt = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float).reshape(-1)
+          for x in (date, lat, lon, alt)))
+    igrf_batch.check_records(lat, alt, itype)
+
+    records = np.empty(date.size, dtype=ioo.records_dtype())
+    for name, values in zip(igrf_batch.INPUT_COLUMNS, (date, lat, lon, alt)):
+        records[name] = values
+
+    colat = 90 - lat
+    if itype == 1:
+        radius, colat, sd, cd = iut.gg_to_geo(alt, colat)
+    else:
+        radius, sd, cd = alt, None, None
+
+    # pieces of the dates and of the starts of their epochs, to which the SV
+    # of D, H, I and F is relative (see igrf.epoch_coeffs)
+    time, knots, slopes = igrf.time, igrf.knots, igrf.slopes
+    if time.size == 1:
+        slopes = np.zeros_like(knots)
+    date_start = 1900 + (date - 1900)//5 * 5
+    piece = igrf.piece(date)
+    piece_start = igrf.piece(date_start)
+    pairs, inverse = np.unique(piece * knots.shape[0] + piece_start,
+                               return_inverse=True)
+
+    B = np.empty((3, 3, date.size))  # main field, SV and start of the epoch
+    for num, pair in enumerate(pairs):
+        k, k_start = divmod(int(pair), knots.shape[0])
+        points = slice(None) if pairs.size == 1 else inverse == num
+        coeffs = (knots[k], slopes[k])
+        if k_start != k:
+            coeffs += (knots[k_start], slopes[k_start])
+        values = np.array(iut.synth_values_multi(
+            coeffs, radius[points], colat[points], lon[points],
+            nmax=igrf.parameters['nmax'], backend=backend))
+        dt = date[points] - time[k]
+        dt_start = date_start[points] - time[k_start]
+        B[0][:, points] = values[0] + dt*values[1]
+        B[1][:, points] = values[-1]
+        B[2][:, points] = values[-2] + dt_start*values[-1]
+
+    X, Y, Z, dX, dY, dZ, dec, hoz, inc, eff, decs, hozs, incs, effs = \
+        iut.field_elements(B[0], B[1], B[2], sd, cd)
+
+    for name, values in zip(igrf_batch.COLUMNS[4:],
+                            (dec, inc, hoz, eff, X, Y, Z,
+                             decs, incs, hozs, effs, dX, dY, dZ)):
+        records[name] = values
+    return records
+
+
+def synth_track(igrf, samples, itype=1, chunk_size=None, backend=None):
+    """
+    Main field and SV elements of the IGRF along a trajectory, chunk by
+    chunk, so that arbitrarily long (or endless) streams of samples are
+    processed in bounded memory.
+
+    Parameters
+    ----------
+    igrf : igrf_utils.igrf
+        Loaded model, e.g. ``model_registry.get_model(14)``.
+    samples : tuple, ndarray or iterable
+        Time-tagged positions (date, lat, lon, alt), as for
+        :func:`iter_chunks`.
+    itype : {1, 2}, optional
+        Geodetic (1, default) or geocentric (2) coordinates.
+    chunk_size : int, optional
+        Number of samples synthesised at a time (default is CHUNK_SIZE).
+    backend : {'numpy', 'numba'}, optional
+        Implementation of the synthesis, see :func:`igrf_utils.get_backend`,
+        resolved once for all chunks from the number of samples of arrays
+        (streams of unknown length run on Numba if it is installed).
+
+    Yields
+    ------
+    records : ndarray, shape (chunk_size,)
+        Structured array with the fields igrf_batch.COLUMNS of each chunk,
+        e.g. ``np.concatenate(list(synth_track(...)))`` for all samples.
+
+    """
+    size = None
+    if isinstance(samples, np.ndarray):
+        size = samples.shape[0]
+    elif isinstance(samples, tuple):
+        size = np.broadcast(*samples).size
+    backend = iut.get_backend(backend, size=size)
+    for date, lat, lon, alt in iter_chunks(samples, chunk_size):
+        yield synth_chunk(igrf, date, lat, lon, alt, itype=itype,
+                          backend=backend)